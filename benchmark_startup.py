@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк старта SheetsClient: discovery build() vs кэшированные документы
+Запуск: python3 benchmark_startup.py [--rounds 20]
+
+Сеть и token.json не нужны - используются анонимные credentials.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build
+
+from src.db import discovery
+from src.db.sheets_client import SheetsClient
+
+
+def timed(fn, rounds: int) -> float:
+    """Average milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    creds = AnonymousCredentials()
+
+    def legacy_client():
+        build("sheets", "v4", credentials=creds)
+        build("calendar", "v3", credentials=creds)
+
+    start = time.perf_counter()
+    discovery.preload_discovery_documents()
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    results = [
+        ("legacy: build() sheets + calendar", timed(legacy_client, args.rounds)),
+        ("cold: parse bundled documents (once per process)", cold_ms),
+        ("new: SheetsClient() construction (lazy)", timed(lambda: SheetsClient(creds=creds), args.rounds)),
+        ("new: first service_sheets access", timed(lambda: SheetsClient(creds=creds).service_sheets, args.rounds)),
+    ]
+    print(f"SheetsClient startup ({args.rounds} rounds)")
+    for name, ms in results:
+        print(f"  {name:<52} {ms:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+One-off cleanup of duplicate client rows (one was created per booking before
+clients were upserted). Dry run by default:
+
+    python dedupe_clients.py          # report only
+    python dedupe_clients.py --apply  # merge, re-point bookings, delete duplicates
+"""
+import argparse
+
+from src.config.config import Config
+from src.config.env_loader import load_env
+from src.services.service_factory import get_client_service, shutdown_sheets_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate rows of the clients tab")
+    parser.add_argument("--apply", action="store_true", help="write the changes (default: dry run)")
+    args = parser.parse_args()
+
+    load_env()
+    if not Config.from_env().SPREADSHEET_ID:
+        raise SystemExit("Set SPREADSHEET_ID in .env")
+    try:
+        report = get_client_service().dedupe_clients(apply=args.apply)
+    finally:
+        shutdown_sheets_client()
+    conflicts = report.pop("conflicts", [])
+    for name, value in report.items():
+        print(f"{name}: {value}")
+    for conflict in conflicts:
+        print(f"not merged (phone {conflict['phone']}, telegram ids {', '.join(conflict['telegram_ids'])}): "
+              f"{', '.join(conflict['client_ids'])}")
+    if not args.apply and report.get("duplicates"):
+        print("Dry run - re-run with --apply to write these changes")
+
+
+if __name__ == "__main__":
+    main()
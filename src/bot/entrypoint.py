@@ -8,6 +8,7 @@ from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiohttp import TCPConnector, ClientSession
 from src.bot.router import register_handlers
+from src.services.service_factory import get_archive_service, get_async_sheets_client, shutdown_sheets_client
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,21 @@ class NoSSLVerifyAiohttpSession(AiohttpSession):
         connector = TCPConnector(ssl=ssl_context)
         return ClientSession(connector=connector, timeout=None)
 
+# Seconds a background archive run may take (it is many requests, not one)
+ARCHIVE_RUN_TIMEOUT = 600
+
+async def _archive_periodically(interval_hours: float):
+    """Move finished slots/bookings into archive tabs: a minute after start, then every interval_hours"""
+    delay = 60
+    while True:
+        await asyncio.sleep(delay)
+        delay = interval_hours * 3600
+        try:
+            moved = await get_async_sheets_client().run(get_archive_service().archive, timeout=ARCHIVE_RUN_TIMEOUT)
+            logger.info(f"✅ Archive run: {moved}")
+        except Exception as e:
+            logger.warning(f"Archive run failed: {e}")
+
 def start_bot(cfg):
     token = cfg.BOT_TOKEN
     if not token:
@@ -40,6 +56,9 @@ async def _run_bot(cfg, loop):
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
     register_handlers(dp)
+    archiver = None
+    if cfg.ARCHIVE_INTERVAL_HOURS > 0:
+        archiver = asyncio.create_task(_archive_periodically(cfg.ARCHIVE_INTERVAL_HOURS))
     if cfg.USE_WEBHOOK and cfg.WEBHOOK_URL:
         logger.info("Webhook mode")
         await bot.delete_webhook(drop_pending_updates=True)
@@ -51,4 +70,7 @@ async def _run_bot(cfg, loop):
         try:
             await dp.start_polling(bot)
         finally:
+            if archiver is not None:
+                archiver.cancel()
             await bot.session.close()
+            shutdown_sheets_client()
@@ -5,10 +5,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from src.config.env_loader import load_env
 from src.config.config import Config
-from src.db.sheets_client import SheetsClient
-from src.services.admin_service import AdminService
-from src.services.master_service import MasterService
+from src.config.constants import SHEET_CLIENTS, SHEET_MASTERS, SHEET_BOOKINGS
+from src.services.service_factory import (
+    get_sheets_client, get_async_sheets_client, get_admin_service, get_master_service, get_archive_service
+)
 from src.services.sync_service import SyncService
+from src.db.metrics import get_registry
 from src.services.admin_chat_service import AdminChatService
 from src.bot.keyboards.common_kb import admin_menu, main_menu, cancel_kb
 from src.utils.i18n import i18n
@@ -36,6 +38,9 @@ class AdminChatStates(StatesGroup):
 
 def setup(dp: Dispatcher):
     dp.message.register(cmd_admin, Command(commands=["admin"]))
+    dp.message.register(cmd_api_stats, Command(commands=["api_stats"]))
+    dp.message.register(cmd_archive, Command(commands=["archive"]))
+    dp.message.register(cmd_history, Command(commands=["history"]))
     # Admin menu buttons - all languages
     dp.message.register(show_admin_menu, F.text.in_(["📊 Dashboard", "📊 Панель", "📊 לוח בקרה"]))
     dp.message.register(cmd_add_master, F.text.in_(["👨‍🎨 Add Master", "👨‍🎨 Добавить", "👨‍🎨 הוסף אמן"]))
@@ -66,21 +71,80 @@ async def cmd_admin(message: types.Message):
         await message.answer("❌ Not admin")
         return
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        admin = AdminService(sc, cfg.SPREADSHEET_ID)
-        clients = admin.list_clients()
-        masters = admin.list_masters()
-        bookings = admin.list_bookings()
+        admin = get_admin_service()
+        counts = await get_async_sheets_client().run(admin.dashboard_counts)
         msg = f"""📊 Admin Dashboard
 
-👥 Clients: {len(clients)}
-👨‍🎨 Masters: {len(masters)}
-📅 Bookings: {len(bookings)}"""
+👥 Clients: {counts[SHEET_CLIENTS]}
+👨‍🎨 Masters: {counts[SHEET_MASTERS]}
+📅 Bookings: {counts[SHEET_BOOKINGS]}"""
         await message.answer(msg, reply_markup=admin_menu(user_lang))
     except Exception as e:
         await message.answer(f"❌ Error: {str(e)[:100]}")
         logger.exception("Admin error")
 
+async def cmd_api_stats(message: types.Message):
+    """Google API usage per call site: /api_stats [reset]"""
+    load_env()
+    cfg = Config.from_env()
+    if message.from_user.id not in cfg.ADMIN_USER_IDS:
+        await message.answer("❌ Not admin")
+        return
+    registry = get_registry()
+    report = registry.report()
+    if (message.text or "").split()[1:2] == ["reset"]:
+        registry.reset()
+        report += "\n\n♻️ Counters reset"
+    # Telegram messages are capped at 4096 characters
+    await message.answer(report[:4000])
+
+async def cmd_archive(message: types.Message):
+    """Move past slots and finished bookings into the monthly archive tabs now"""
+    load_env()
+    cfg = Config.from_env()
+    if message.from_user.id not in cfg.ADMIN_USER_IDS:
+        await message.answer("❌ Not admin")
+        return
+    try:
+        await message.answer("⏳ Archiving...")
+        moved = await get_async_sheets_client().run(get_archive_service().archive, timeout=600)
+        lines = [f"• {sheet}: {count}" for sheet, count in moved.items()]
+        await message.answer("🗄 Archived rows:\n" + "\n".join(lines))
+    except Exception as e:
+        await message.answer(f"❌ Error: {str(e)[:100]}")
+        logger.exception("Archive error")
+
+async def cmd_history(message: types.Message):
+    """Archived bookings: /history (list months) or /history YYYY-MM"""
+    load_env()
+    cfg = Config.from_env()
+    if message.from_user.id not in cfg.ADMIN_USER_IDS:
+        await message.answer("❌ Not admin")
+        return
+    try:
+        archive = get_archive_service()
+        aio = get_async_sheets_client()
+        args = (message.text or "").split()[1:]
+        if not args:
+            months = await aio.run(archive.archived_months)
+            await message.answer("🗄 Archived months:\n" + ("\n".join(months) if months else "none"))
+            return
+        bookings = await aio.run(archive.history, args[0])
+        if not bookings:
+            await message.answer(f"🗄 No archived bookings for {args[0]}")
+            return
+        counts = {}
+        for b in bookings:
+            counts[b.get("status")] = counts.get(b.get("status"), 0) + 1
+        msg = f"🗄 {args[0]}: {len(bookings)} bookings\n"
+        msg += "\n".join(f"• {status}: {count}" for status, count in counts.items()) + "\n\n"
+        for b in bookings[-10:]:
+            msg += f"{b.get('date')} {b.get('slot_start')} {b.get('status')}\n"
+        await message.answer(msg)
+    except Exception as e:
+        await message.answer(f"❌ Error: {str(e)[:100]}")
+        logger.exception("History error")
+
 async def show_admin_menu(message: types.Message):
     """Show admin menu"""
     from src.utils.i18n import i18n
@@ -92,16 +156,13 @@ async def show_admin_menu(message: types.Message):
         await message.answer("❌ Not admin")
         return
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        admin = AdminService(sc, cfg.SPREADSHEET_ID)
-        clients = admin.list_clients()
-        masters = admin.list_masters()
-        bookings = admin.list_bookings()
+        admin = get_admin_service()
+        counts = await get_async_sheets_client().run(admin.dashboard_counts)
         msg = f"""📊 Admin Dashboard
 
-👥 Clients: {len(clients)}
-👨‍🎨 Masters: {len(masters)}
-📅 Bookings: {len(bookings)}"""
+👥 Clients: {counts[SHEET_CLIENTS]}
+👨‍🎨 Masters: {counts[SHEET_MASTERS]}
+📅 Bookings: {counts[SHEET_BOOKINGS]}"""
         await message.answer(msg, reply_markup=admin_menu(user_lang))
     except Exception as e:
         await message.answer(f"❌ Error: {str(e)[:100]}")
@@ -122,16 +183,15 @@ async def cmd_view_clients(message: types.Message):
         await message.answer("❌ Not admin")
         return
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        admin = AdminService(sc, cfg.SPREADSHEET_ID)
-        clients = admin.list_clients()
+        admin = get_admin_service()
+        clients = await get_async_sheets_client().run(admin.list_clients, 20)  # Show first 20
         
         if not clients:
             await message.answer("👥 No clients yet", reply_markup=admin_menu(get_user_lang(message.from_user.id)))
             return
         
         msg = "👥 Clients:\n\n"
-        for c in clients[:20]:  # Show first 20
+        for c in clients:
             msg += f"• {c.get('name')} - {c.get('phone', 'N/A')}\n"
         
         await message.answer(msg, reply_markup=admin_menu(get_user_lang(message.from_user.id)))
@@ -146,9 +206,8 @@ async def cmd_view_bookings(message: types.Message):
         await message.answer("❌ Not admin")
         return
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        admin = AdminService(sc, cfg.SPREADSHEET_ID)
-        bookings = admin.list_bookings()
+        admin = get_admin_service()
+        bookings = await get_async_sheets_client().run(admin.list_bookings)
         
         if not bookings:
             await message.answer("📋 No bookings yet", reply_markup=admin_menu(get_user_lang(message.from_user.id)))
@@ -215,10 +274,10 @@ async def process_specialties(message: types.Message, state: FSMContext):
         await state.update_data(specialties=message.text)
         data = await state.get_data()
         
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        master_service = MasterService(sc, cfg.SPREADSHEET_ID)
+        master_service = get_master_service()
         
-        result = master_service.add_master(
+        result = await get_async_sheets_client().run(
+            master_service.add_master,
             name=data.get("name"),
             calendar_id=data.get("calendar_id"),
             specialties=data.get("specialties", "")
@@ -240,9 +299,8 @@ async def cmd_add_slot(message: types.Message, state: FSMContext):
         return
     
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        admin = AdminService(sc, cfg.SPREADSHEET_ID)
-        masters = admin.list_masters()
+        admin = get_admin_service()
+        masters = await get_async_sheets_client().run(admin.list_masters)
         
         if not masters:
             await message.answer("❌ No masters found. Add masters first!", reply_markup=admin_menu(get_user_lang(message.from_user.id)))
@@ -308,11 +366,11 @@ async def process_slot_end(message: types.Message, state: FSMContext):
         await state.update_data(end_time=message.text)
         data = await state.get_data()
         
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
+        sc = get_sheets_client()
         from src.db.repositories.calendar_repo import CalendarRepo
-        calendar_repo = CalendarRepo(sc, cfg.SPREADSHEET_ID)
+        calendar_repo = get_async_sheets_client().repo(CalendarRepo(sc, cfg.SPREADSHEET_ID))
         
-        calendar_repo.add_slot(
+        await calendar_repo.add_slot(
             date=data.get("date"),
             master_id=data.get("master_id"),
             slot_start=data.get("start_time"),
@@ -338,12 +396,13 @@ async def cmd_sync(message: types.Message):
     try:
         await message.answer("⏳ Syncing calendar slots...")
         
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
+        sc = get_sheets_client()
         sync_service = SyncService(sc, cfg.SPREADSHEET_ID)
-        admin_service = AdminService(sc, cfg.SPREADSHEET_ID)
+        admin_service = get_admin_service()
+        aio = get_async_sheets_client()
         
         # Get all masters with calendar IDs
-        masters = admin_service.list_masters()
+        masters = await aio.run(admin_service.list_masters)
         synced_count = 0
         failed_count = 0
         
@@ -352,10 +411,12 @@ async def cmd_sync(message: types.Message):
                 logger.info(f"⏭️ Master {master.get('name')} has no calendar_id, skipping")
                 continue
             
-            result = sync_service.sync_calendar_slots(
+            result = await aio.run(
+                sync_service.sync_calendar_slots,
                 master_id=master.get("id"),
                 calendar_id=master.get("calendar_id"),
-                days_ahead=30
+                days_ahead=30,
+                timeout=120
             )
             
             if result.get("status") == "success":
@@ -5,8 +5,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from src.config.env_loader import load_env
 from src.config.config import Config
-from src.db.sheets_client import SheetsClient
-from src.services.booking_service import BookingService
+from src.services.service_factory import get_async_sheets_client, get_booking_service, get_slot_leases
+from src.services.slot_leases import SlotUnavailableError
 from src.utils.time_utils import get_next_business_days
 from src.utils.validation import is_valid_phone, phone_normalize, sanitize_name
 from src.bot.keyboards.common_kb import main_menu, cancel_kb, back_kb
@@ -66,6 +66,11 @@ TEXTS = {
         LANG_EN: "📅 Choose appointment date:",
         LANG_HE: "📅 בחר תאריך תור:"
     },
+    "no_free_dates": {
+        LANG_RU: "😔 В ближайшие две недели свободного времени нет. Попробуйте позже или напишите нам.",
+        LANG_EN: "😔 No free time in the next two weeks. Please try later or message us.",
+        LANG_HE: "😔 אין זמן פנוי בשבועיים הקרובים. נסה מאוחר יותר או כתוב לנו."
+    },
     "choose_master": {
         LANG_RU: "👨‍🎨 Выберите мастера:",
         LANG_EN: "👨‍🎨 Choose master:",
@@ -76,6 +81,11 @@ TEXTS = {
         LANG_EN: "⏰ Choose time slot:",
         LANG_HE: "⏰ בחר שעה:"
     },
+    "slot_taken": {
+        LANG_RU: "⚠️ Это время только что заняли. Пожалуйста, выберите другое.",
+        LANG_EN: "⚠️ This time was just taken. Please choose another one.",
+        LANG_HE: "⚠️ השעה הזו נתפסה זה עתה. אנא בחר שעה אחרת."
+    },
     "cancelled": {
         LANG_RU: "❌ Отменено",
         LANG_EN: "❌ Cancelled",
@@ -175,7 +185,7 @@ async def cmd_start(message: types.Message, state: FSMContext):
         welcome_messages.get(user_lang, welcome_messages[LANG_RU]),
         reply_markup=main_menu(user_lang, is_admin)
     )
-    await state.clear()
+    await _leave_booking_flow(message.from_user.id, state)
 
 async def cmd_show_admin(message: types.Message):
     """Show admin panel - redirect to admin handlers"""
@@ -206,9 +216,8 @@ async def cmd_my_bookings(message: types.Message):
     load_env()
     cfg = Config.from_env()
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        bs = BookingService(sc, cfg.SPREADSHEET_ID)
-        bookings = bs.list_bookings_by_client(message.from_user.id)
+        bs = get_booking_service()
+        bookings = await get_async_sheets_client().run(bs.list_bookings_by_client, message.from_user.id)
         
         if not bookings:
             await message.answer(
@@ -241,10 +250,15 @@ async def cmd_help(message: types.Message):
         reply_markup=get_main_menu(message.from_user.id)
     )
 
+async def _leave_booking_flow(user_id: int, state: FSMContext):
+    """Reset the FSM and free any slot the client still holds (otherwise it stays blocked until the hold expires)"""
+    await state.clear()
+    get_slot_leases().release_owner(user_id)
+
 async def cmd_cancel(message: types.Message, state: FSMContext):
     """Cancel current operation"""
     user_lang = get_user_lang(message.from_user.id)
-    await state.clear()
+    await _leave_booking_flow(message.from_user.id, state)
     await message.answer(get_text("cancelled", user_lang), reply_markup=get_main_menu(message.from_user.id))
 
 async def process_name(message: types.Message, state: FSMContext):
@@ -303,11 +317,19 @@ async def process_consultation(message: types.Message, state: FSMContext):
 async def show_date_selection(message: types.Message, state: FSMContext):
     """Show date selection calendar"""
     user_lang = get_user_lang(message.from_user.id)
-    dates = get_next_business_days(7)
-    kb = types.InlineKeyboardMarkup(inline_keyboard=[
-        [types.InlineKeyboardButton(text=d, callback_data=f"date:{d}") for d in dates[:3]],
-        [types.InlineKeyboardButton(text=d, callback_data=f"date:{d}") for d in dates[3:6]],
-    ])
+    business_days = get_next_business_days(14)
+    # Only dates that still have a free slot (one pass over slots and bookings)
+    bs = get_booking_service()
+    counts = await get_async_sheets_client().run(
+        bs.free_slot_counts, business_days[0], business_days[-1], None, message.from_user.id
+    )
+    dates = [d for d in business_days if counts.get(d)][:6]
+    if not dates:
+        await message.answer(get_text("no_free_dates", user_lang), reply_markup=get_main_menu(message.from_user.id))
+        await state.clear()
+        return
+    buttons = [types.InlineKeyboardButton(text=f"{d} ({counts[d]})", callback_data=f"date:{d}") for d in dates]
+    kb = types.InlineKeyboardMarkup(inline_keyboard=[buttons[i:i + 3] for i in range(0, len(buttons), 3)])
     await message.answer(get_text("choose_date", user_lang), reply_markup=kb)
     await state.set_state(ClientStates.waiting_for_date)
 
@@ -318,14 +340,18 @@ async def process_date_choice(callback: types.CallbackQuery, state: FSMContext):
     await state.update_data(date=date_str)
     load_env()
     cfg = Config.from_env()
-    sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-    masters = sc.read_sheet(cfg.SPREADSHEET_ID, "masters")
+    aio = get_async_sheets_client()
+    masters = await aio.read_sheet(cfg.SPREADSHEET_ID, "masters")
+    # Only masters with a free slot that day (served from the availability index)
+    free = await aio.run(get_booking_service().list_available_slots, date_str, None, callback.from_user.id)
+    free_masters = {str(s.get("master_id")) for s in free}
+    masters = [m for m in masters if m.get("active", "").lower() in ("yes", "true") and str(m.get("id")) in free_masters]
     if not masters:
         await callback.answer("No masters")
         return
     kb = types.InlineKeyboardMarkup(inline_keyboard=[[
         types.InlineKeyboardButton(text=m.get("name"), callback_data=f"master:{m.get('id')}")
-    ] for m in masters if m.get("active", "").lower() in ("yes", "true")])
+    ] for m in masters])
     await callback.message.edit_text(get_text("choose_master", user_lang), reply_markup=kb)
     await callback.answer()
 
@@ -334,10 +360,10 @@ async def process_master_choice(callback: types.CallbackQuery, state: FSMContext
     master_id = callback.data.split(":")[1]
     load_env()
     cfg = Config.from_env()
-    sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
+    aio = get_async_sheets_client()
     
     # Get master name from masters sheet
-    masters = sc.read_sheet(cfg.SPREADSHEET_ID, "masters")
+    masters = await aio.read_sheet(cfg.SPREADSHEET_ID, "masters")
     master_name = None
     for m in masters:
         if str(m.get("id")) == str(master_id):
@@ -348,9 +374,9 @@ async def process_master_choice(callback: types.CallbackQuery, state: FSMContext
     await state.update_data(master_id=master_id, master_name=master_name or f"Master {master_id}")
     
     user_lang = get_user_lang(callback.from_user.id)
-    bs = BookingService(sc, cfg.SPREADSHEET_ID)
+    bs = get_booking_service()
     data = await state.get_data()
-    slots = bs.list_available_slots(data.get("date"), master_id)
+    slots = await aio.run(bs.list_available_slots, data.get("date"), master_id, callback.from_user.id)
     if not slots:
         await callback.answer("No slots")
         return
@@ -362,18 +388,30 @@ async def process_master_choice(callback: types.CallbackQuery, state: FSMContext
 
 async def process_slot_choice(callback: types.CallbackQuery, state: FSMContext):
     """Process slot selection"""
+    # slot:HH:MM:HH:MM
     parts = callback.data.split(":")
-    start, end = parts[1], parts[2]
-    await state.update_data(slot_start=start, slot_end=end)
+    start, end = ":".join(parts[1:3]), ":".join(parts[3:5])
     data = await state.get_data()
     
     # Проверка наличия необходимых данных
     if not data.get('name') or not data.get('date'):
         await callback.answer("❌ Session expired. Please start booking again.", show_alert=True)
-        await state.clear()
+        await _leave_booking_flow(callback.from_user.id, state)
         await callback.message.edit_text("❌ Session expired. Please start booking again with /start")
         return
-    
+
+    # Hold the slot until confirmation so nobody else can book it meanwhile
+    bs = get_booking_service()
+    if data.get("slot_start") and data.get("slot_start") != start:
+        bs.release_slot(callback.from_user.id, data.get("date"), data.get("master_id", ""), data.get("slot_start"))
+    held = await get_async_sheets_client().run(
+        bs.hold_slot, callback.from_user.id, data["date"], data.get("master_id", ""), start, end
+    )
+    if not held:
+        await callback.answer(get_text("slot_taken", get_user_lang(callback.from_user.id)), show_alert=True)
+        return
+    await state.update_data(slot_start=start, slot_end=end)
+
     kb = types.InlineKeyboardMarkup(inline_keyboard=[
         [types.InlineKeyboardButton(text="✅ Confirm", callback_data="confirm:yes"),
          types.InlineKeyboardButton(text="❌ Cancel", callback_data="confirm:no")]
@@ -386,7 +424,7 @@ async def confirm_booking(callback: types.CallbackQuery, state: FSMContext):
     """Confirm booking"""
     if "no" in callback.data:
         await callback.message.edit_text("❌ Booking cancelled")
-        await state.clear()
+        await _leave_booking_flow(callback.from_user.id, state)
         await callback.answer()
         return
     
@@ -398,16 +436,16 @@ async def confirm_booking(callback: types.CallbackQuery, state: FSMContext):
     
     if missing_fields:
         await callback.answer(f"❌ Missing data: {', '.join(missing_fields)}. Please start again.", show_alert=True)
-        await state.clear()
+        await _leave_booking_flow(callback.from_user.id, state)
         await callback.message.edit_text("❌ Session expired. Please start booking again with /start")
         return
     
     load_env()
     cfg = Config.from_env()
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        bs = BookingService(sc, cfg.SPREADSHEET_ID)
-        result = bs.create_booking(
+        bs = get_booking_service()
+        result = await get_async_sheets_client().run(
+            bs.create_booking,
             client_telegram_id=callback.from_user.id,
             client_name=data.get("name", ""),
             client_phone=data.get("phone", ""),
@@ -426,6 +464,9 @@ async def confirm_booking(callback: types.CallbackQuery, state: FSMContext):
         )
         await state.clear()
         logger.info(f"Booking created: {result['booking_id']} for {callback.from_user.id}")
+    except SlotUnavailableError:
+        await callback.message.edit_text(get_text("slot_taken", get_user_lang(callback.from_user.id)))
+        await state.clear()
     except Exception as e:
         await callback.message.edit_text(f"❌ Error: {str(e)[:100]}")
         logger.exception("Booking failed")
@@ -436,8 +477,7 @@ async def cmd_my_bookings(message: types.Message):
     load_env()
     cfg = Config.from_env()
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        bookings = sc.read_sheet(cfg.SPREADSHEET_ID, "bookings")
+        bookings = await get_async_sheets_client().read_sheet(cfg.SPREADSHEET_ID, "bookings")
         if not bookings:
             await message.answer("No bookings")
             return
@@ -6,6 +6,7 @@ Drop this into your handlers and it's ready to go
 import logging
 from typing import Optional, Dict
 from src.services.inka_ai import INKA
+from src.services.service_factory import get_slot_leases
 from src.config.config import Config
 from aiogram import types, Router, F
 from aiogram.fsm.context import FSMContext
@@ -22,7 +23,7 @@ def get_inka() -> INKA:
     if _inka_instance is None:
         try:
             cfg = Config.from_env()
-            _inka_instance = INKA(api_key=cfg.OPENAI_API_KEY)
+            _inka_instance = INKA(api_key=cfg.OPENAI_API_KEY, leases=get_slot_leases())
             logger.info("✅ INKA AI initialized successfully")
         except Exception as e:
             logger.error(f"❌ Failed to initialize INKA: {e}")
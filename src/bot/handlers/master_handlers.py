@@ -3,7 +3,7 @@ from aiogram import types, Dispatcher
 from aiogram.filters import Command
 from src.config.env_loader import load_env
 from src.config.config import Config
-from src.db.sheets_client import SheetsClient
+from src.services.service_factory import get_async_sheets_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,15 +16,19 @@ async def cmd_agenda(message: types.Message):
     load_env()
     cfg = Config.from_env()
     try:
-        sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-        bookings = sc.read_sheet(cfg.SPREADSHEET_ID, "bookings")
-        today_bookings = [b for b in bookings if b.get("status") == "confirmed"]
+        # Paged scan that stops at the 10th confirmed booking
+        today_bookings = []
+        async for b in get_async_sheets_client().iter_sheet(cfg.SPREADSHEET_ID, "bookings"):
+            if b.get("status") == "confirmed":
+                today_bookings.append(b)
+                if len(today_bookings) >= 10:
+                    break
         if not today_bookings:
             await message.answer("📭 No confirmed bookings today")
             return
         msg = "📅 Today's Bookings:\n" + "\n".join([
             f"{b['slot_start']}-{b['slot_end']}: {b.get('client_id', 'Unknown')}"
-            for b in today_bookings[:10]
+            for b in today_bookings
         ])
         await message.answer(msg)
     except Exception as e:
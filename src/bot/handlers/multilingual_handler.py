@@ -12,6 +12,7 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import Command, StateFilter
 
 from src.services.inka_ai import INKA
+from src.services.service_factory import get_slot_leases
 from src.utils.i18n import i18n, LANG_RU, LANG_EN, LANG_HE
 from src.bot.keyboards.common_kb import main_menu, language_selection_kb
 from src.services.language_service import get_language_service
@@ -31,7 +32,7 @@ def get_inka() -> INKA:
         try:
             load_env()
             cfg = Config.from_env()
-            _inka_instance = INKA(api_key=cfg.OPENAI_API_KEY)
+            _inka_instance = INKA(api_key=cfg.OPENAI_API_KEY, leases=get_slot_leases())
             logger.info("✅ INKA AI initialized for multilingual mode")
         except Exception as e:
             logger.error(f"Failed to initialize INKA: {e}")
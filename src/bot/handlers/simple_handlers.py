@@ -13,7 +13,7 @@ from src.bot.keyboards.client_kb import get_main_menu, get_calendar_keyboard, ge
 from src.bot.locales import get_text, get_menu_buttons
 from src.config.config import Config
 from src.config.env_loader import load_env
-from src.services.service_factory import get_booking_service, get_calendar_service
+from src.services.service_factory import get_booking_service, get_calendar_service, get_async_sheets_client
 
 logger = logging.getLogger(__name__)
 router = Router(name="simple_client")
@@ -163,9 +163,8 @@ async def process_confirmation(message: Message, state: FSMContext):
             cfg = Config.from_env()
             
             # Получаем мастера (пока первого доступного)
-            from src.db.sheets_client import SheetsClient
-            sheets_client = SheetsClient()
-            masters = sheets_client.read_sheet(cfg.SPREADSHEET_ID, "masters")
+            aio = get_async_sheets_client()
+            masters = await aio.read_sheet(cfg.SPREADSHEET_ID, "masters")
             master_id = None
             for m in masters:
                 if m.get("active", "").lower() in ("yes", "true"):
@@ -175,7 +174,8 @@ async def process_confirmation(message: Message, state: FSMContext):
             if not master_id:
                 master_id = "master_001"  # fallback
             
-            result = booking_service.create_booking(
+            result = await aio.run(
+                booking_service.create_booking,
                 client_telegram_id=message.from_user.id,
                 client_name=message.from_user.full_name,
                 client_phone=data['phone'],
@@ -264,7 +264,8 @@ async def show_my_bookings(message: Message, lang: str):
         load_env()
         cfg = Config.from_env()
         
-        bookings = await booking_service.get_user_bookings(
+        bookings = await get_async_sheets_client().run(
+            booking_service.get_user_bookings,
             user_id=message.from_user.id,
             spreadsheet_id=cfg.SPREADSHEET_ID
         )
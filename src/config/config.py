@@ -17,6 +17,28 @@ class Config:
     ENV: str
     OPENAI_API_KEY: str
     DEFAULT_SLOT_DURATION: int
+    SHEETS_POOL_SIZE: int
+    SHEETS_CACHE_TTL: float
+    SHEETS_FULL_REFRESH: float
+    SHEETS_CALL_TIMEOUT: float
+    SHEETS_WRITE_BEHIND: bool
+    SHEETS_FLUSH_INTERVAL: float
+    SHEETS_WRITE_BATCH: int
+    SHEETS_READ_CHUNK: int
+    SHEETS_QUOTA_PER_MINUTE: int
+    CALENDAR_QUOTA_PER_MINUTE: int
+    SHEETS_REPLICA_PATH: str
+    SHEETS_REPLICA_REFRESH: float
+    SHEETS_JOURNAL_PATH: str
+    SHEETS_JOURNAL_REPLAY_INTERVAL: float
+    SHEETS_JOURNAL_MAX_ATTEMPTS: int
+    STORAGE_BACKEND: str
+    STORAGE_SQLITE_PATH: str
+    ARCHIVE_INTERVAL_HOURS: float
+    ARCHIVE_BATCH: int
+    AVAILABILITY_TTL: float
+    SLOT_HOLD_SECONDS: float
+    CALENDAR_JOB_ATTEMPTS: int
 
     @staticmethod
     def from_env():
@@ -43,4 +65,26 @@ class Config:
             ENV=os.getenv("ENV", "development"),
             OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", ""),
             DEFAULT_SLOT_DURATION=int(os.getenv("DEFAULT_SLOT_DURATION", "120")),
+            SHEETS_POOL_SIZE=int(os.getenv("SHEETS_POOL_SIZE", "4")),
+            SHEETS_CACHE_TTL=float(os.getenv("SHEETS_CACHE_TTL", "30")),
+            SHEETS_FULL_REFRESH=float(os.getenv("SHEETS_FULL_REFRESH", "300")),
+            SHEETS_CALL_TIMEOUT=float(os.getenv("SHEETS_CALL_TIMEOUT", "20")),
+            SHEETS_WRITE_BEHIND=os.getenv("SHEETS_WRITE_BEHIND", "false").lower() in ("1","true","yes"),
+            SHEETS_FLUSH_INTERVAL=float(os.getenv("SHEETS_FLUSH_INTERVAL", "0.5")),
+            SHEETS_WRITE_BATCH=int(os.getenv("SHEETS_WRITE_BATCH", "50")),
+            SHEETS_READ_CHUNK=int(os.getenv("SHEETS_READ_CHUNK", "1000")),
+            SHEETS_QUOTA_PER_MINUTE=int(os.getenv("SHEETS_QUOTA_PER_MINUTE", "60")),
+            CALENDAR_QUOTA_PER_MINUTE=int(os.getenv("CALENDAR_QUOTA_PER_MINUTE", "600")),
+            SHEETS_REPLICA_PATH=os.getenv("SHEETS_REPLICA_PATH", ""),
+            SHEETS_REPLICA_REFRESH=float(os.getenv("SHEETS_REPLICA_REFRESH", "30")),
+            SHEETS_JOURNAL_PATH=to_absolute_path(os.getenv("SHEETS_JOURNAL_PATH", "")),
+            SHEETS_JOURNAL_REPLAY_INTERVAL=float(os.getenv("SHEETS_JOURNAL_REPLAY_INTERVAL", "0.5")),
+            SHEETS_JOURNAL_MAX_ATTEMPTS=int(os.getenv("SHEETS_JOURNAL_MAX_ATTEMPTS", "5")),
+            STORAGE_BACKEND=os.getenv("STORAGE_BACKEND", "sheets").strip().lower(),
+            STORAGE_SQLITE_PATH=to_absolute_path(os.getenv("STORAGE_SQLITE_PATH", "storage.sqlite3")),
+            ARCHIVE_INTERVAL_HOURS=float(os.getenv("ARCHIVE_INTERVAL_HOURS", "24")),
+            ARCHIVE_BATCH=int(os.getenv("ARCHIVE_BATCH", "500")),
+            AVAILABILITY_TTL=float(os.getenv("AVAILABILITY_TTL", "30")),
+            SLOT_HOLD_SECONDS=float(os.getenv("SLOT_HOLD_SECONDS", "300")),
+            CALENDAR_JOB_ATTEMPTS=int(os.getenv("CALENDAR_JOB_ATTEMPTS", "8")),
         )
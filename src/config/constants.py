@@ -5,3 +5,38 @@ SHEET_CLIENTS = "clients"
 SHEET_MASTERS = "masters"
 SHEET_CALENDAR = "calendar"
 SHEET_BOOKINGS = "bookings"
+
+SHEET_HEADERS = {
+    SHEET_CLIENTS: ["id", "telegram_id", "name", "phone", "email", "notes", "created_at"],
+    SHEET_MASTERS: ["id", "name", "calendar_id", "specialties", "active", "created_at"],
+    SHEET_CALENDAR: ["date", "master_id", "slot_start", "slot_end", "available", "note"],
+    SHEET_BOOKINGS: ["id", "client_id", "master_id", "date", "slot_start", "slot_end", "status", "created_at", "google_event_id", "notes"],
+}
+
+# Columns that identify a row, used to locate it for targeted updates
+SHEET_KEYS = {
+    SHEET_CLIENTS: ("id",),
+    SHEET_MASTERS: ("id",),
+    SHEET_CALENDAR: ("master_id", "date", "slot_start"),
+    SHEET_BOOKINGS: ("id",),
+    "user_languages": ("user_id",),
+}
+
+# Finished rows move out of the hot tabs into one archive tab per month,
+# e.g. bookings_archive_2026_01 (see ArchiveService)
+ARCHIVED_SHEETS = (SHEET_CALENDAR, SHEET_BOOKINGS)
+ARCHIVE_SEPARATOR = "_archive_"
+ARCHIVED_BOOKING_STATUSES = ("completed", "cancelled")
+
+# Bookings in these statuses no longer hold their time (see AvailabilityIndex)
+RELEASED_BOOKING_STATUSES = ("cancelled",)
+
+
+def archive_sheet_name(sheet_name: str, month: str) -> str:
+    """Archive tab of a hot tab for a month: ("bookings", "2026-01") -> "bookings_archive_2026_01" """
+    return f"{sheet_name}{ARCHIVE_SEPARATOR}{month.replace('-', '_')}"
+
+
+def base_sheet_name(sheet_name: str) -> str:
+    """Hot tab a range or archive tab belongs to: "bookings_archive_2026_01!A:B" -> "bookings" """
+    return sheet_name.split("!", 1)[0].split(ARCHIVE_SEPARATOR, 1)[0]
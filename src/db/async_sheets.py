@@ -0,0 +1,109 @@
+"""Asyncio facade over the blocking Google API client and repositories"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from src.db.metrics import bind_caller
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSheetsClient:
+    """
+    Runs SheetsClient calls on a bounded thread pool so a slow Google request
+    never blocks the aiogram event loop.
+
+    Every call is awaited with a timeout. Cancelling or timing out the
+    awaiting coroutine releases the handler immediately; the underlying HTTP
+    request finishes in its worker thread and its result is discarded.
+    """
+
+    def __init__(self, sheets_client, max_workers: int = 4, timeout: Optional[float] = 20.0):
+        self.sc = sheets_client
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sheets-io")
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run any blocking callable (client, repo or service method) off the event loop"""
+        loop = asyncio.get_running_loop()
+        # API calls made in the worker thread are attributed to the awaiting handler
+        future = loop.run_in_executor(self._executor, bind_caller(fn, *args, **kwargs))
+        limit = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(future, limit)
+        except asyncio.TimeoutError:
+            logger.warning("Sheets call %s timed out after %ss", getattr(fn, "__qualname__", fn), limit)
+            raise
+
+    async def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Dict[str, Any]]:
+        return await self.run(self.sc.read_sheet, spreadsheet_id, sheet_name)
+
+    async def read_sheets(self, spreadsheet_id: str, sheet_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        return await self.run(self.sc.read_sheets, spreadsheet_id, sheet_names)
+
+    async def iter_sheet(self, spreadsheet_id: str, sheet_name: str,
+                         chunk_size: Optional[int] = None) -> AsyncIterator[Any]:
+        """async for row in aio.iter_sheet(...): each page is fetched off the event loop"""
+        args = (spreadsheet_id, sheet_name) + ((chunk_size,) if chunk_size else ())
+        pages = self.sc.iter_sheet_pages(*args)
+        try:
+            while True:
+                page = await self.run(next, pages, None)
+                if page is None:
+                    return
+                for row in page:
+                    yield row
+        finally:
+            pages.close()
+
+    async def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals) -> List[Dict[str, Any]]:
+        return await self.run(self.sc.query_sheet, spreadsheet_id, sheet_name, **equals)
+
+    async def append_row(self, spreadsheet_id: str, sheet_name: str, row: List[Any]):
+        return await self.run(self.sc.append_row, spreadsheet_id, sheet_name, row)
+
+    async def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        return await self.run(self.sc.append_rows, spreadsheet_id, sheet_name, rows)
+
+    async def update_row(self, spreadsheet_id: str, sheet_name: str, row_index: int, row: List[Any]):
+        return await self.run(self.sc.update_row, spreadsheet_id, sheet_name, row_index, row)
+
+    async def update_fields(self, spreadsheet_id: str, sheet_name: str, key: Any, fields: Dict[str, Any]) -> Optional[int]:
+        return await self.run(self.sc.update_fields, spreadsheet_id, sheet_name, key, fields)
+
+    async def create_calendar_event(self, calendar_id: str, start_iso: str, end_iso: str, summary: str, description: str = "",
+                                    event_id: Optional[str] = None) -> str:
+        return await self.run(self.sc.create_calendar_event, calendar_id, start_iso, end_iso, summary, description, event_id)
+
+    async def delete_calendar_event(self, calendar_id: str, event_id: str):
+        return await self.run(self.sc.delete_calendar_event, calendar_id, event_id)
+
+    async def list_calendar_events(self, calendar_id: str, time_min: str, time_max: str) -> List[Dict[str, Any]]:
+        return await self.run(self.sc.list_calendar_events, calendar_id, time_min, time_max)
+
+    def repo(self, repo) -> "AsyncRepo":
+        """Wrap a BookingsRepo/ClientsRepo/MastersRepo/CalendarRepo"""
+        return AsyncRepo(repo, self)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncRepo:
+    """Awaitable view of a synchronous repository: repo.list_slots() -> await arepo.list_slots()"""
+
+    def __init__(self, repo, runner: AsyncSheetsClient):
+        self._repo = repo
+        self._runner = runner
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._repo, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, timeout: Optional[float] = None, **kwargs):
+            return await self._runner.run(attr, *args, timeout=timeout, **kwargs)
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,13 @@
+"""Storage backends selectable with Config.STORAGE_BACKEND"""
+from src.db.backends.base import StorageBackend
+from src.db.backends.memory import MemoryBackend
+from src.db.backends.sheets import SheetsBackend
+from src.db.backends.sqlite import SQLiteBackend
+
+BACKENDS = {
+    SheetsBackend.name: SheetsBackend,
+    MemoryBackend.name: MemoryBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+__all__ = ["BACKENDS", "MemoryBackend", "SQLiteBackend", "SheetsBackend", "StorageBackend"]
@@ -0,0 +1,281 @@
+"""Storage backend protocol and the parts shared by the local backends"""
+import re
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
+
+from src.db.records import row_values
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+class StorageBackend(Protocol):
+    """
+    What repositories and services need from the store behind the bot.
+
+    Row semantics follow Google Sheets: every tab has a header row (row 1),
+    rows come back as records keyed by header (Client/Master/Slot/Booking for
+    the known tabs, dicts otherwise) and row_index is the sheet row number
+    minus one, as update_row expects it. In updates, None leaves a cell as is.
+
+    Implementations: SheetsBackend (Google Sheets through the client pool),
+    MemoryBackend and SQLiteBackend.
+    """
+
+    def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Any]: ...
+
+    def read_sheets(self, spreadsheet_id: str, sheet_names: List[str]) -> Dict[str, List[Any]]: ...
+
+    def iter_sheet_pages(self, spreadsheet_id: str, sheet_name: str,
+                         chunk_size: Optional[int] = None) -> Iterator[List[Any]]: ...
+
+    def iter_sheet(self, spreadsheet_id: str, sheet_name: str, chunk_size: Optional[int] = None) -> Iterator[Any]: ...
+
+    def read_range(self, spreadsheet_id: str, range_a1: str) -> List[List[Any]]: ...
+
+    def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals) -> List[Any]: ...
+
+    def count_rows(self, spreadsheet_id: str, sheet_name: str) -> int: ...
+
+    def prefetch(self, spreadsheet_id: str, sheet_names: List[str]): ...
+
+    def find_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[Tuple[int, Any]]: ...
+
+    def locate_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[int]: ...
+
+    def update_fields(self, spreadsheet_id: str, sheet_name: str, key: Any, fields: Dict[str, Any]) -> Optional[int]: ...
+
+    def append_row(self, spreadsheet_id: str, sheet_name: str, row: List[Any]): ...
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]): ...
+
+    def update_row(self, spreadsheet_id: str, sheet_name: str, row_index: int, row: List[Any]): ...
+
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]): ...
+
+    def list_sheets(self, spreadsheet_id: str) -> List[str]: ...
+
+    def ensure_sheets(self, spreadsheet_id: str, headers: Dict[str, List[Any]]) -> List[str]: ...
+
+    def delete_rows(self, spreadsheet_id: str, sheet_name: str, row_indexes: List[int]) -> int: ...
+
+    def flush_writes(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None): ...
+
+    def create_calendar_event(self, calendar_id: str, start_iso: str, end_iso: str,
+                              summary: str, description: str = "", event_id: Optional[str] = None) -> str: ...
+
+    def delete_calendar_event(self, calendar_id: str, event_id: str): ...
+
+    def list_calendar_events(self, calendar_id: str, time_min: str, time_max: str) -> List[Dict[str, Any]]: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+    def close(self): ...
+
+
+def tab_name(sheet_name: str) -> str:
+    """'user_languages!A:B' -> 'user_languages'"""
+    return sheet_name.split("!", 1)[0]
+
+
+def cell(value: Any) -> str:
+    """A value as Sheets returns it after a RAW write (formatted string)"""
+    return "" if value is None else str(value)
+
+
+_A1_RE = re.compile(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+
+def _column_number(letters: str) -> int:
+    """'A' -> 1, 'Z' -> 26, 'AA' -> 27"""
+    number = 0
+    for ch in letters:
+        number = number * 26 + ord(ch) - ord("A") + 1
+    return number
+
+
+def a1_bounds(range_a1: str) -> Tuple[int, Optional[int], int, Optional[int]]:
+    """
+    (first_row, last_row, first_col, last_col), 1-based and inclusive, of an
+    A1 range: 'tab', 'tab!A:C', 'tab!A2:ZZ', 'tab!A5:ZZ10', 'tab!B3'. Open
+    ends are None. Anything else (R1C1, named ranges) raises ValueError
+    rather than being read as the whole tab.
+    """
+    if "!" not in range_a1:
+        return 1, None, 1, None
+    bounds = range_a1.split("!", 1)[1].replace("$", "").upper()
+    match = _A1_RE.match(bounds)
+    if not match or not bounds:
+        raise ValueError(f"Unsupported A1 range: {range_a1}")
+    col1, row1, col2, row2 = match.groups()
+    if col2 is None:
+        # A single cell ('B3'), column ('B') or row ('3')
+        col2, row2 = col1, row1
+    first_row, last_row = int(row1) if row1 else 1, int(row2) if row2 else None
+    first_col, last_col = _column_number(col1) if col1 else 1, _column_number(col2) if col2 else None
+    if first_row < 1 or (last_row is not None and last_row < first_row) \
+            or (last_col is not None and last_col < first_col):
+        raise ValueError(f"Unsupported A1 range: {range_a1}")
+    return first_row, last_row, first_col, last_col
+
+
+def slice_range(values: List[List[Any]], range_a1: str) -> List[List[Any]]:
+    """Cut a tab's raw values (header first, i.e. sheet row 1) to an A1 range; past the last row it is empty"""
+    first_row, last_row, first_col, last_col = a1_bounds(range_a1)
+    return [list(v[first_col - 1:last_col]) for v in values[first_row - 1:last_row]]
+
+
+def append_response(sheet_name: str, first_row: int, count: int) -> Dict[str, Any]:
+    """values.append-shaped response, so first_row_number() works on local writes too"""
+    return {"updates": {
+        "updatedRange": f"{tab_name(sheet_name)}!A{first_row}:ZZ{first_row + count - 1}",
+        "updatedRows": count,
+    }}
+
+
+class LocalBackend(ABC):
+    """
+    Base for the in-process backends. Subclasses store the rows and provide
+    the abstract sheet_header, read_sheet, read_range, query_sheet, find_row,
+    append_rows, batch_update_rows, list_sheets, ensure_sheets and
+    delete_rows; everything else is derived from those here.
+
+    A local backend is a single store: spreadsheet_id is accepted and
+    ignored. Tabs from SHEET_HEADERS exist from the start; any other tab is
+    created by its first append, which becomes the header row (as in Sheets).
+
+    Calendar events are kept in process (ids are random), so booking flows
+    run end to end without Google Calendar. Writes are applied immediately:
+    there is nothing to flush or prefetch.
+    """
+
+    name = "local"
+
+    def __init__(self, page_size: int = DEFAULT_PAGE_SIZE):
+        self.page_size = page_size
+        self._events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._events_lock = threading.Lock()
+
+    # --- implemented by subclasses ---
+
+    @abstractmethod
+    def sheet_header(self, spreadsheet_id: str, sheet_name: str) -> List[str]:
+        """Header row of a tab"""
+
+    @abstractmethod
+    def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Any]:
+        """Every data row of a tab as records"""
+
+    @abstractmethod
+    def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals) -> List[Any]:
+        """Records whose columns equal the given values"""
+
+    @abstractmethod
+    def find_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[Tuple[int, Any]]:
+        """(row_index, record) of the row with this key, None if there is none"""
+
+    @abstractmethod
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        """Append rows; the first write to an unknown tab is its header"""
+
+    @abstractmethod
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        """Write rows by row_index; None cells keep their value"""
+
+    @abstractmethod
+    def read_range(self, spreadsheet_id: str, range_a1: str) -> List[List[Any]]:
+        """Raw cell values of an A1 range, header row included when in range"""
+
+    @abstractmethod
+    def list_sheets(self, spreadsheet_id: str) -> List[str]:
+        """Names of all tabs"""
+
+    @abstractmethod
+    def ensure_sheets(self, spreadsheet_id: str, headers: Dict[str, List[Any]]) -> List[str]:
+        """Create the missing tabs with their headers; the names created"""
+
+    @abstractmethod
+    def delete_rows(self, spreadsheet_id: str, sheet_name: str, row_indexes: List[int]) -> int:
+        """Delete rows by row_index, shifting the rows below up; the count deleted"""
+
+    # --- derived ---
+
+    def create_spreadsheet_template(self, title="TattooStudio_DB") -> str:
+        # The SHEET_HEADERS tabs exist from construction; the title doubles as the id
+        return title
+
+    def read_sheets(self, spreadsheet_id: str, sheet_names: List[str]) -> Dict[str, List[Any]]:
+        return {name: self.read_sheet(spreadsheet_id, name) for name in sheet_names}
+
+    def iter_sheet_pages(self, spreadsheet_id: str, sheet_name: str,
+                         chunk_size: Optional[int] = None) -> Iterator[List[Any]]:
+        chunk_size = chunk_size or self.page_size
+        rows = self.read_sheet(spreadsheet_id, sheet_name)
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    def iter_sheet(self, spreadsheet_id: str, sheet_name: str, chunk_size: Optional[int] = None) -> Iterator[Any]:
+        for page in self.iter_sheet_pages(spreadsheet_id, sheet_name, chunk_size):
+            yield from page
+
+    def count_rows(self, spreadsheet_id: str, sheet_name: str) -> int:
+        return len(self.read_sheet(spreadsheet_id, sheet_name))
+
+    def prefetch(self, spreadsheet_id: str, sheet_names: List[str]):
+        pass
+
+    def flush_writes(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None):
+        pass
+
+    def locate_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[int]:
+        found = self.find_row(spreadsheet_id, sheet_name, key)
+        return found[0] if found else None
+
+    def update_fields(self, spreadsheet_id: str, sheet_name: str, key: Any, fields: Dict[str, Any]) -> Optional[int]:
+        found = self.find_row(spreadsheet_id, sheet_name, key)
+        if found is None:
+            return None
+        row_index, current = found
+        header = self.sheet_header(spreadsheet_id, sheet_name)
+        self.update_row(spreadsheet_id, sheet_name, row_index, row_values(header, current, fields))
+        return row_index
+
+    def append_row(self, spreadsheet_id: str, sheet_name: str, row: List[Any]):
+        return self.append_rows(spreadsheet_id, sheet_name, [row])
+
+    def update_row(self, spreadsheet_id: str, sheet_name: str, row_index: int, row: List[Any]):
+        return self.batch_update_rows(spreadsheet_id, sheet_name, {row_index: row})
+
+    # --- calendar ---
+
+    def create_calendar_event(self, calendar_id: str, start_iso: str, end_iso: str,
+                              summary: str, description: str = "", event_id: Optional[str] = None) -> str:
+        event_id = event_id or uuid.uuid4().hex
+        event = {
+            "id": event_id, "summary": summary, "description": description,
+            "start": {"dateTime": start_iso}, "end": {"dateTime": end_iso},
+        }
+        with self._events_lock:
+            self._events.setdefault(calendar_id, {})[event_id] = event
+        return event_id
+
+    def delete_calendar_event(self, calendar_id: str, event_id: str):
+        with self._events_lock:
+            self._events.get(calendar_id, {}).pop(event_id, None)
+        return ""
+
+    def list_calendar_events(self, calendar_id: str, time_min: str, time_max: str) -> List[Dict[str, Any]]:
+        with self._events_lock:
+            events = list(self._events.get(calendar_id, {}).values())
+        # ISO timestamps in one offset compare correctly as strings
+        events = [e for e in events if e["end"]["dateTime"] > time_min and e["start"]["dateTime"] < time_max]
+        return sorted(events, key=lambda e: e["start"]["dateTime"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._events_lock:
+            events = sum(len(e) for e in self._events.values())
+        return {"backend": self.name, "calendar_events": events}
+
+    def close(self):
+        pass
@@ -0,0 +1,178 @@
+"""Pure in-memory storage backend (benchmarks, load tests, local runs)"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.constants import SHEET_HEADERS, base_sheet_name
+from src.db.backends.base import LocalBackend, append_response, cell, slice_range, tab_name
+from src.db.records import RowDecoder
+from src.db.sheet_cache import INDEXED_COLUMNS, key_columns, normalize_key, row_key
+
+
+class _Tab:
+    """Rows of one tab: raw cell values, their records and hash indexes over the records"""
+    __slots__ = ("decoder", "values", "rows", "indexes")
+
+    def __init__(self, name: str, header: List[str]):
+        self.decoder = RowDecoder(name, header)
+        self.values: List[List[str]] = []
+        self.rows: List[Any] = []
+        self.indexes: Dict[Tuple[str, ...], Dict[Tuple[str, ...], List[int]]] = {}
+        for columns in INDEXED_COLUMNS.get(base_sheet_name(name), []):
+            self.index(columns)
+
+    def index(self, columns: Tuple[str, ...]) -> Dict[Tuple[str, ...], List[int]]:
+        index = self.indexes.get(columns)
+        if index is None:
+            index = {}
+            for pos, row in enumerate(self.rows):
+                index.setdefault(row_key(columns, row), []).append(pos)
+            self.indexes[columns] = index
+        return index
+
+    def lookup(self, equals: Dict[str, Any]) -> List[int]:
+        columns = tuple(sorted(equals))
+        return self.index(columns).get(tuple(str(equals[c]) for c in columns), [])
+
+    def append(self, values: List[str]):
+        pos = len(self.rows)
+        row = self.decoder.decode(values)
+        self.values.append(values)
+        self.rows.append(row)
+        for columns, index in self.indexes.items():
+            index.setdefault(row_key(columns, row), []).append(pos)
+
+    def put(self, pos: int, values: List[Any]):
+        """Write a row at a position; None cells keep their current value"""
+        while len(self.rows) <= pos:
+            self.append([])
+        old_values = self.values[pos]
+        merged = [
+            (old_values[i] if i < len(old_values) else "") if v is None else cell(v)
+            for i, v in enumerate(values)
+        ] + old_values[len(values):]
+        old, new = self.rows[pos], self.decoder.decode(merged)
+        self.values[pos] = merged
+        self.rows[pos] = new
+        for columns, index in self.indexes.items():
+            old_key, new_key = row_key(columns, old), row_key(columns, new)
+            if old_key == new_key:
+                continue
+            positions = index[old_key]
+            positions.remove(pos)
+            if not positions:
+                del index[old_key]
+            positions = index.setdefault(new_key, [])
+            positions.append(pos)
+            positions.sort()
+
+
+class MemoryBackend(LocalBackend):
+    """
+    Keeps every tab in process memory. Reads, indexed queries and writes
+    cost microseconds and nothing survives a restart, so the bot can be
+    run and benchmarked at full speed without Google.
+
+    seed optionally preloads tabs: {"bookings": [header, row, row, ...]}.
+    """
+
+    name = "memory"
+
+    def __init__(self, seed: Optional[Dict[str, List[List[Any]]]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._tabs: Dict[str, _Tab] = {name: _Tab(name, list(header)) for name, header in SHEET_HEADERS.items()}
+        self._lock = threading.RLock()
+        for name, values in (seed or {}).items():
+            if values:
+                self._tabs[name] = _Tab(name, [cell(h) for h in values[0]])
+                self.append_rows("", name, values[1:])
+
+    def _tab(self, sheet_name: str) -> _Tab:
+        tab = self._tabs.get(tab_name(sheet_name))
+        if tab is None:
+            raise KeyError(f"Unknown sheet: {tab_name(sheet_name)}")
+        return tab
+
+    def sheet_header(self, spreadsheet_id: str, sheet_name: str) -> List[str]:
+        with self._lock:
+            return list(self._tab(sheet_name).decoder.header)
+
+    def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Any]:
+        with self._lock:
+            return list(self._tab(sheet_name).rows)
+
+    def read_range(self, spreadsheet_id: str, range_a1: str) -> List[List[Any]]:
+        """Raw values of an A1 range; the header is sheet row 1"""
+        with self._lock:
+            tab = self._tab(range_a1)
+            return slice_range([tab.decoder.header] + tab.values, range_a1)
+
+    def count_rows(self, spreadsheet_id: str, sheet_name: str) -> int:
+        with self._lock:
+            return len(self._tab(sheet_name).rows)
+
+    def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals) -> List[Any]:
+        with self._lock:
+            tab = self._tab(sheet_name)
+            if not equals:
+                return list(tab.rows)
+            return [tab.rows[pos] for pos in tab.lookup(equals)]
+
+    def find_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[Tuple[int, Any]]:
+        with self._lock:
+            tab = self._tab(sheet_name)
+            positions = tab.lookup(dict(zip(key_columns(sheet_name), normalize_key(key))))
+            if not positions:
+                return None
+            return positions[0] + 1, tab.rows[positions[0]]
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        name = tab_name(sheet_name)
+        with self._lock:
+            if name not in self._tabs and rows:
+                # The first write to a new tab is its header row
+                self._tabs[name] = _Tab(name, [cell(v) for v in rows[0]])
+                first, data = 1, rows[1:]
+            else:
+                first, data = None, rows
+            tab = self._tab(name)
+            if first is None:
+                first = len(tab.rows) + 2
+            for row in data:
+                tab.append([cell(v) for v in row])
+        return append_response(name, first, len(rows))
+
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        with self._lock:
+            tab = self._tab(sheet_name)
+            for row_index, values in updates.items():
+                tab.put(row_index - 1, values)
+        return {"totalUpdatedRows": len(updates)}
+
+    def list_sheets(self, spreadsheet_id: str) -> List[str]:
+        with self._lock:
+            return list(self._tabs)
+
+    def ensure_sheets(self, spreadsheet_id: str, headers: Dict[str, List[Any]]) -> List[str]:
+        with self._lock:
+            missing = [name for name in headers if name not in self._tabs]
+            for name in missing:
+                self._tabs[name] = _Tab(name, [cell(h) for h in headers[name]])
+        return missing
+
+    def delete_rows(self, spreadsheet_id: str, sheet_name: str, row_indexes: List[int]) -> int:
+        name = tab_name(sheet_name)
+        with self._lock:
+            old = self._tab(name)
+            dropped = {i - 1 for i in row_indexes if 1 <= i <= len(old.rows)}
+            tab = _Tab(name, old.decoder.header)
+            for pos, values in enumerate(old.values):
+                if pos not in dropped:
+                    tab.append(values)
+            self._tabs[name] = tab
+        return len(dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats["rows"] = {name: len(tab.rows) for name, tab in self._tabs.items()}
+        return stats
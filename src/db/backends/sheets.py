@@ -0,0 +1,13 @@
+"""Google Sheets storage backend"""
+from src.db.sheets_pool import SheetsClientPool
+
+
+class SheetsBackend(SheetsClientPool):
+    """
+    The production backend: Google Sheets and Calendar through the shared
+    client pool, with its cache, write-behind queue and optional SQLite
+    replica. SheetsClientPool already implements StorageBackend; this name
+    exists so the backends can be selected side by side.
+    """
+
+    name = "sheets"
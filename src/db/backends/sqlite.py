@@ -0,0 +1,262 @@
+"""SQLite storage backend: a durable local store with the Sheets row model"""
+import bisect
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.config.constants import SHEET_HEADERS, base_sheet_name
+from src.db.backends.base import LocalBackend, a1_bounds, append_response, cell, tab_name
+from src.db.records import RowDecoder
+from src.db.sheet_cache import INDEXED_COLUMNS, key_columns, normalize_key
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _columns(header: Sequence[str]) -> List[str]:
+    """Table column per header cell; blank or repeated names get a positional one"""
+    columns, seen = [], set()
+    for i, name in enumerate(header):
+        name = name if name and name not in seen and not name.startswith("_") else f"col{i + 1}"
+        seen.add(name)
+        columns.append(name)
+    return columns
+
+
+class SQLiteBackend(LocalBackend):
+    """
+    Stores every tab as a SQLite table: one TEXT column per header cell plus
+    `_row`, the sheet row number (header is row 1), so row_index values mean
+    the same as in Sheets. Key columns (SHEET_KEYS) and INDEXED_COLUMNS get
+    SQLite indexes, so query_sheet and find_row never scan.
+
+    Unlike SheetsReplica this is the primary store, not a mirror: nothing is
+    pulled from or pushed to Google.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "storage.sqlite3", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._headers: Dict[str, List[str]] = {}
+        self._decoders: Dict[str, RowDecoder] = {}
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS _tabs (sheet TEXT PRIMARY KEY, header TEXT)")
+            for sheet, header in self._conn.execute("SELECT sheet, header FROM _tabs").fetchall():
+                self._register(sheet, json.loads(header))
+            for sheet, header in SHEET_HEADERS.items():
+                if sheet not in self._headers:
+                    self._create_tab(sheet, list(header))
+                else:
+                    self._add_columns(sheet, [c for c in header if c not in self._headers[sheet]])
+
+    # --- schema ---
+
+    def _register(self, sheet: str, header: List[str]):
+        self._headers[sheet] = header
+        self._decoders[sheet] = RowDecoder(sheet, header)
+
+    def _create_tab(self, sheet: str, header: List[str]):
+        columns = _columns(header)
+        defs = ", ".join(f"{_quote(c)} TEXT NOT NULL DEFAULT ''" for c in columns)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(sheet)} (_row INTEGER PRIMARY KEY, {defs})")
+        indexed = list(INDEXED_COLUMNS.get(base_sheet_name(sheet), []))
+        if all(c in header for c in key_columns(sheet)):
+            indexed.append(key_columns(sheet))
+        for index_cols in dict.fromkeys(indexed):
+            on = ", ".join(_quote(columns[header.index(c)]) for c in index_cols)
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote('ix_' + sheet + '_' + '_'.join(index_cols))} "
+                f"ON {_quote(sheet)} ({on})"
+            )
+        self._conn.execute("INSERT OR REPLACE INTO _tabs (sheet, header) VALUES (?, ?)", (sheet, json.dumps(header)))
+        self._register(sheet, header)
+
+    def _add_columns(self, sheet: str, names: List[str]):
+        """Columns added to SHEET_HEADERS since the file was created go after the existing ones"""
+        if not names:
+            return
+        header = self._headers[sheet] + names
+        for column in _columns(header)[-len(names):]:
+            self._conn.execute(f"ALTER TABLE {_quote(sheet)} ADD COLUMN {_quote(column)} TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("INSERT OR REPLACE INTO _tabs (sheet, header) VALUES (?, ?)", (sheet, json.dumps(header)))
+        self._register(sheet, header)
+
+    def _header(self, sheet_name: str) -> List[str]:
+        header = self._headers.get(tab_name(sheet_name))
+        if header is None:
+            raise KeyError(f"Unknown sheet: {tab_name(sheet_name)}")
+        return header
+
+    def _where(self, header: List[str], equals: Dict[str, Any]) -> Optional[Tuple[str, List[str]]]:
+        """WHERE clause for column equality; None if it cannot match any row"""
+        columns = _columns(header)
+        clauses, params = [], []
+        for name, value in equals.items():
+            if name in header:
+                clauses.append(f"{_quote(columns[header.index(name)])} = ?")
+                params.append(cell(value))
+            elif cell(value) != "":
+                # Missing columns read as "" (same as SheetsClient.query_sheet)
+                return None
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _select(self, sheet: str, where: str = "", params: Sequence[Any] = (), limit: str = "") -> List[Tuple]:
+        columns = ", ".join(_quote(c) for c in _columns(self._headers[sheet]))
+        return self._conn.execute(
+            f"SELECT _row, {columns} FROM {_quote(sheet)}{where} ORDER BY _row{limit}", list(params)
+        ).fetchall()
+
+    # --- reads ---
+
+    def sheet_header(self, spreadsheet_id: str, sheet_name: str) -> List[str]:
+        with self._lock:
+            return list(self._header(sheet_name))
+
+    def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Any]:
+        return self.query_sheet(spreadsheet_id, sheet_name)
+
+    def read_range(self, spreadsheet_id: str, range_a1: str) -> List[List[Any]]:
+        """Raw values of an A1 range; the header is sheet row 1"""
+        sheet = tab_name(range_a1)
+        with self._lock:
+            header = self._header(sheet)
+            first_row, last_row, first_col, last_col = a1_bounds(range_a1)
+            # Row bounds go to SQLite, so a page reads only its own rows
+            where, params = " WHERE _row >= ?", [max(first_row, 2)]
+            if last_row is not None:
+                where += " AND _row <= ?"
+                params.append(last_row)
+            values = [list(header)] if first_row == 1 else []
+            values += [list(r[1:]) for r in self._select(sheet, where, params)]
+            return [v[first_col - 1:last_col] for v in values]
+
+    def count_rows(self, spreadsheet_id: str, sheet_name: str) -> int:
+        sheet = tab_name(sheet_name)
+        with self._lock:
+            self._header(sheet)
+            return self._conn.execute(f"SELECT COUNT(*) FROM {_quote(sheet)}").fetchone()[0]
+
+    def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals) -> List[Any]:
+        sheet = tab_name(sheet_name)
+        with self._lock:
+            where = self._where(self._header(sheet), equals)
+            if where is None:
+                return []
+            decoder = self._decoders[sheet]
+            return [decoder.decode(r[1:]) for r in self._select(sheet, *where)]
+
+    def find_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[Tuple[int, Any]]:
+        sheet = tab_name(sheet_name)
+        with self._lock:
+            where = self._where(self._header(sheet), dict(zip(key_columns(sheet), normalize_key(key))))
+            rows = self._select(sheet, *where, limit=" LIMIT 1") if where is not None else []
+            if not rows:
+                return None
+            return rows[0][0] - 1, self._decoders[sheet].decode(rows[0][1:])
+
+    # --- writes ---
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        sheet = tab_name(sheet_name)
+        with self._lock, self._conn:
+            first, data = None, rows
+            if sheet not in self._headers and rows:
+                # The first write to a new tab is its header row
+                self._create_tab(sheet, [cell(v) for v in rows[0]])
+                first, data = 1, rows[1:]
+            header = self._header(sheet)
+            last = self._conn.execute(f"SELECT COALESCE(MAX(_row), 1) FROM {_quote(sheet)}").fetchone()[0]
+            if first is None:
+                first = last + 1
+            self._insert(sheet, header, [(last + 1 + i, row) for i, row in enumerate(data)])
+        return append_response(sheet, first, len(rows))
+
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        sheet = tab_name(sheet_name)
+        with self._lock, self._conn:
+            header = self._header(sheet)
+            columns = _columns(header)
+            for row_index, values in updates.items():
+                values = values[:len(header)]
+                sets = [(columns[i], cell(v)) for i, v in enumerate(values) if v is not None]
+                changed = 1
+                if sets:
+                    changed = self._conn.execute(
+                        f"UPDATE {_quote(sheet)} SET {', '.join(_quote(c) + ' = ?' for c, _ in sets)} WHERE _row = ?",
+                        [v for _, v in sets] + [row_index + 1],
+                    ).rowcount
+                if changed == 0 or not sets:
+                    self._pad_and_insert(sheet, header, row_index + 1, values)
+        return {"totalUpdatedRows": len(updates)}
+
+    def _pad_and_insert(self, sheet: str, header: List[str], row_number: int, values: List[Any]):
+        """Write a row past the end (Sheets leaves the rows in between blank)"""
+        last = self._conn.execute(f"SELECT COALESCE(MAX(_row), 1) FROM {_quote(sheet)}").fetchone()[0]
+        if row_number <= last:
+            if self._conn.execute(f"SELECT 1 FROM {_quote(sheet)} WHERE _row = ?", (row_number,)).fetchone():
+                return
+            self._insert(sheet, header, [(row_number, values)])
+            return
+        blanks = [(n, []) for n in range(last + 1, row_number)]
+        self._insert(sheet, header, blanks + [(row_number, values)])
+
+    def _insert(self, sheet: str, header: List[str], rows: List[Tuple[int, List[Any]]]):
+        columns = ["_row"] + _columns(header)
+        width = len(header)
+        self._conn.executemany(
+            f"INSERT INTO {_quote(sheet)} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            [[n] + [cell(v) for v in row[:width]] + [""] * (width - len(row)) for n, row in rows],
+        )
+
+    def list_sheets(self, spreadsheet_id: str) -> List[str]:
+        with self._lock:
+            return list(self._headers)
+
+    def ensure_sheets(self, spreadsheet_id: str, headers: Dict[str, List[Any]]) -> List[str]:
+        with self._lock, self._conn:
+            missing = [name for name in headers if name not in self._headers]
+            for name in missing:
+                self._create_tab(name, [cell(h) for h in headers[name]])
+        return missing
+
+    def delete_rows(self, spreadsheet_id: str, sheet_name: str, row_indexes: List[int]) -> int:
+        sheet = tab_name(sheet_name)
+        numbers = sorted({i + 1 for i in row_indexes if i >= 1})
+        if not numbers:
+            return 0
+        with self._lock, self._conn:
+            self._header(sheet)
+            table = _quote(sheet)
+            deleted = self._conn.executemany(f"DELETE FROM {table} WHERE _row = ?", [(n,) for n in numbers]).rowcount
+            # Rows below move up, as in Sheets (ascending, so every target number is free)
+            remaining = [r[0] for r in self._conn.execute(
+                f"SELECT _row FROM {table} WHERE _row > ? ORDER BY _row", (numbers[0],))]
+            self._conn.executemany(
+                f"UPDATE {table} SET _row = ? WHERE _row = ?",
+                [(n - bisect.bisect_left(numbers, n), n) for n in remaining],
+            )
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats["path"] = self.path
+            stats["rows"] = {
+                sheet: self._conn.execute(f"SELECT COUNT(*) FROM {_quote(sheet)}").fetchone()[0]
+                for sheet in self._headers
+            }
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
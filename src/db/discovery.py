@@ -0,0 +1,52 @@
+"""Process-wide cache of parsed Google API discovery documents"""
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+logger = logging.getLogger(__name__)
+
+# API versions the bot is pinned to; the documents ship inside the pinned
+# google-api-python-client release, so they are versioned with requirements.txt
+API_VERSIONS = {
+    "sheets": "v4",
+    "calendar": "v3",
+}
+
+_documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def get_discovery_document(api: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Parsed discovery document, read from the bundled cache once per process"""
+    version = version or API_VERSIONS[api]
+    key = (api, version)
+    doc = _documents.get(key)
+    if doc is None:
+        with _lock:
+            doc = _documents.get(key)
+            if doc is None:
+                raw = get_static_doc(api, version)
+                if raw is None:
+                    logger.warning("No bundled discovery document for %s %s", api, version)
+                    return None
+                doc = _documents[key] = json.loads(raw)
+    return doc
+
+
+def build_service(api: str, credentials, version: Optional[str] = None):
+    """Build a service object from the cached document (falls back to build())"""
+    version = version or API_VERSIONS[api]
+    doc = get_discovery_document(api, version)
+    if doc is None:
+        return build(api, version, credentials=credentials)
+    return build_from_document(doc, credentials=credentials)
+
+
+def preload_discovery_documents():
+    """Parse every pinned document up front (e.g. at pool start-up)"""
+    for api, version in API_VERSIONS.items():
+        get_discovery_document(api, version)
@@ -0,0 +1,492 @@
+"""Durable write-ahead journal for row mutations, replayed to the backend in the background"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
+
+from src.config.constants import SHEET_BOOKINGS, SHEET_CALENDAR, SHEET_CLIENTS, SHEET_HEADERS, base_sheet_name
+from src.db.rate_limit import SERVER_ERROR_STATUS, THROTTLED_STATUS
+from src.db.sheet_cache import key_columns, normalize_key, row_key
+from src.db.write_queue import first_row_number
+
+logger = logging.getLogger(__name__)
+
+# Tabs whose repository writes (ClientsRepo, CalendarRepo, BookingsRepo) go through the journal
+JOURNALED_SHEETS = (SHEET_CLIENTS, SHEET_CALENDAR, SHEET_BOOKINGS)
+
+# Request timeout, throttling and server errors; every other 4xx fails the same way again
+_RETRYABLE_STATUS = {408, THROTTLED_STATUS} | SERVER_ERROR_STATUS
+
+# Expired or revoked credentials: worth one token refresh before it counts as permanent
+UNAUTHORIZED_STATUS = 401
+
+
+def _status(error: Exception) -> Optional[int]:
+    return getattr(error.resp, "status", None) if isinstance(error, HttpError) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed write may succeed unchanged later (outage, quota), as opposed to never"""
+    if isinstance(error, HttpError):
+        return _status(error) in _RETRYABLE_STATUS
+    return isinstance(error, (OSError, HttpLib2Error))
+
+
+class WriteJournal:
+    """
+    Append-only JSON-lines file of mutations. record() returns only after
+    the entry is fsynced; ack() marks an entry as applied. Entries without
+    an ack are pending and survive restarts.
+
+    Every entry has an idempotency key. Entries found pending when the
+    journal is opened may already have been applied just before a crash, so
+    they are flagged "recovered" and checked against the backend before
+    they are applied again.
+
+    Entries that can never be applied are moved by dead_letter() to a
+    separate file (dead_letter_path, default path + ".dead"), with the error.
+    """
+
+    def __init__(self, path: str, fsync: bool = True, compact_after: int = 1000,
+                 dead_letter_path: Optional[str] = None):
+        self.path = path
+        self.dead_letter_path = dead_letter_path or path + ".dead"
+        self.fsync = fsync
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._acked_since_compact = 0
+        self.recorded = 0
+        self.acked = 0
+        self.dead_lettered = 0
+        torn = self._load()
+        self._file = open(path, "a", encoding="utf-8")
+        if torn:
+            # Rewrite so the next entry does not land on the end of the broken line
+            self._compact()
+
+    def _load(self) -> bool:
+        """Read pending entries back; True if an unreadable line was skipped"""
+        torn = False
+        if not os.path.exists(self.path):
+            return torn
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write: that write was never acknowledged
+                    logger.warning("Skipping unreadable journal line in %s", self.path)
+                    torn = True
+                    continue
+                if "ack" in entry:
+                    self._pending.pop(entry["ack"], None)
+                else:
+                    entry["recovered"] = True
+                    self._pending[entry["key"]] = entry
+        if self._pending:
+            logger.info("Journal %s: %s unapplied writes to replay", self.path, len(self._pending))
+        return torn
+
+    def _write(self, entry: Dict[str, Any], sync: bool):
+        self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        if sync and self.fsync:
+            os.fsync(self._file.fileno())
+
+    def record(self, op: str, spreadsheet_id: str, sheet_name: str, **data) -> Dict[str, Any]:
+        """Durably log a mutation; returns the entry (with its idempotency key)"""
+        entry = {"key": uuid.uuid4().hex, "op": op, "sid": spreadsheet_id, "sheet": sheet_name,
+                 "ts": time.time(), **data}
+        with self._lock:
+            self._write(entry, sync=True)
+            self._pending[entry["key"]] = entry
+            self.recorded += 1
+        return entry
+
+    def ack(self, key: str):
+        """Mark an entry applied (not fsynced: losing an ack only means a checked re-apply)"""
+        with self._lock:
+            if self._pending.pop(key, None) is None:
+                return
+            self._write({"ack": key}, sync=False)
+            self.acked += 1
+            self._acked_since_compact += 1
+            if self._acked_since_compact >= self.compact_after:
+                self._compact()
+
+    def dead_letter(self, key: str, error: str):
+        """Move an entry that cannot be applied to the dead-letter file and drop it from the journal"""
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            if entry is None:
+                return
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({**entry, "error": error, "dead_at": time.time()},
+                                   ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self._write({"ack": key}, sync=True)
+            self.dead_lettered += 1
+
+    def _compact(self):
+        """Rewrite the file with just the pending entries (atomic replace)"""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self._pending.values():
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._acked_since_compact = 0
+
+    def pending(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Unapplied entries in journal order, optionally for one spreadsheet/tab"""
+        tab = sheet_name.split("!", 1)[0] if sheet_name else None
+        with self._lock:
+            return [
+                e for e in self._pending.values()
+                if (spreadsheet_id is None or e["sid"] == spreadsheet_id)
+                and (tab is None or e["sheet"].split("!", 1)[0] == tab)
+            ]
+
+    def has_pending(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None) -> bool:
+        return bool(self.pending(spreadsheet_id, sheet_name))
+
+    def close(self):
+        """Drop applied entries from the file (see compact_after) and close it"""
+        with self._lock:
+            self._compact()
+            self._file.close()
+
+
+class JournaledStorage:
+    """
+    Storage backend wrapper that makes repository writes durable before they
+    reach Google. append_row/append_rows/update_fields on JOURNALED_SHEETS
+    are fsynced to the journal and return at once (appends return a Future
+    resolving to the sheet row number); a background thread replays pending
+    entries to the wrapped backend in journal order, batching appends per
+    tab. When Sheets is slow or down, writes keep being accepted and are
+    applied once it is back.
+
+    Reads never replay: a read of a tab with pending entries wakes the
+    replay thread and is served by the backend as it is, so a journaled
+    write shows up once replayed (within about replay_interval). Writes
+    addressing rows by number (update_row, batch_update_rows, delete_rows)
+    replay first, since row numbers only hold once earlier appends landed.
+    Everything else is passed straight to the wrapped backend.
+
+    A write failing with a retryable error (see is_retryable) holds up the
+    entries behind it until it goes through. A 401 gets one credentials
+    refresh (when the backend can refresh) and is retried at once. A write
+    failing for good (any other 4xx, a missing tab) is retried max_attempts
+    times and then moved to the dead-letter file, its Future failing with
+    the error, so it cannot block the writes behind it.
+    """
+
+    def __init__(self, backend, journal: WriteJournal, replay_interval: float = 0.5,
+                 retry_delay: float = 5.0, max_batch: int = 200, max_attempts: int = 5):
+        self.backend = backend
+        self.journal = journal
+        self.replay_interval = replay_interval
+        self.retry_delay = retry_delay
+        self.max_batch = max_batch
+        self.max_attempts = max(1, max_attempts)
+        self._futures: Dict[str, Future] = {}
+        self._replay_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._replays = 0
+        self._failures = 0
+        self._last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="sheets-journal", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+    @staticmethod
+    def journaled(sheet_name: str) -> bool:
+        return sheet_name.split("!", 1)[0] in JOURNALED_SHEETS
+
+    # --- writes ---
+
+    def append_row(self, spreadsheet_id: str, sheet_name: str, row: List[Any]):
+        if not self.journaled(sheet_name):
+            self._settle(spreadsheet_id, [sheet_name])
+            return self.backend.append_row(spreadsheet_id, sheet_name, row)
+        entry = self.journal.record("append", spreadsheet_id, sheet_name, row=list(row))
+        future = self._futures[entry["key"]] = Future()
+        self._wake.set()
+        return future
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        if not self.journaled(sheet_name):
+            self._settle(spreadsheet_id, [sheet_name])
+            return self.backend.append_rows(spreadsheet_id, sheet_name, rows)
+        return [self.append_row(spreadsheet_id, sheet_name, row) for row in rows]
+
+    def update_fields(self, spreadsheet_id: str, sheet_name: str, key: Any, fields: Dict[str, Any]):
+        """
+        Journal a keyed update; returns a Future resolving to the row_index,
+        or None when the key exists neither in the backend nor in a pending append.
+        """
+        if not self.journaled(sheet_name):
+            self._settle(spreadsheet_id, [sheet_name])
+            return self.backend.update_fields(spreadsheet_id, sheet_name, key, fields)
+        if not self._pending_append(spreadsheet_id, sheet_name, key):
+            try:
+                if self.backend.find_row(spreadsheet_id, sheet_name, key) is None:
+                    return None
+            except Exception as e:
+                # Backend unreachable: accept the write, replay decides once it is back
+                logger.warning("Journaling update of %s %s without lookup: %s", sheet_name, key, e)
+        entry = self.journal.record("update", spreadsheet_id, sheet_name,
+                                    row_key=list(normalize_key(key)), fields=fields)
+        future = self._futures[entry["key"]] = Future()
+        self._wake.set()
+        return future
+
+    def update_row(self, spreadsheet_id: str, sheet_name: str, row_index: int, row: List[Any]):
+        # Row numbers are only meaningful once earlier appends have landed
+        self._settle(spreadsheet_id, [sheet_name], strict=True)
+        return self.backend.update_row(spreadsheet_id, sheet_name, row_index, row)
+
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        self._settle(spreadsheet_id, [sheet_name], strict=True)
+        return self.backend.batch_update_rows(spreadsheet_id, sheet_name, updates)
+
+    def delete_rows(self, spreadsheet_id: str, sheet_name: str, row_indexes: List[int]) -> int:
+        self._settle(spreadsheet_id, [sheet_name], strict=True)
+        return self.backend.delete_rows(spreadsheet_id, sheet_name, row_indexes)
+
+    def _pending_append(self, spreadsheet_id: str, sheet_name: str, key: Any) -> bool:
+        wanted, columns = normalize_key(key), key_columns(sheet_name)
+        header = SHEET_HEADERS.get(base_sheet_name(sheet_name), [])
+        return any(
+            e["op"] == "append" and row_key(columns, dict(zip(header, e["row"]))) == wanted
+            for e in self.journal.pending(spreadsheet_id, sheet_name)
+        )
+
+    # --- reads ---
+
+    def _settle(self, spreadsheet_id: str, sheet_names: List[str], strict: bool = False):
+        """
+        Pending entries of the tabs go out: strict replays them now (and
+        raises if that fails), otherwise the replay thread is woken and the
+        caller goes on without waiting.
+        """
+        if not any(self.journal.has_pending(spreadsheet_id, name) for name in sheet_names):
+            return
+        if strict:
+            self.replay()
+        else:
+            self._wake.set()
+
+    def read_sheet(self, spreadsheet_id: str, sheet_name: str):
+        self._settle(spreadsheet_id, [sheet_name])
+        return self.backend.read_sheet(spreadsheet_id, sheet_name)
+
+    def read_sheets(self, spreadsheet_id: str, sheet_names: List[str]):
+        self._settle(spreadsheet_id, sheet_names)
+        return self.backend.read_sheets(spreadsheet_id, sheet_names)
+
+    def read_range(self, spreadsheet_id: str, range_a1: str):
+        self._settle(spreadsheet_id, [range_a1])
+        return self.backend.read_range(spreadsheet_id, range_a1)
+
+    def iter_sheet_pages(self, spreadsheet_id: str, sheet_name: str, chunk_size: Optional[int] = None):
+        self._settle(spreadsheet_id, [sheet_name])
+        return self.backend.iter_sheet_pages(spreadsheet_id, sheet_name, chunk_size)
+
+    def iter_sheet(self, spreadsheet_id: str, sheet_name: str, chunk_size: Optional[int] = None):
+        self._settle(spreadsheet_id, [sheet_name])
+        return self.backend.iter_sheet(spreadsheet_id, sheet_name, chunk_size)
+
+    def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals):
+        self._settle(spreadsheet_id, [sheet_name])
+        return self.backend.query_sheet(spreadsheet_id, sheet_name, **equals)
+
+    def count_rows(self, spreadsheet_id: str, sheet_name: str) -> int:
+        self._settle(spreadsheet_id, [sheet_name])
+        return self.backend.count_rows(spreadsheet_id, sheet_name)
+
+    def prefetch(self, spreadsheet_id: str, sheet_names: List[str]):
+        self._settle(spreadsheet_id, sheet_names)
+        return self.backend.prefetch(spreadsheet_id, sheet_names)
+
+    def find_row(self, spreadsheet_id: str, sheet_name: str, key: Any):
+        self._settle(spreadsheet_id, [sheet_name])
+        return self.backend.find_row(spreadsheet_id, sheet_name, key)
+
+    def locate_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[int]:
+        found = self.find_row(spreadsheet_id, sheet_name, key)
+        return found[0] if found else None
+
+    # --- replay ---
+
+    def replay(self) -> int:
+        """
+        Apply pending entries in journal order; returns how many were applied.
+        Appends are sent per tab in one append_rows; an update first sends the
+        appends queued before it. Stops at the first failure (order is kept),
+        except for entries dead-lettered after max_attempts permanent failures.
+        """
+        with self._replay_lock:
+            entries = self.journal.pending()
+            if not entries:
+                return 0
+            self._replays += 1
+            applied = 0
+            appends: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+            try:
+                for entry in entries:
+                    tab = (entry["sid"], entry["sheet"].split("!", 1)[0])
+                    if entry["op"] == "append":
+                        appends.setdefault(tab, []).append(entry)
+                        if len(appends[tab]) >= self.max_batch:
+                            applied += self._appends_guarded(tab, appends.pop(tab))
+                    else:
+                        if tab in appends:
+                            applied += self._appends_guarded(tab, appends.pop(tab))
+                        applied += self._guarded(entry, lambda: self._apply_update(entry))
+                for tab, batch in appends.items():
+                    applied += self._appends_guarded(tab, batch)
+            except Exception as e:
+                self._failures += 1
+                self._last_error = str(e)
+                self._retry_at = time.monotonic() + self.retry_delay
+                logger.warning("Journal replay stopped after %s writes: %s", applied, e)
+                raise
+            self._retry_at = 0.0
+            return applied
+
+    def _appends_guarded(self, tab: Tuple[str, str], entries: List[Dict[str, Any]]) -> int:
+        """Apply a batch of appends; if it fails for good, row by row to find the bad one"""
+        if len(entries) == 1:
+            return self._guarded(entries[0], lambda: self._apply_appends(tab, entries))
+        try:
+            return self._apply_appends(tab, entries)
+        except Exception as e:
+            if is_retryable(e):
+                raise
+        return sum(self._appends_guarded(tab, [entry]) for entry in entries)
+
+    def _guarded(self, entry: Dict[str, Any], apply: Callable[[], int]) -> int:
+        """Run apply(); dead-letter the entry instead of raising once it has failed for good max_attempts times"""
+        try:
+            return apply()
+        except Exception as e:
+            if is_retryable(e):
+                raise
+            if _status(e) == UNAUTHORIZED_STATUS and not entry.get("reauthorized"):
+                entry["reauthorized"] = True
+                refresh = getattr(self.backend, "refresh_credentials", None)
+                if refresh is not None and refresh():
+                    return self._guarded(entry, apply)
+            entry["attempts"] = entry.get("attempts", 0) + 1
+            if entry["attempts"] < self.max_attempts:
+                raise
+            logger.error("Journaled %s to %s failed %s times, moved to %s: %s", entry["op"], entry["sheet"],
+                         entry["attempts"], self.journal.dead_letter_path, e)
+            self.journal.dead_letter(entry["key"], str(e))
+            future = self._futures.pop(entry["key"], None)
+            if future is not None and not future.done():
+                future.set_exception(e)
+            return 0
+
+    def _apply_appends(self, tab: Tuple[str, str], entries: List[Dict[str, Any]]) -> int:
+        spreadsheet_id, sheet_name = tab
+        todo = [e for e in entries if not (e.get("recovered") and self._already_applied(e))]
+        start = None
+        if todo:
+            start = first_row_number(self.backend.append_rows(spreadsheet_id, sheet_name, [e["row"] for e in todo]))
+        for i, entry in enumerate(todo):
+            self._settle_future(entry["key"], start + i if start is not None else None)
+        for entry in entries:
+            if entry not in todo:
+                self._settle_future(entry["key"], None)
+        for entry in entries:
+            self.journal.ack(entry["key"])
+        return len(entries)
+
+    def _already_applied(self, entry: Dict[str, Any]) -> bool:
+        """Idempotency check for appends replayed after a restart: is the row's key already there?"""
+        header = SHEET_HEADERS.get(base_sheet_name(entry["sheet"]))
+        if header is None:
+            return False
+        key = row_key(key_columns(entry["sheet"]), dict(zip(header, entry["row"])))
+        return self.backend.find_row(entry["sid"], entry["sheet"], key) is not None
+
+    def _apply_update(self, entry: Dict[str, Any]) -> int:
+        row_index = self.backend.update_fields(entry["sid"], entry["sheet"], tuple(entry["row_key"]), entry["fields"])
+        if isinstance(row_index, Future):
+            row_index = row_index.result()
+        if row_index is None:
+            logger.warning("Journaled update of %s %s: row not found, dropped", entry["sheet"], entry["row_key"])
+        self._settle_future(entry["key"], row_index)
+        self.journal.ack(entry["key"])
+        return 1
+
+    def _settle_future(self, key: str, result: Any):
+        future = self._futures.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.replay_interval)
+            self._wake.clear()
+            if self._stop.is_set() or time.monotonic() < self._retry_at or not self.journal.has_pending():
+                continue
+            try:
+                self.replay()
+            except Exception:
+                pass  # logged by replay(); retried after retry_delay
+
+    # --- lifecycle ---
+
+    def flush_writes(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None):
+        """Apply journaled and buffered writes now"""
+        if self.journal.has_pending(spreadsheet_id, sheet_name):
+            self.replay()
+        self.backend.flush_writes(spreadsheet_id, sheet_name)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.backend.stats())
+        stats["journal"] = {
+            "path": self.journal.path,
+            "pending": len(self.journal.pending()),
+            "recorded": self.journal.recorded,
+            "applied": self.journal.acked,
+            "dead_lettered": self.journal.dead_lettered,
+            "replays": self._replays,
+            "replay_failures": self._failures,
+            "last_error": self._last_error,
+        }
+        return stats
+
+    def close(self):
+        """Stop replaying, try a last replay, close the journal and the backend"""
+        self._stop.set()
+        self._wake.set()
+        self._worker.join(timeout=self.replay_interval * 2 + 1)
+        try:
+            self.replay()
+        except Exception as e:
+            logger.warning("Journal not fully replayed at shutdown (kept for next start): %s", e)
+        self.journal.close()
+        self.backend.close()
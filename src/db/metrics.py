@@ -0,0 +1,236 @@
+"""In-process registry of Google API calls: who calls what, how often, how slow"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial, wraps
+from typing import Any, Dict, List, Optional, Tuple
+
+# Latency histogram bucket upper bounds, milliseconds (the last bucket is open)
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_DB_DIR = os.path.join(_SRC_DIR, "db") + os.sep
+
+# Explicit label (call_site/tracked) and the site that handed work to a worker thread
+_site: ContextVar[Optional[str]] = ContextVar("api_call_site", default=None)
+_origin: ContextVar[Optional[str]] = ContextVar("api_call_origin", default=None)
+
+Key = Tuple[str, str, str, str]
+
+
+class CallStats:
+    """Aggregates for one (api, method, tab, call site)"""
+    __slots__ = ("calls", "errors", "retries", "bytes_sent", "bytes_received", "seconds", "max_seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, seconds: float, retries: int, bytes_sent: int, bytes_received: int, error: bool):
+        self.calls += 1
+        self.errors += int(error)
+        self.retries += retries
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        ms = seconds * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the q-th quantile; None if it is the open bucket"""
+        rank = q * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "total_ms": round(self.seconds * 1000, 1),
+            "avg_ms": round(self.seconds * 1000 / self.calls, 1) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 1),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "histogram_ms": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["inf"], self.buckets)),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe CallStats per (api, method, tab, call site)"""
+
+    def __init__(self):
+        self._stats: Dict[Key, CallStats] = {}
+        self._lock = threading.Lock()
+        self.since = time.time()
+
+    def record(self, api: str, method: str, tab: str, site: str, seconds: float, retries: int = 0,
+               bytes_sent: int = 0, bytes_received: int = 0, error: bool = False):
+        key = (api, method, tab, site)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = CallStats()
+            stats.add(seconds, retries, bytes_sent, bytes_received, error)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """One dict per key, slowest total first"""
+        with self._lock:
+            items = [(key, stats.to_dict()) for key, stats in self._stats.items()]
+        rows = [dict(api=k[0], method=k[1], tab=k[2], site=k[3], **s) for k, s in items]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def by(self, field: str) -> Dict[str, Dict[str, Any]]:
+        """Totals grouped by one of api/method/tab/site, slowest total first"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for row in self.snapshot():
+            group = totals.setdefault(row[field], {"calls": 0, "errors": 0, "retries": 0,
+                                                   "bytes_received": 0, "total_ms": 0.0})
+            for name in group:
+                group[name] += row[name]
+        return dict(sorted(totals.items(), key=lambda kv: kv[1]["total_ms"], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.since = time.time()
+
+    def report(self, limit: int = 15) -> str:
+        """Plain-text summary of the hottest call sites (for the /api_stats admin command)"""
+        rows = self.snapshot()
+        minutes = max((time.time() - self.since) / 60, 1e-9)
+        calls = sum(r["calls"] for r in rows)
+        lines = [f"Google API calls: {calls} in {minutes:.1f} min ({calls / minutes:.1f}/min)"]
+        for api, group in self.by("api").items():
+            lines.append(f"  {api}: {group['calls']} calls, {group['retries']} retries, "
+                         f"{group['errors']} errors, {group['bytes_received'] // 1024} KiB in")
+        if rows:
+            lines.append("")
+            lines.append("Hottest call sites (total time):")
+        for r in rows[:limit]:
+            p95 = f"{r['p95_ms']}ms" if r["p95_ms"] is not None else f">{LATENCY_BUCKETS_MS[-1]}ms"
+            lines.append(
+                f"• {r['site']}\n"
+                f"  {r['method']} [{r['tab']}] x{r['calls']} total {r['total_ms']:.0f}ms "
+                f"avg {r['avg_ms']:.0f}ms p95 {p95} retries {r['retries']} "
+                f"{r['bytes_received'] // 1024} KiB"
+            )
+        return "\n".join(lines)
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+# --- call sites ---
+
+@contextmanager
+def call_site(name: str):
+    """Attribute API calls made inside the block to name"""
+    token = _site.set(name)
+    try:
+        yield
+    finally:
+        _site.reset(token)
+
+
+def tracked(name: str):
+    """Decorator form of call_site"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with call_site(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def caller_site(skip: int = 1) -> Optional[str]:
+    """
+    'module.function' of the nearest caller in application code: the first
+    frame under src/ that is not part of the db layer itself.
+    """
+    frame = sys._getframe(skip)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_SRC_DIR) and not filename.startswith(_DB_DIR):
+            module = frame.f_globals.get("__name__", "?")
+            if module.startswith("src."):
+                module = module[4:]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def current_site() -> str:
+    """
+    Label for the API call being made now: an explicit call_site label, else
+    the application frame on this thread's stack, else the coroutine that
+    handed the work to this thread (see bind_caller), else the thread name.
+    """
+    return (_site.get() or caller_site(2) or _origin.get()
+            or f"thread:{threading.current_thread().name}")
+
+
+def bind_caller(fn, *args, **kwargs):
+    """fn(*args, **kwargs) bound to a copy of this context that remembers the calling site"""
+    ctx = copy_context()
+    site = caller_site(2)
+    if site is not None:
+        ctx.run(_origin.set, site)
+    return partial(ctx.run, fn, *args, **kwargs)
+
+
+# --- recording ---
+
+class ApiCall:
+    """Measures one request.execute() including its retries (see execute_with_retry)"""
+    __slots__ = ("api", "method", "tab", "site", "started", "bytes_sent", "bytes_received")
+
+    def __init__(self, api: str, request, tab: Optional[str] = None):
+        self.api = api
+        method = getattr(request, "methodId", None)
+        self.method = method if isinstance(method, str) else type(request).__name__
+        self.tab = tab or "-"
+        self.site = current_site()
+        self.started = time.perf_counter()
+        body = getattr(request, "body", None)
+        self.bytes_sent = len(body) if isinstance(body, (str, bytes)) else 0
+        self.bytes_received = 0
+        # Count the raw response bytes before the client parses them
+        postproc = getattr(request, "postproc", None)
+        if callable(postproc):
+            def measured(resp, content):
+                self.bytes_received += len(content or b"")
+                return postproc(resp, content)
+            request.postproc = measured
+
+    def finish(self, retries: int = 0, error: bool = False):
+        _registry.record(
+            self.api, self.method, self.tab, self.site, time.perf_counter() - self.started,
+            retries=retries, bytes_sent=self.bytes_sent, bytes_received=self.bytes_received, error=error,
+        )
@@ -0,0 +1,163 @@
+"""Quota-aware rate limiting and retry with backoff for Google API requests"""
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+from src.db.metrics import ApiCall
+
+logger = logging.getLogger(__name__)
+
+# 429 is always safe to retry (the request was rejected before running);
+# 5xx may have been applied, so only idempotent requests retry on those.
+THROTTLED_STATUS = 429
+SERVER_ERROR_STATUS = {500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Take tokens, sleeping until they are available; False if timeout elapses first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += 1
+                    if waited:
+                        self.waits += 1
+                    return True
+                delay = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + delay > deadline:
+                return False
+            waited = True
+            time.sleep(delay)
+            with self._lock:
+                self.wait_seconds += delay
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class QuotaLimiter:
+    """Token bucket sized to a per-minute quota, plus retry counters for that API"""
+
+    def __init__(self, name: str, per_minute: int):
+        self.name = name
+        self.per_minute = per_minute
+        self.bucket = TokenBucket(rate=per_minute / 60.0, capacity=max(1.0, per_minute / 6.0))
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    def count(self, counter: str):
+        """Bump throttled, retries or failures; calls on many threads share the bucket's lock"""
+        with self.bucket._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "quota_per_minute": self.per_minute,
+            "tokens_available": round(self.bucket.available(), 2),
+            "capacity": self.bucket.capacity,
+            "requests": self.bucket.acquired,
+            "waited_requests": self.bucket.waits,
+            "wait_seconds": round(self.bucket.wait_seconds, 3),
+            "throttled_429": self.throttled,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+# Default per-user quotas: Sheets 60 req/min, Calendar 600 req/min
+_limiters: Dict[str, QuotaLimiter] = {
+    "sheets": QuotaLimiter("sheets", 60),
+    "calendar": QuotaLimiter("calendar", 600),
+}
+
+
+def configure_limits(sheets_per_minute: int, calendar_per_minute: int):
+    """Resize the shared limiters (called once at startup from Config)"""
+    _limiters["sheets"] = QuotaLimiter("sheets", sheets_per_minute)
+    _limiters["calendar"] = QuotaLimiter("calendar", calendar_per_minute)
+
+
+def get_limiter(api: str) -> QuotaLimiter:
+    return _limiters[api]
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Live budget metrics for every API"""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def _retry_after(error: HttpError) -> Optional[float]:
+    try:
+        value = error.resp.get("retry-after")
+        return float(value) if value else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def execute_with_retry(request, api: str = "sheets", idempotent: bool = True, tab: Optional[str] = None,
+                       max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 32.0):
+    """
+    request.execute() under the API's rate limiter, retrying throttling and
+    transient server errors with full-jitter exponential backoff. Every call
+    is recorded in the metrics registry under its tab (or calendar id).
+    """
+    limiter = get_limiter(api)
+    call = ApiCall(api, request, tab)
+    attempt = 0
+    while True:
+        limiter.bucket.acquire()
+        try:
+            result = request.execute()
+            call.finish(retries=attempt)
+            return result
+        except HttpError as e:
+            status = getattr(e.resp, "status", None)
+            if status == THROTTLED_STATUS:
+                limiter.count("throttled")
+                retryable = True
+            else:
+                retryable = idempotent and status in SERVER_ERROR_STATUS
+            if not retryable or attempt >= max_retries:
+                limiter.count("failures")
+                call.finish(retries=attempt, error=True)
+                raise
+            delay = _retry_after(e) or random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+        except (ConnectionError, TimeoutError) as e:
+            if not idempotent or attempt >= max_retries:
+                limiter.count("failures")
+                call.finish(retries=attempt, error=True)
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            status = type(e).__name__
+        attempt += 1
+        limiter.count("retries")
+        logger.warning("%s request failed (%s), retry %s/%s in %.2fs", api, status, attempt, max_retries, delay)
+        time.sleep(delay)
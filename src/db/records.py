@@ -0,0 +1,184 @@
+"""Typed, compact row records for the spreadsheet tabs"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from src.config.constants import (
+    SHEET_BOOKINGS, SHEET_CALENDAR, SHEET_CLIENTS, SHEET_HEADERS, SHEET_MASTERS, base_sheet_name,
+)
+
+_TRUE_VALUES = ("yes", "true", "1")
+
+
+class Record(Mapping):
+    """
+    Base for typed sheet rows.
+
+    Columns live in __slots__ (no per-row dict, no repeated key strings).
+    Records are read-only Mappings keyed by column name, so code written for
+    the old dict rows (row.get("status"), row["id"], dict(row)) keeps working.
+    Sheet columns a record type does not know about are kept in `extra`.
+    """
+    __slots__ = ("extra",)
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any, extra: Optional[Dict[str, Any]] = None):
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+        for name in self.FIELDS[len(values):]:
+            setattr(self, name, "")
+        self.extra = extra
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.FIELDS or (self.extra is not None and key in self.extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class Client(Record):
+    __slots__ = SHEET_HEADERS[SHEET_CLIENTS]
+    FIELDS = tuple(SHEET_HEADERS[SHEET_CLIENTS])
+
+    id: str
+    telegram_id: str
+    name: str
+    phone: str
+    email: str
+    notes: str
+    created_at: str
+
+
+class Master(Record):
+    __slots__ = SHEET_HEADERS[SHEET_MASTERS]
+    FIELDS = tuple(SHEET_HEADERS[SHEET_MASTERS])
+
+    id: str
+    name: str
+    calendar_id: str
+    specialties: str
+    active: str
+    created_at: str
+
+    @property
+    def is_active(self) -> bool:
+        return str(self.active).lower() in _TRUE_VALUES
+
+
+class Slot(Record):
+    __slots__ = SHEET_HEADERS[SHEET_CALENDAR]
+    FIELDS = tuple(SHEET_HEADERS[SHEET_CALENDAR])
+
+    date: str
+    master_id: str
+    slot_start: str
+    slot_end: str
+    available: str
+    note: str
+
+    @property
+    def is_available(self) -> bool:
+        return str(self.available).lower() in _TRUE_VALUES
+
+
+class Booking(Record):
+    __slots__ = SHEET_HEADERS[SHEET_BOOKINGS]
+    FIELDS = tuple(SHEET_HEADERS[SHEET_BOOKINGS])
+
+    id: str
+    client_id: str
+    master_id: str
+    date: str
+    slot_start: str
+    slot_end: str
+    status: str
+    created_at: str
+    google_event_id: str
+    notes: str
+
+
+RECORD_TYPES: Dict[str, Type[Record]] = {
+    SHEET_CLIENTS: Client,
+    SHEET_MASTERS: Master,
+    SHEET_CALENDAR: Slot,
+    SHEET_BOOKINGS: Booking,
+}
+
+
+class RowDecoder:
+    """
+    Turns raw value rows into records for one tab and header. Column
+    positions are resolved from the header once, so sheets with reordered or
+    extra columns decode correctly. Archive tabs decode like their hot tab;
+    tabs without a record type decode to dicts.
+    """
+    __slots__ = ("header", "record_type", "positions", "extras")
+
+    def __init__(self, sheet_name: Optional[str], header: Sequence[Any]):
+        self.header = list(header)
+        self.record_type = RECORD_TYPES.get(base_sheet_name(sheet_name or ""))
+        if self.record_type is not None:
+            self.positions = tuple(
+                self.header.index(name) if name in self.header else None for name in self.record_type.FIELDS
+            )
+            self.extras = tuple(
+                (i, name) for i, name in enumerate(self.header) if name and name not in self.record_type.FIELDS
+            )
+
+    def decode(self, row: Sequence[Any]):
+        n = len(row)
+        if self.record_type is None:
+            return {name: (row[i] if i < n else "") for i, name in enumerate(self.header)}
+        values = [row[i] if i is not None and i < n else "" for i in self.positions]
+        extra = {name: (row[i] if i < n else "") for i, name in self.extras} if self.extras else None
+        return self.record_type(*values, extra=extra)
+
+    def decode_rows(self, rows: Sequence[Sequence[Any]]) -> List[Any]:
+        return [self.decode(row) for row in rows]
+
+
+def decode_values(sheet_name: Optional[str], values: List[List[Any]]) -> List[Any]:
+    """Records for the data rows of a values response (values[0] is the header)"""
+    if not values:
+        return []
+    return RowDecoder(sheet_name, values[0]).decode_rows(values[1:])
+
+
+def row_values(header: Sequence[Any], row: Mapping, fields: Dict[str, Any]) -> List[Any]:
+    """
+    A row as a value list in sheet column order with fields applied; columns
+    missing from row are None, which values.update leaves untouched.
+    """
+    return [fields[c] if c in fields else row.get(c) for c in header]
+
+
+def to_jsonable(obj: Any) -> Any:
+    """json.dumps default= hook for records"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,6 +1,6 @@
 import uuid
 import datetime
-from src.config.constants import SHEET_BOOKINGS
+from src.config.constants import ARCHIVED_BOOKING_STATUSES, SHEET_BOOKINGS
 
 class BookingsRepo:
     def __init__(self, sheets_client, spreadsheet_id):
@@ -10,9 +10,62 @@ class BookingsRepo:
     def list_bookings(self):
         return self.sc.read_sheet(self.spreadsheet_id, SHEET_BOOKINGS)
 
-    def create_booking(self, client_id: str, master_id: str, date: str, slot_start: str, slot_end: str, status: str = "pending", google_event_id: str = ""):
+    def iter_bookings(self, chunk_size: int = None):
+        """Lazily page through the bookings tab"""
+        if chunk_size:
+            return self.sc.iter_sheet(self.spreadsheet_id, SHEET_BOOKINGS, chunk_size)
+        return self.sc.iter_sheet(self.spreadsheet_id, SHEET_BOOKINGS)
+
+    def count_bookings(self) -> int:
+        return self.sc.count_rows(self.spreadsheet_id, SHEET_BOOKINGS)
+
+    def list_by_client(self, client_id: str):
+        return self.sc.query_sheet(self.spreadsheet_id, SHEET_BOOKINGS, client_id=client_id)
+
+    def list_by_date(self, date: str):
+        return self.sc.query_sheet(self.spreadsheet_id, SHEET_BOOKINGS, date=date)
+
+    def list_by_status(self, status: str):
+        return self.sc.query_sheet(self.spreadsheet_id, SHEET_BOOKINGS, status=status)
+
+    def get_booking(self, booking_id: str):
+        found = self.sc.find_row(self.spreadsheet_id, SHEET_BOOKINGS, booking_id)
+        return found[1] if found else None
+
+    def update_booking(self, booking_id: str, **fields) -> bool:
+        """Change columns of one booking with a single targeted update"""
+        return self.sc.update_fields(self.spreadsheet_id, SHEET_BOOKINGS, booking_id, fields) is not None
+
+    def set_status(self, booking_id: str, status: str) -> bool:
+        return self.update_booking(booking_id, status=status)
+
+    def cancel(self, booking_id: str):
+        """
+        Mark a booking cancelled; returns the row as it was before, None if
+        there is no such booking or it is already cancelled or completed.
+        """
+        booking = self.get_booking(booking_id)
+        if booking is None or str(booking.get("status", "")).lower() in ARCHIVED_BOOKING_STATUSES:
+            return None
+        if not self.set_status(booking_id, "cancelled"):
+            return None
+        return booking
+
+    def reschedule(self, booking_id: str, date: str, slot_start: str, slot_end: str):
+        """
+        Move a booking to another date/time in one row update (its calendar
+        event id is cleared, the old event no longer applies); returns the
+        row as it was before, None if there is no such booking.
+        """
+        booking = self.get_booking(booking_id)
+        if booking is None or not self.update_booking(
+                booking_id, date=date, slot_start=slot_start, slot_end=slot_end, google_event_id=""):
+            return None
+        return booking
+
+    def create_booking(self, client_id: str, master_id: str, date: str, slot_start: str, slot_end: str, status: str = "pending", google_event_id: str = "", notes: str = ""):
         bid = str(uuid.uuid4())
         created_at = datetime.datetime.utcnow().isoformat()
-        row = [bid, client_id, master_id, date, slot_start, slot_end, status, created_at, google_event_id]
+        row = [bid, client_id, master_id, date, slot_start, slot_end, status, created_at, google_event_id, notes]
         self.sc.append_row(self.spreadsheet_id, SHEET_BOOKINGS, row)
         return {"id": bid}
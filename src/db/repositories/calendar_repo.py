@@ -8,6 +8,41 @@ class CalendarRepo:
     def list_slots(self):
         return self.sc.read_sheet(self.spreadsheet_id, SHEET_CALENDAR)
 
+    def iter_slots(self, chunk_size: int = None):
+        """Lazily page through the calendar tab (for scans over very large slot tables)"""
+        if chunk_size:
+            return self.sc.iter_sheet(self.spreadsheet_id, SHEET_CALENDAR, chunk_size)
+        return self.sc.iter_sheet(self.spreadsheet_id, SHEET_CALENDAR)
+
+    def list_slots_for(self, date: str, master_id: str = None):
+        if master_id:
+            return self.sc.query_sheet(self.spreadsheet_id, SHEET_CALENDAR, master_id=master_id, date=date)
+        return self.sc.query_sheet(self.spreadsheet_id, SHEET_CALENDAR, date=date)
+
+    def list_by_master(self, master_id: str):
+        return self.sc.query_sheet(self.spreadsheet_id, SHEET_CALENDAR, master_id=master_id)
+
     def add_slot(self, date: str, master_id: str, slot_start: str, slot_end: str, available: str = "yes", note: str = ""):
         row = [date, master_id, slot_start, slot_end, available, note]
         self.sc.append_row(self.spreadsheet_id, SHEET_CALENDAR, row)
+
+    def get_slot(self, master_id: str, date: str, slot_start: str):
+        found = self.sc.find_row(self.spreadsheet_id, SHEET_CALENDAR, (master_id, date, slot_start))
+        return found[1] if found else None
+
+    def set_available(self, master_id: str, date: str, slot_start: str, available: str, **fields) -> bool:
+        """Open or block one slot with a single targeted update; False if there is no such slot"""
+        fields["available"] = available
+        return self.sc.update_fields(self.spreadsheet_id, SHEET_CALENDAR, (master_id, date, slot_start), fields) is not None
+
+    def open_slot(self, date: str, master_id: str, slot_start: str, slot_end: str, note: str = ""):
+        """Make a slot bookable: reopen the existing row, or append one if there is none"""
+        fields = {"slot_end": slot_end}
+        if note:
+            fields["note"] = note
+        if not self.set_available(master_id, date, slot_start, "yes", **fields):
+            self.add_slot(date, master_id, slot_start, slot_end, note=note)
+
+    def remove_slot(self, master_id: str, date: str, slot_start: str, note: str = "") -> bool:
+        """Block a slot (the row stays, marked unavailable, so its history survives archiving)"""
+        return self.set_available(master_id, date, slot_start, "no", **({"note": note} if note else {}))
@@ -1,6 +1,12 @@
 import uuid
 import datetime
+import threading
 from src.config.constants import SHEET_CLIENTS
+from src.utils.validation import phone_normalize
+
+# Serializes find-then-create so concurrent bookings of a new client make one row
+_upsert_lock = threading.Lock()
+
 
 class ClientsRepo:
     def __init__(self, sheets_client, spreadsheet_id):
@@ -10,9 +16,57 @@ class ClientsRepo:
     def list_clients(self):
         return self.sc.read_sheet(self.spreadsheet_id, SHEET_CLIENTS)
 
+    def iter_clients(self, chunk_size: int = None):
+        """Lazily page through the clients tab"""
+        if chunk_size:
+            return self.sc.iter_sheet(self.spreadsheet_id, SHEET_CLIENTS, chunk_size)
+        return self.sc.iter_sheet(self.spreadsheet_id, SHEET_CLIENTS)
+
+    def find_by_telegram_id(self, telegram_id: int):
+        rows = self.sc.query_sheet(self.spreadsheet_id, SHEET_CLIENTS, telegram_id=str(telegram_id))
+        return rows[0] if rows else None
+
+    def find_by_phone(self, phone: str):
+        """Client whose phone matches after normalization (phones are stored normalized)"""
+        normalized = phone_normalize(phone)
+        if not normalized:
+            return None
+        rows = self.sc.query_sheet(self.spreadsheet_id, SHEET_CLIENTS, phone=normalized)
+        return rows[0] if rows else None
+
+    def update_client(self, client_id: str, **fields) -> bool:
+        return self.sc.update_fields(self.spreadsheet_id, SHEET_CLIENTS, client_id, fields) is not None
+
     def create_client(self, telegram_id: int, name: str, phone: str = "", email: str = "", notes: str = ""):
         cid = str(uuid.uuid4())
         created_at = datetime.datetime.utcnow().isoformat()
+        phone = phone_normalize(phone)
         row = [cid, str(telegram_id), name, phone, email, notes, created_at]
         self.sc.append_row(self.spreadsheet_id, SHEET_CLIENTS, row)
         return {"id": cid, "telegram_id": telegram_id, "name": name, "phone": phone}
+
+    def upsert_client(self, telegram_id: int, name: str, phone: str = "", email: str = "", notes: str = ""):
+        """
+        Reuse the client with this telegram_id (or, failing that, this phone)
+        and write only the contact fields that changed, in one update; create
+        the client if there is none. notes only seed a new client: an existing
+        client's notes are curated in the sheet and are not overwritten.
+        """
+        with _upsert_lock:
+            existing = self.find_by_telegram_id(telegram_id) if telegram_id else None
+            if existing is None and phone:
+                existing = self.find_by_phone(phone)
+                # A phone match that belongs to another Telegram account is a different person
+                if existing is not None and existing.get("telegram_id") not in ("", str(telegram_id)):
+                    existing = None
+            if existing is None:
+                return self.create_client(telegram_id, name, phone, email, notes)
+
+            wanted = {"telegram_id": str(telegram_id) if telegram_id else "", "name": name,
+                      "phone": phone_normalize(phone), "email": email}
+            changed = {k: v for k, v in wanted.items() if v and str(existing.get(k, "")) != v}
+            if changed:
+                self.update_client(existing.get("id"), **changed)
+            merged = {k: existing.get(k, "") for k in ("id", "telegram_id", "name", "phone")}
+            merged.update({k: v for k, v in changed.items() if k in merged})
+            return merged
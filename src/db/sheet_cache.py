@@ -0,0 +1,432 @@
+"""Read-through cache for whole-tab reads"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.constants import (
+    SHEET_BOOKINGS, SHEET_CALENDAR, SHEET_CLIENTS, SHEET_KEYS, SHEET_MASTERS, base_sheet_name,
+)
+from src.db.records import RowDecoder
+
+# Tabs that change rarely stay fresh longer than default_ttl (seconds)
+DEFAULT_TTLS = {
+    SHEET_MASTERS: 300.0,
+    SHEET_CLIENTS: 60.0,
+}
+
+# Rows at the end of a tab that are re-fetched and compared to detect changes
+TAIL_ROWS = 3
+
+
+def key_columns(sheet_name: str) -> Tuple[str, ...]:
+    """Identifying columns of a tab or its archive tabs (falls back to "id")"""
+    return SHEET_KEYS.get(base_sheet_name(sheet_name), ("id",))
+
+
+def normalize_key(key: Any) -> Tuple[str, ...]:
+    """A row key as a tuple of strings: "abc" -> ("abc",), ("m1", "2026-01-01", "10:00") as is"""
+    if isinstance(key, (tuple, list)):
+        return tuple(str(k) for k in key)
+    return (str(key),)
+
+
+def row_key(columns: Tuple[str, ...], row: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(str(row.get(c, "")) for c in columns)
+
+
+def _trimmed(row: List[Any]) -> List[Any]:
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+# Secondary indexes built with every download of a tab (column names sorted);
+# lookups on other column combinations build their index on first use
+INDEXED_COLUMNS = {
+    SHEET_CLIENTS: [("telegram_id",), ("id",), ("phone",)],
+    SHEET_MASTERS: [("id",)],
+    SHEET_CALENDAR: [("date", "master_id"), ("date",), ("date", "master_id", "slot_start")],
+    SHEET_BOOKINGS: [("client_id",), ("date",), ("id",)],
+}
+
+# Guards index building and the derivation of snapshots from a published one:
+# lookups build missing indexes on snapshots other threads are reading, and
+# appends extend index buckets shared with older snapshots
+_INDEX_LOCK = threading.RLock()
+
+
+class Index:
+    """
+    Key -> ascending row positions for one column combination, shared by a
+    snapshot and the snapshots appended to it. `rows` is how many rows the
+    buckets cover; a snapshot with fewer rows ignores the positions past its
+    own. Only the snapshot at the tip (rows == its row total) may extend the
+    buckets in place; -1 marks buckets shared with a patched snapshot, which
+    nobody extends any more.
+    """
+    __slots__ = ("buckets", "rows")
+
+    def __init__(self, buckets: Dict[Tuple[str, ...], List[int]], rows: int):
+        self.buckets = buckets
+        self.rows = rows
+
+    @classmethod
+    def build(cls, columns: Tuple[str, ...], rows: List[Dict[str, Any]]) -> "Index":
+        buckets: Dict[Tuple[str, ...], List[int]] = {}
+        for pos, row in enumerate(rows):
+            buckets.setdefault(row_key(columns, row), []).append(pos)
+        return cls(buckets, len(rows))
+
+    def positions(self, key: Tuple[str, ...], rows: int) -> List[int]:
+        """Positions of key among the first `rows` rows (a copy)"""
+        bucket = self.buckets.get(key)
+        if not bucket:
+            return []
+        if self.rows == rows or bucket[-1] < rows:
+            return list(bucket)
+        return bucket[:bisect_left(bucket, rows)]
+
+    def truncated(self, rows: int) -> "Index":
+        """Own copy of the buckets for the first `rows` rows"""
+        buckets = {}
+        for key, bucket in self.buckets.items():
+            bucket = bucket[:bisect_left(bucket, rows)]
+            if bucket:
+                buckets[key] = bucket
+        return Index(buckets, rows)
+
+
+class TabSnapshot:
+    """
+    Last known content of a tab plus its change marker: the sheet row count
+    (header included) and the raw values of the last TAIL_ROWS rows.
+
+    Holds secondary indexes (sorted column names -> Index). Snapshots derived
+    by appending rows extend the parent's index buckets in place, so an
+    append costs the rows added rather than a copy of every index; patching
+    copies only the buckets whose keys changed.
+    """
+    __slots__ = ("decoder", "rows", "row_count", "tail", "full_at", "indexes", "expires")
+
+    def __init__(self, decoder: RowDecoder, rows: List[Any], row_count: int,
+                 tail: List[List[Any]], full_at: float,
+                 indexes: Optional[Dict[Tuple[str, ...], Index]] = None, expires: float = 0.0):
+        self.decoder = decoder
+        self.rows = rows
+        self.row_count = row_count
+        self.tail = tail
+        self.full_at = full_at
+        self.indexes = indexes if indexes is not None else {}
+        self.expires = expires
+
+    def _index(self, columns: Tuple[str, ...]) -> Index:
+        """Index for columns (lock held), built on first use"""
+        index = self.indexes.get(columns)
+        if index is None:
+            index = self.indexes[columns] = Index.build(columns, self.rows)
+        return index
+
+    def lookup(self, equals: Dict[str, Any]) -> List[int]:
+        """Row positions (in sheet order) whose columns equal the given values"""
+        columns = tuple(sorted(equals))
+        key = tuple(str(equals[c]) for c in columns)
+        with _INDEX_LOCK:
+            return self._index(columns).positions(key, len(self.rows))
+
+    def position(self, columns: Tuple[str, ...], key: Tuple[str, ...]) -> Optional[int]:
+        """Position of the first row whose key columns equal key"""
+        positions = self.lookup(dict(zip(columns, key)))
+        return positions[0] if positions else None
+
+    def appended(self, values: List[List[Any]]) -> "TabSnapshot":
+        """Snapshot with rows added after the last known one"""
+        start = len(self.rows)
+        added = self.decoder.decode_rows(values)
+        indexes = {}
+        with _INDEX_LOCK:
+            for columns, index in self.indexes.items():
+                if index.rows != start:
+                    # Not the tip: a sibling already extended (or froze) these buckets
+                    index = index.truncated(start)
+                for pos, row in enumerate(added, start):
+                    index.buckets.setdefault(row_key(columns, row), []).append(pos)
+                index.rows = start + len(added)
+                indexes[columns] = index
+        return TabSnapshot(
+            self.decoder, self.rows + added, self.row_count + len(values),
+            [list(r) for r in (self.tail + values)[-TAIL_ROWS:]], self.full_at, indexes, self.expires,
+        )
+
+    def patched(self, updates: Dict[int, List[Any]]) -> "TabSnapshot":
+        """Snapshot with rows replaced (update_row indexing: row_index = position + 1)"""
+        rows = list(self.rows)
+        tail = [list(r) for r in self.tail]
+        tail_first = self.row_count - len(tail)
+        changed = {}
+        for row_index, values in updates.items():
+            pos = row_index - 1
+            changed[pos] = (rows[pos], self.decoder.decode(values))
+            rows[pos] = changed[pos][1]
+            if row_index >= tail_first:
+                tail[row_index - tail_first] = list(values)
+        indexes = {}
+        with _INDEX_LOCK:
+            for columns, index in self.indexes.items():
+                moves = [(pos, row_key(columns, old), row_key(columns, new)) for pos, (old, new) in changed.items()]
+                moves = [move for move in moves if move[1] != move[2]]
+                if not moves:
+                    indexes[columns] = index
+                    continue
+                if index.rows == len(self.rows):
+                    # Unchanged buckets stay shared; neither side may extend them from now on
+                    buckets = dict(index.buckets)
+                    index.rows = -1
+                else:
+                    buckets = index.truncated(len(self.rows)).buckets
+                for pos, old_key, new_key in moves:
+                    bucket = [p for p in buckets.get(old_key, []) if p != pos]
+                    if bucket:
+                        buckets[old_key] = bucket
+                    else:
+                        buckets.pop(old_key, None)
+                    buckets[new_key] = sorted(buckets.get(new_key, []) + [pos])
+                indexes[columns] = Index(buckets, len(rows))
+        return TabSnapshot(self.decoder, rows, self.row_count, tail, self.full_at, indexes, self.expires)
+
+    @property
+    def header(self) -> List[Any]:
+        return self.decoder.header
+
+    @classmethod
+    def from_values(cls, sheet_name: str, values: List[List[Any]]) -> "TabSnapshot":
+        """Snapshot of a full download (values[0] is the header row)"""
+        decoder = RowDecoder(sheet_name, values[0] if values else [])
+        data = values[1:]
+        snap = cls(decoder, decoder.decode_rows(data), len(values),
+                   [list(r) for r in data[-TAIL_ROWS:]], time.monotonic())
+        for columns in INDEXED_COLUMNS.get(base_sheet_name(sheet_name), []):
+            snap.indexes[columns] = Index.build(columns, snap.rows)
+        return snap
+
+    def tail_start(self) -> int:
+        """Sheet row number where a change probe starts reading"""
+        return self.row_count - len(self.tail) + 1
+
+    def extend(self, values: List[List[Any]]) -> Optional["TabSnapshot"]:
+        """
+        Apply the result of reading from tail_start(): None if the known tail
+        rows changed (a full download is needed), otherwise the snapshot with
+        any appended rows added.
+        """
+        known = len(self.tail)
+        if len(values) < known or [_trimmed(r) for r in values[:known]] != [_trimmed(r) for r in self.tail]:
+            return None
+        appended = values[known:]
+        if not appended:
+            return self
+        return self.appended(appended)
+
+
+def sheet_key(spreadsheet_id: str, sheet_name: str) -> Tuple[str, str]:
+    """Cache key for a tab; A1 suffixes like 'tab!A:B' map to the tab itself"""
+    return spreadsheet_id, sheet_name.split("!", 1)[0]
+
+
+class SheetCache:
+    """
+    Caches parsed rows per (spreadsheet_id, sheet_name) with a per-tab TTL.
+
+    Writes invalidate the tab, and every key carries a generation counter so
+    a read that raced with a write never stores rows older than that write
+    (read-your-writes).
+
+    Expired and invalidated tabs keep a TabSnapshot, so the next read can
+    check the tab's tail instead of downloading it again (see
+    SheetsClient.read_sheets). A full download is forced once a snapshot is
+    full_refresh_interval seconds old, to pick up edits above the tail.
+
+    Our own appends and updates are applied to the snapshot (note_append,
+    patch_rows); when that succeeds the tab stays cached until its original
+    expiry, with rows and indexes already reflecting the write.
+    """
+
+    def __init__(self, default_ttl: float = 30.0, ttls: Optional[Dict[str, float]] = None,
+                 full_refresh_interval: float = 300.0):
+        self.default_ttl = default_ttl
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.full_refresh_interval = full_refresh_interval
+        self._entries: Dict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._snapshots: Dict[Tuple[str, str], TabSnapshot] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.unchanged = 0
+        self.rows_downloaded = 0
+
+    def ttl_for(self, sheet_name: str) -> float:
+        return self.ttls.get(sheet_name.split("!", 1)[0], self.default_ttl)
+
+    def get(self, spreadsheet_id: str, sheet_name: str) -> Optional[List[Dict[str, Any]]]:
+        key = sheet_key(spreadsheet_id, sheet_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+            return None
+
+    def generation(self, spreadsheet_id: str, sheet_name: str) -> int:
+        """Token to pass to store(); taken before fetching"""
+        with self._lock:
+            return self._generations.get(sheet_key(spreadsheet_id, sheet_name), 0)
+
+    def current(self, spreadsheet_id: str, sheet_name: str) -> Optional[TabSnapshot]:
+        """Snapshot of a tab whose cache entry is still fresh (for index lookups)"""
+        if "!" in sheet_name:
+            return None
+        key = (spreadsheet_id, sheet_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            snap = self._snapshots.get(key)
+            if entry and snap is not None and entry[0] > time.monotonic() and entry[1] is snap.rows:
+                self.hits += 1
+                return snap
+            self.misses += 1
+            return None
+
+    def is_fresh(self, spreadsheet_id: str, sheet_name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(sheet_key(spreadsheet_id, sheet_name))
+            return bool(entry) and entry[0] > time.monotonic()
+
+    def snapshot(self, spreadsheet_id: str, sheet_name: str) -> Optional[TabSnapshot]:
+        """Snapshot usable for a tail probe; None when a full download is due"""
+        if "!" in sheet_name:
+            return None
+        with self._lock:
+            snap = self._snapshots.get((spreadsheet_id, sheet_name))
+        if snap is None or snap.row_count == 0:
+            return None
+        if time.monotonic() - snap.full_at > self.full_refresh_interval:
+            return None
+        return snap
+
+    def store(self, spreadsheet_id: str, sheet_name: str, snap: TabSnapshot, generation: int,
+              downloaded: int, full: bool):
+        """Cache a fetched snapshot unless the tab was written since generation was taken, and count what it cost"""
+        key = sheet_key(spreadsheet_id, sheet_name)
+        with self._lock:
+            self.rows_downloaded += downloaded
+            if full:
+                self.full_fetches += 1
+            elif downloaded <= len(snap.tail):
+                self.unchanged += 1
+            else:
+                self.tail_fetches += 1
+            if self._generations.get(key, 0) != generation:
+                return
+            snap.expires = time.monotonic() + self.ttl_for(key[1])
+            self._entries[key] = (snap.expires, snap.rows)
+            if "!" not in sheet_name:
+                self._snapshots[key] = snap
+
+    def _publish(self, key: Tuple[str, str], snap: TabSnapshot):
+        """Make an updated snapshot the cached rows again if it had not expired (lock held)"""
+        self._snapshots[key] = snap
+        if snap.expires > time.monotonic():
+            self._entries[key] = (snap.expires, snap.rows)
+
+    def patch_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        """Apply our own row updates (update_row indexing) to the tab's snapshot"""
+        key = sheet_key(spreadsheet_id, sheet_name)
+        with self._lock:
+            snap = self._snapshots.get(key)
+            if snap is None:
+                return
+            if any(index < 1 or index >= snap.row_count for index in updates):
+                # Outside the known rows: let the next read download the tab
+                self._snapshots.pop(key, None)
+                return
+            self._publish(key, snap.patched(updates))
+
+    def note_append(self, spreadsheet_id: str, sheet_name: str, values: List[List[Any]],
+                    first_row: Optional[int]):
+        """Add our own appended rows to the snapshot when they landed right after it"""
+        key = sheet_key(spreadsheet_id, sheet_name)
+        with self._lock:
+            snap = self._snapshots.get(key)
+            if snap is None:
+                return
+            if first_row == snap.row_count + 1:
+                self._publish(key, snap.appended(values))
+            else:
+                # Someone else appended too, or the position is unknown
+                self._snapshots.pop(key, None)
+
+    def header(self, spreadsheet_id: str, sheet_name: str) -> Optional[List[Any]]:
+        """Column names of the tab as last downloaded"""
+        with self._lock:
+            snap = self._snapshots.get(sheet_key(spreadsheet_id, sheet_name))
+        return snap.header if snap is not None else None
+
+    def locate(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        (row_index, row) of a row by key from the cached snapshot; row_index
+        as in update_row. Only a tab whose entry is still fresh is searched
+        (however old its last full download), None otherwise.
+        """
+        snap = self.current(spreadsheet_id, sheet_name)
+        if snap is None:
+            return None
+        pos = snap.position(key_columns(sheet_name), normalize_key(key))
+        if pos is None:
+            return None
+        return pos + 1, snap.rows[pos]
+
+    def invalidate(self, spreadsheet_id: str, sheet_name: Optional[str] = None, rows_moved: bool = False):
+        """
+        Drop one tab, or every tab of the spreadsheet when sheet_name is None.
+        rows_moved also drops the snapshots (rows were deleted, so the next
+        read must download the tab in full rather than probe its tail).
+        """
+        with self._lock:
+            if sheet_name is None:
+                keys = [k for k in self._entries if k[0] == spreadsheet_id]
+                keys += [k for k in self._generations if k[0] == spreadsheet_id and k not in keys]
+            else:
+                keys = [sheet_key(spreadsheet_id, sheet_name)]
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+                if rows_moved:
+                    self._snapshots.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.clear()
+            self._snapshots.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+                "cached_tabs": len(self._entries),
+                "full_fetches": self.full_fetches,
+                "tail_fetches": self.tail_fetches,
+                "unchanged": self.unchanged,
+                "rows_downloaded": self.rows_downloaded,
+            }
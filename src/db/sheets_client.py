@@ -1,17 +1,48 @@
 import os
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google.auth.transport.requests import Request
+from src.config.constants import SHEET_HEADERS
+from src.db.discovery import build_service
+from src.db.rate_limit import execute_with_retry
+from src.db.records import RowDecoder, decode_values, row_values
+from src.db.sheet_cache import TabSnapshot, key_columns, normalize_key, row_key
+from src.db.write_queue import first_row_number
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/calendar"]
 logger = logging.getLogger(__name__)
 
+# Rows per values.get when paging through a tab with iter_sheet
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def iter_range_pages(read_range, spreadsheet_id: str, sheet_name: str,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Any]]:
+    """
+    Page through a tab in A1 row windows of chunk_size rows, yielding decoded
+    rows per page. The header comes with the first page. Sheets trims blank
+    rows off the end of each window, so a short page does not mean the end:
+    paging stops at the first window that comes back empty (past the last
+    row, or a whole block of chunk_size blank rows).
+    """
+    tab = sheet_name.split("!", 1)[0]
+    chunk_size = max(1, chunk_size)
+    values = read_range(spreadsheet_id, f"{tab}!A1:ZZ{chunk_size + 1}")
+    if not values:
+        return
+    decoder = RowDecoder(tab, values[0])
+    page = values[1:]
+    start = chunk_size + 2
+    while page:
+        yield decoder.decode_rows(page)
+        page = read_range(spreadsheet_id, f"{tab}!A{start}:ZZ{start + chunk_size - 1}")
+        start += chunk_size
+
 class SheetsClient:
-    def __init__(self, creds_path="credentials.json", token_path="token.json"):
+    def __init__(self, creds_path="credentials.json", token_path="token.json", creds=None, cache=None):
         # Convert to absolute paths if relative
         if not os.path.isabs(creds_path):
             # Get project root directory
@@ -26,10 +57,12 @@ class SheetsClient:
         else:
             self.token_path = token_path
             
-        self.creds = None
-        self.service_sheets = None
-        self.service_calendar = None
-        self._ensure_credentials()
+        self.creds = creds
+        self.cache = cache
+        self._service_sheets = None
+        self._service_calendar = None
+        if self.creds is None:
+            self._ensure_credentials()
 
     def _ensure_credentials(self):
         logger.info(f"Looking for credentials at: {self.creds_path}")
@@ -57,13 +90,41 @@ class SheetsClient:
                 flow = InstalledAppFlow.from_client_secrets_file(self.creds_path, SCOPES)
                 self.creds = flow.run_local_server(port=0)
                 logger.info(f"Saving token to {self.token_path}")
-                with open(self.token_path, "w", encoding="utf-8") as f:
-                    f.write(self.creds.to_json())
-        
-        logger.info("Building Google API services...")
-        self.service_sheets = build("sheets", "v4", credentials=self.creds)
-        self.service_calendar = build("calendar", "v3", credentials=self.creds)
-        logger.info("✅ Google API services ready")
+                self.save_token()
+
+    def save_token(self):
+        """Persist current credentials to token_path"""
+        with open(self.token_path, "w", encoding="utf-8") as f:
+            f.write(self.creds.to_json())
+
+    # Service objects are built lazily from the cached discovery documents,
+    # so constructing a client costs no JSON parsing or network I/O.
+
+    @property
+    def service_sheets(self):
+        if self._service_sheets is None:
+            self._service_sheets = build_service("sheets", self.creds)
+        return self._service_sheets
+
+    @service_sheets.setter
+    def service_sheets(self, value):
+        self._service_sheets = value
+
+    @property
+    def service_calendar(self):
+        if self._service_calendar is None:
+            self._service_calendar = build_service("calendar", self.creds)
+        return self._service_calendar
+
+    @service_calendar.setter
+    def service_calendar(self, value):
+        self._service_calendar = value
+
+    def _execute(self, request, api: str = "sheets", idempotent: bool = True, tab: Optional[str] = None):
+        """Run a request with rate limiting and retries; tab labels it in the API metrics"""
+        if tab is not None:
+            tab = tab.split("!", 1)[0]
+        return execute_with_retry(request, api=api, idempotent=idempotent, tab=tab)
 
     def create_spreadsheet_template(self, title="TattooStudio_DB") -> str:
         spreadsheet = {
@@ -76,57 +137,365 @@ class SheetsClient:
             ]
         }
         try:
-            result = self.service_sheets.spreadsheets().create(body=spreadsheet).execute()
+            result = self._execute(
+                self.service_sheets.spreadsheets().create(body=spreadsheet), idempotent=False
+            )
             spreadsheet_id = result["spreadsheetId"]
-            headers = {
-                "clients": [["id","telegram_id","name","phone","email","notes","created_at"]],
-                "masters": [["id","name","calendar_id","specialties","active","created_at"]],
-                "calendar": [["date","master_id","slot_start","slot_end","available","note"]],
-                "bookings": [["id","client_id","master_id","date","slot_start","slot_end","status","created_at","google_event_id"]],
-            }
-            for sheet, h in headers.items():
-                self.service_sheets.spreadsheets().values().update(
+            for sheet, h in SHEET_HEADERS.items():
+                self._execute(self.service_sheets.spreadsheets().values().update(
                     spreadsheetId=spreadsheet_id, range=f"{sheet}!A1:Z1",
-                    valueInputOption="RAW", body={"values": h}
-                ).execute()
+                    valueInputOption="RAW", body={"values": [h]}
+                ), tab=sheet)
             return spreadsheet_id
         except HttpError as e:
             logger.exception("Failed to create spreadsheet: %s", e)
             raise
 
     def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Dict[str, Any]]:
-        resp = self.service_sheets.spreadsheets().values().get(
+        if self.cache is not None:
+            cached = self.cache.get(spreadsheet_id, sheet_name)
+            if cached is not None:
+                return cached
+            return self._refresh_tabs(spreadsheet_id, [sheet_name])[sheet_name]
+        return self._fetch_sheet(spreadsheet_id, sheet_name)
+
+    def read_sheets(self, spreadsheet_id: str, sheet_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Read several tabs with a single values.batchGet; cached tabs are not re-fetched"""
+        if self.cache is None:
+            values = self._batch_get(spreadsheet_id, sheet_names)
+            return {name: self._parse_values(v, name) for name, v in zip(sheet_names, values)}
+        result = {}
+        missing = []
+        for name in sheet_names:
+            cached = self.cache.get(spreadsheet_id, name)
+            if cached is not None:
+                result[name] = cached
+            else:
+                missing.append(name)
+        if missing:
+            result.update(self._refresh_tabs(spreadsheet_id, missing))
+        return result
+
+    def _refresh_tabs(self, spreadsheet_id: str, sheet_names: List[str],
+                      full: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Reload tabs into the cache. A tab with a snapshot is probed from its
+        last few known rows onward: if those rows are unchanged only the
+        appended rows are downloaded, otherwise it falls back to a full read.
+        full skips the probe.
+        """
+        generations = {name: self.cache.generation(spreadsheet_id, name) for name in sheet_names}
+        snapshots = {name: None if full else self.cache.snapshot(spreadsheet_id, name) for name in sheet_names}
+        ranges = [
+            f"{name}!A{snap.tail_start()}:ZZ" if snap is not None else name
+            for name, snap in snapshots.items()
+        ]
+        result = {}
+        stale = []
+        for name, values in zip(sheet_names, self._batch_get(spreadsheet_id, ranges)):
+            snap = snapshots[name]
+            fresh = snap.extend(values) if snap is not None else TabSnapshot.from_values(name, values)
+            if fresh is None:
+                stale.append(name)
+                continue
+            self.cache.store(spreadsheet_id, name, fresh, generations[name],
+                             downloaded=len(values), full=snap is None)
+            result[name] = list(fresh.rows)
+        if stale:
+            logger.debug("Tail of %s changed, downloading in full", ", ".join(stale))
+            for name, values in zip(stale, self._batch_get(spreadsheet_id, stale)):
+                fresh = TabSnapshot.from_values(name, values)
+                self.cache.store(spreadsheet_id, name, fresh, generations[name],
+                                 downloaded=len(values), full=True)
+                result[name] = list(fresh.rows)
+        return result
+
+    def _batch_get(self, spreadsheet_id: str, ranges: List[str]) -> List[List[List[Any]]]:
+        resp = self._execute(self.service_sheets.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id, ranges=ranges
+        ), tab=",".join(dict.fromkeys(r.split("!", 1)[0] for r in ranges)))
+        return [value_range.get("values", []) for value_range in resp.get("valueRanges", [])]
+
+    def read_range(self, spreadsheet_id: str, range_a1: str) -> List[List[Any]]:
+        """Raw cell values of an A1 range (no header parsing, no cache)"""
+        resp = self._execute(self.service_sheets.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id, range=range_a1
+        ), tab=range_a1)
+        return resp.get("values", [])
+
+    def iter_sheet_pages(self, spreadsheet_id: str, sheet_name: str,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Any]]:
+        """Pages of decoded rows; a cached tab is served from memory, others are read chunk by chunk"""
+        if self.cache is not None:
+            snap = self.cache.current(spreadsheet_id, sheet_name)
+            if snap is not None:
+                rows = snap.rows
+                for start in range(0, len(rows), chunk_size):
+                    yield rows[start:start + chunk_size]
+                return
+        yield from iter_range_pages(self.read_range, spreadsheet_id, sheet_name, chunk_size)
+
+    def iter_sheet(self, spreadsheet_id: str, sheet_name: str,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+        """
+        Rows of a tab, fetched lazily chunk_size rows at a time. Stopping the
+        iteration early (break, next(), any()) stops fetching further chunks.
+        """
+        for page in self.iter_sheet_pages(spreadsheet_id, sheet_name, chunk_size):
+            yield from page
+
+    def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals) -> List[Dict[str, Any]]:
+        """
+        Rows whose columns equal the given values, e.g. query_sheet(sid, "bookings", client_id=cid).
+        Served from the cached snapshot's secondary indexes when the tab is cached.
+        """
+        if self.cache is not None and equals:
+            snap = self.cache.current(spreadsheet_id, sheet_name)
+            if snap is None:
+                self._refresh_tabs(spreadsheet_id, [sheet_name])
+                snap = self.cache.current(spreadsheet_id, sheet_name)
+            if snap is not None:
+                return [snap.rows[pos] for pos in snap.lookup(equals)]
+        return [
+            row for row in self.read_sheet(spreadsheet_id, sheet_name)
+            if all(str(row.get(col, "")) == str(value) for col, value in equals.items())
+        ]
+
+    def count_rows(self, spreadsheet_id: str, sheet_name: str) -> int:
+        """Number of data rows, read off the cached snapshot (loaded first if needed) without copying the rows"""
+        if self.cache is not None:
+            snap = self.cache.current(spreadsheet_id, sheet_name)
+            if snap is None:
+                self._refresh_tabs(spreadsheet_id, [sheet_name])
+                snap = self.cache.current(spreadsheet_id, sheet_name)
+            if snap is not None:
+                return len(snap.rows)
+        return len(self.read_sheet(spreadsheet_id, sheet_name))
+
+    def prefetch(self, spreadsheet_id: str, sheet_names: List[str]):
+        """Load the tabs that are not cached with one batchGet (warms the indexes)"""
+        if self.cache is None:
+            return
+        stale = [name for name in sheet_names if not self.cache.is_fresh(spreadsheet_id, name)]
+        if stale:
+            self._refresh_tabs(spreadsheet_id, stale)
+
+    def find_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        (row_index, row) of the row with the given key (see SHEET_KEYS), with
+        row_index as update_row expects it; None if there is no such row.
+
+        Looks the key up in the cached snapshot first, so locating a known row
+        costs no API call. Otherwise an expired tab is refreshed (a tail probe
+        when possible) and, if the key is still unknown, downloaded in full
+        once before the row is reported missing.
+        """
+        if self.cache is None:
+            columns, wanted = key_columns(sheet_name), normalize_key(key)
+            for pos, row in enumerate(self._fetch_sheet(spreadsheet_id, sheet_name)):
+                if row_key(columns, row) == wanted:
+                    return pos + 1, row
+            return None
+        found = self.cache.locate(spreadsheet_id, sheet_name, key)
+        if found is None and not self.cache.is_fresh(spreadsheet_id, sheet_name):
+            self.read_sheet(spreadsheet_id, sheet_name)
+            found = self.cache.locate(spreadsheet_id, sheet_name, key)
+        if found is None:
+            # A tail probe cannot see rows edited above the tail
+            self._refresh_tabs(spreadsheet_id, [sheet_name], full=True)
+            found = self.cache.locate(spreadsheet_id, sheet_name, key)
+        return found
+
+    def locate_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[int]:
+        found = self.find_row(spreadsheet_id, sheet_name, key)
+        return found[0] if found else None
+
+    def update_fields(self, spreadsheet_id: str, sheet_name: str, key: Any, fields: Dict[str, Any]) -> Optional[int]:
+        """Change some columns of the row with the given key in one update; returns its row_index"""
+        found = self.find_row(spreadsheet_id, sheet_name, key)
+        if found is None:
+            return None
+        row_index, current = found
+        header = self.sheet_header(spreadsheet_id, sheet_name) or list(current)
+        self.update_row(spreadsheet_id, sheet_name, row_index, row_values(header, current, fields))
+        return row_index
+
+    def sheet_header(self, spreadsheet_id: str, sheet_name: str) -> Optional[List[Any]]:
+        """Column order of the tab as last downloaded (None if it is not cached)"""
+        return self.cache.header(spreadsheet_id, sheet_name) if self.cache is not None else None
+
+    def _fetch_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Dict[str, Any]]:
+        resp = self._execute(self.service_sheets.spreadsheets().values().get(
             spreadsheetId=spreadsheet_id, range=sheet_name
-        ).execute()
-        values = resp.get("values", [])
-        if not values:
-            return []
-        headers = values[0]
-        rows = []
-        for row in values[1:]:
-            d = {headers[i]: (row[i] if i < len(row) else "") for i in range(len(headers))}
-            rows.append(d)
-        return rows
+        ), tab=sheet_name)
+        return self._parse_values(resp.get("values", []), sheet_name)
+
+    @staticmethod
+    def _parse_values(values: List[List[Any]], sheet_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Header-keyed rows: Client/Master/Slot/Booking records for known tabs, dicts otherwise"""
+        return decode_values(sheet_name, values)
+
+    def _invalidate(self, spreadsheet_id: str, sheet_name: str):
+        if self.cache is not None:
+            self.cache.invalidate(spreadsheet_id, sheet_name)
+
+    def _note_append(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]], resp):
+        if self.cache is not None:
+            self.cache.note_append(spreadsheet_id, sheet_name, rows, first_row_number(resp))
+
+    def _patch(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        """Keep the tab's change-detection snapshot in step with our own updates"""
+        if self.cache is not None:
+            self.cache.patch_rows(spreadsheet_id, sheet_name, updates)
 
     def append_row(self, spreadsheet_id: str, sheet_name: str, row: List[Any]):
         body = {"values": [row]}
-        return self.service_sheets.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id, range=sheet_name,
-            valueInputOption="RAW", body=body
-        ).execute()
+        try:
+            resp = self._execute(self.service_sheets.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id, range=sheet_name,
+                valueInputOption="RAW", body=body
+            ), idempotent=False, tab=sheet_name)
+        finally:
+            self._invalidate(spreadsheet_id, sheet_name)
+        self._note_append(spreadsheet_id, sheet_name, [row], resp)
+        return resp
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        """Append several rows with a single values.append request"""
+        body = {"values": rows}
+        try:
+            resp = self._execute(self.service_sheets.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id, range=sheet_name,
+                valueInputOption="RAW", body=body
+            ), idempotent=False, tab=sheet_name)
+        finally:
+            self._invalidate(spreadsheet_id, sheet_name)
+        self._note_append(spreadsheet_id, sheet_name, rows, resp)
+        return resp
 
     def update_row(self, spreadsheet_id: str, sheet_name: str, row_index: int, row: List[Any]):
         range_a1 = f"{sheet_name}!A{row_index+1}"
         body = {"values": [row]}
-        return self.service_sheets.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id, range=range_a1,
-            valueInputOption="RAW", body=body
-        ).execute()
+        try:
+            resp = self._execute(self.service_sheets.spreadsheets().values().update(
+                spreadsheetId=spreadsheet_id, range=range_a1,
+                valueInputOption="RAW", body=body
+            ), tab=sheet_name)
+        finally:
+            self._invalidate(spreadsheet_id, sheet_name)
+        self._patch(spreadsheet_id, sheet_name, {row_index: row})
+        return resp
 
-    def create_calendar_event(self, calendar_id: str, start_iso: str, end_iso: str, summary: str, description: str="") -> str:
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        """Write several rows (row_index -> values, same indexing as update_row) in one values.batchUpdate"""
+        tab = sheet_name.split("!", 1)[0]
+        body = {
+            "valueInputOption": "RAW",
+            "data": [{"range": f"{tab}!A{index+1}", "values": [row]} for index, row in sorted(updates.items())],
+        }
+        try:
+            resp = self._execute(self.service_sheets.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id, body=body
+            ), tab=sheet_name)
+        finally:
+            self._invalidate(spreadsheet_id, sheet_name)
+        self._patch(spreadsheet_id, sheet_name, updates)
+        return resp
+
+    def sheet_ids(self, spreadsheet_id: str) -> Dict[str, int]:
+        """{tab title: sheetId} for every tab of the spreadsheet"""
+        resp = self._execute(self.service_sheets.spreadsheets().get(
+            spreadsheetId=spreadsheet_id, fields="sheets.properties(sheetId,title)"
+        ))
+        return {s["properties"]["title"]: s["properties"]["sheetId"] for s in resp.get("sheets", [])}
+
+    def list_sheets(self, spreadsheet_id: str) -> List[str]:
+        return list(self.sheet_ids(spreadsheet_id))
+
+    def ensure_sheets(self, spreadsheet_id: str, headers: Dict[str, List[Any]]) -> List[str]:
+        """
+        Create the tabs of headers that do not exist yet, with their header
+        rows: one batchUpdate adds all tabs, one values.batchUpdate writes all
+        headers. Returns the titles that were created.
+        """
+        existing = self.sheet_ids(spreadsheet_id)
+        missing = [title for title in headers if title not in existing]
+        if not missing:
+            return []
+        self._execute(self.service_sheets.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"requests": [{"addSheet": {"properties": {"title": title}}} for title in missing]}
+        ), idempotent=False, tab=",".join(missing))
+        self._execute(self.service_sheets.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"valueInputOption": "RAW",
+                  "data": [{"range": f"{title}!A1", "values": [list(headers[title])]} for title in missing]}
+        ), tab=",".join(missing))
+        for title in missing:
+            self._invalidate(spreadsheet_id, title)
+        return missing
+
+    def delete_rows(self, spreadsheet_id: str, sheet_name: str, row_indexes: List[int]) -> int:
+        """
+        Delete rows (row_index as in update_row) with one batchUpdate; rows
+        below move up. Contiguous rows are deleted as one range, bottom range
+        first, so earlier deletions do not shift later ones.
+        """
+        tab = sheet_name.split("!", 1)[0]
+        indexes = sorted(set(row_indexes), reverse=True)
+        if not indexes:
+            return 0
+        runs = []
+        for index in indexes:
+            if runs and runs[-1][0] == index + 1:
+                runs[-1][0] = index
+            else:
+                runs.append([index, index + 1])
+        sheet_id = self.sheet_ids(spreadsheet_id)[tab]
+        requests = [
+            {"deleteDimension": {"range": {
+                "sheetId": sheet_id, "dimension": "ROWS", "startIndex": start, "endIndex": end,
+            }}}
+            for start, end in runs
+        ]
+        try:
+            self._execute(self.service_sheets.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id, body={"requests": requests}
+            ), idempotent=False, tab=tab)
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(spreadsheet_id, tab, rows_moved=True)
+        return len(indexes)
+
+    def create_calendar_event(self, calendar_id: str, start_iso: str, end_iso: str, summary: str, description: str="",
+                              event_id: Optional[str] = None) -> str:
+        """
+        Insert an event; with a client-chosen event_id (base32hex, e.g. a hex
+        uuid) the insert is safe to retry: "already exists" means it was created.
+        """
         event = {"summary": summary, "description": description, "start": {"dateTime": start_iso}, "end": {"dateTime": end_iso}}
-        created = self.service_calendar.events().insert(calendarId=calendar_id, body=event).execute()
+        if event_id:
+            event["id"] = event_id
+        try:
+            created = self._execute(
+                self.service_calendar.events().insert(calendarId=calendar_id, body=event),
+                api="calendar", idempotent=bool(event_id), tab=calendar_id
+            )
+        except HttpError as e:
+            if event_id and getattr(e.resp, "status", None) == 409:
+                return event_id
+            raise
         return created.get("id")
 
     def delete_calendar_event(self, calendar_id: str, event_id: str):
-        return self.service_calendar.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+        return self._execute(
+            self.service_calendar.events().delete(calendarId=calendar_id, eventId=event_id),
+            api="calendar", tab=calendar_id
+        )
+
+    def list_calendar_events(self, calendar_id: str, time_min: str, time_max: str) -> List[Dict[str, Any]]:
+        events = self._execute(self.service_calendar.events().list(
+            calendarId=calendar_id, timeMin=time_min, timeMax=time_max,
+            singleEvents=True, orderBy="startTime"
+        ), api="calendar", tab=calendar_id)
+        return events.get("items", [])
@@ -0,0 +1,413 @@
+"""Process-wide pool of SheetsClient instances sharing one set of credentials"""
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from google.auth.transport.requests import Request
+
+from src.db.discovery import preload_discovery_documents
+from src.db.rate_limit import limiter_stats
+from src.db.records import row_values
+from src.db.sheet_cache import SheetCache
+from src.db.sheets_client import DEFAULT_CHUNK_SIZE, SheetsClient, iter_range_pages
+from src.db.write_queue import WriteBehindQueue, first_row_number
+
+logger = logging.getLogger(__name__)
+
+
+class _DirectSink:
+    """Write-behind sink that sends straight to Sheets (the pool already mirrored the rows)"""
+
+    def __init__(self, pool: "SheetsClientPool"):
+        self.pool = pool
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        with self.pool.acquire() as sc:
+            return sc.append_rows(spreadsheet_id, sheet_name, rows)
+
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        with self.pool.acquire() as sc:
+            return sc.batch_update_rows(spreadsheet_id, sheet_name, updates)
+
+
+class SheetsClientPool:
+    """
+    Thread-safe pool of SheetsClient objects.
+
+    Credentials are loaded once and shared by every pooled client; the
+    discovery-built service objects are not thread-safe, so each thread
+    borrows its own client for the duration of a call. A daemon thread
+    refreshes the OAuth token before it expires, so callers never pay for
+    auth or discovery on the request path. All clients share one SheetCache.
+
+    The pool exposes the same data methods as SheetsClient and can be passed
+    anywhere a SheetsClient is expected. With write_behind enabled,
+    append_row/update_row are buffered in a WriteBehindQueue and return a
+    Future instead of the API response; reads flush the tab first.
+
+    With a SheetsReplica attached (attach_replica), reads of replicated tabs
+    are served from local SQLite once the tab has been pulled, and every
+    write is applied to the replica as well as sent to Sheets.
+    """
+
+    def __init__(self, creds_path: str = "credentials.json", token_path: str = "token.json",
+                 size: int = 4, refresh_margin: int = 300, refresh_interval: int = 60,
+                 cache_ttl: float = 30.0, full_refresh_interval: float = 300.0, write_behind: bool = True,
+                 flush_interval: float = 0.5, write_batch: int = 50,
+                 read_chunk: int = DEFAULT_CHUNK_SIZE):
+        preload_discovery_documents()
+        self.cache = SheetCache(default_ttl=cache_ttl, full_refresh_interval=full_refresh_interval)
+        self._bootstrap = SheetsClient(creds_path, token_path, cache=self.cache)
+        self.creds = self._bootstrap.creds
+        self.size = max(1, size)
+        self.refresh_margin = refresh_margin
+        self.refresh_interval = refresh_interval
+        self.read_chunk = read_chunk
+
+        self._idle: "queue.LifoQueue[SheetsClient]" = queue.LifoQueue()
+        self._idle.put(self._bootstrap)
+        self._lock = threading.Lock()
+        self._created = 1
+        self._acquired = 0
+        self._waited = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+
+        self._stop = threading.Event()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="sheets-creds-refresh", daemon=True
+        )
+        self._refresher.start()
+
+        self.replica = None
+        self.writes = None
+        if write_behind:
+            self.writes = WriteBehindQueue(_DirectSink(self), max_batch=write_batch, flush_interval=flush_interval)
+
+    # --- pool management ---
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrow a client for the duration of the with-block"""
+        client = self._checkout(timeout)
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def _checkout(self, timeout: Optional[float]) -> SheetsClient:
+        with self._lock:
+            self._acquired += 1
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            grow = self._created < self.size
+            if grow:
+                self._created += 1
+            else:
+                self._waited += 1
+        if grow:
+            logger.debug("Growing Sheets client pool to %s", self._created)
+            try:
+                return SheetsClient(
+                    self._bootstrap.creds_path, self._bootstrap.token_path, creds=self.creds, cache=self.cache
+                )
+            except Exception:
+                # The slot was never filled; give it back so the pool can still grow to size
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            if self._needs_refresh():
+                self.refresh_credentials()
+
+    def _needs_refresh(self) -> bool:
+        if not self.creds.refresh_token:
+            return False
+        if not self.creds.valid:
+            return True
+        expiry = self.creds.expiry
+        if expiry is None:
+            return False
+        return (expiry - datetime.utcnow()).total_seconds() < self.refresh_margin
+
+    def refresh_credentials(self) -> bool:
+        """Refresh the shared token and persist it to token_path"""
+        try:
+            with self._lock:
+                self.creds.refresh(Request())
+                self._refreshes += 1
+            self._bootstrap.save_token()
+            logger.info("🔑 Google credentials refreshed")
+            return True
+        except Exception as e:
+            with self._lock:
+                self._refresh_failures += 1
+            logger.warning("Background credential refresh failed: %s", e)
+            return False
+
+    def attach_replica(self, replica, start: bool = True):
+        """Serve replicated tabs from a SheetsReplica and write through to it"""
+        self.replica = replica
+        if start:
+            replica.start()
+
+    def _replica_for(self, spreadsheet_id: str, sheet_name: str, ready: bool = True):
+        replica = self.replica
+        if replica is None or not replica.handles(spreadsheet_id, sheet_name):
+            return None
+        if ready and not replica.is_ready(sheet_name):
+            return None
+        return replica
+
+    def close(self):
+        """Flush buffered writes and stop the background refresher"""
+        if self.writes is not None:
+            self.writes.close()
+        if self.replica is not None:
+            self.replica.close()
+        self._stop.set()
+
+    def flush_writes(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None):
+        """Send buffered writes now (no-op without write-behind)"""
+        if self.writes is not None:
+            self.writes.flush(spreadsheet_id, sheet_name)
+
+    def _flush_pending(self, spreadsheet_id: str, sheet_names: List[str]):
+        """Read-your-writes: send buffered writes for the tabs about to be read"""
+        if self.writes is None:
+            return
+        for name in sheet_names:
+            if self.writes.has_pending(spreadsheet_id, name):
+                self.writes.flush(spreadsheet_id, name)
+
+    def _buffered(self) -> bool:
+        return self.writes is not None and not self.writes.closed
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters for diagnostics"""
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": idle,
+                "in_use": self._created - idle,
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "credential_refreshes": self._refreshes,
+                "refresh_failures": self._refresh_failures,
+                "token_expiry": self.creds.expiry.isoformat() if self.creds.expiry else None,
+                "cache": self.cache.stats(),
+                "writes": self.writes.stats() if self.writes is not None else None,
+                "quota": limiter_stats(),
+                "replica": self.replica.stats() if self.replica is not None else None,
+            }
+
+    # --- SheetsClient API ---
+
+    def create_spreadsheet_template(self, title="TattooStudio_DB") -> str:
+        with self.acquire() as sc:
+            return sc.create_spreadsheet_template(title)
+
+    def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[Dict[str, Any]]:
+        replica = self._replica_for(spreadsheet_id, sheet_name)
+        if replica is not None:
+            return replica.rows(sheet_name)
+        self._flush_pending(spreadsheet_id, [sheet_name])
+        with self.acquire() as sc:
+            return sc.read_sheet(spreadsheet_id, sheet_name)
+
+    def read_sheets(self, spreadsheet_id: str, sheet_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        result = {}
+        remote = []
+        for name in sheet_names:
+            replica = self._replica_for(spreadsheet_id, name)
+            if replica is not None:
+                result[name] = replica.rows(name)
+            else:
+                remote.append(name)
+        if remote:
+            self._flush_pending(spreadsheet_id, remote)
+            with self.acquire() as sc:
+                result.update(sc.read_sheets(spreadsheet_id, remote))
+        return {name: result[name] for name in sheet_names}
+
+    def read_range(self, spreadsheet_id: str, range_a1: str) -> List[List[Any]]:
+        self._flush_pending(spreadsheet_id, [range_a1])
+        with self.acquire() as sc:
+            return sc.read_range(spreadsheet_id, range_a1)
+
+    def iter_sheet_pages(self, spreadsheet_id: str, sheet_name: str,
+                         chunk_size: Optional[int] = None) -> Iterator[List[Any]]:
+        """Like SheetsClient.iter_sheet_pages, but a client is borrowed per page, not for the whole scan"""
+        chunk_size = chunk_size or self.read_chunk
+        replica = self._replica_for(spreadsheet_id, sheet_name)
+        if replica is not None:
+            rows = replica.rows(sheet_name)
+            for start in range(0, len(rows), chunk_size):
+                yield rows[start:start + chunk_size]
+            return
+        self._flush_pending(spreadsheet_id, [sheet_name])
+        snap = self.cache.current(spreadsheet_id, sheet_name)
+        if snap is not None:
+            for start in range(0, len(snap.rows), chunk_size):
+                yield snap.rows[start:start + chunk_size]
+            return
+        yield from iter_range_pages(self.read_range, spreadsheet_id, sheet_name, chunk_size)
+
+    def iter_sheet(self, spreadsheet_id: str, sheet_name: str, chunk_size: Optional[int] = None) -> Iterator[Any]:
+        for page in self.iter_sheet_pages(spreadsheet_id, sheet_name, chunk_size):
+            yield from page
+
+    def query_sheet(self, spreadsheet_id: str, sheet_name: str, **equals) -> List[Dict[str, Any]]:
+        replica = self._replica_for(spreadsheet_id, sheet_name)
+        if replica is not None:
+            return replica.query(sheet_name, **equals)
+        self._flush_pending(spreadsheet_id, [sheet_name])
+        with self.acquire() as sc:
+            return sc.query_sheet(spreadsheet_id, sheet_name, **equals)
+
+    def count_rows(self, spreadsheet_id: str, sheet_name: str) -> int:
+        replica = self._replica_for(spreadsheet_id, sheet_name)
+        if replica is not None:
+            return replica.count(sheet_name)
+        self._flush_pending(spreadsheet_id, [sheet_name])
+        with self.acquire() as sc:
+            return sc.count_rows(spreadsheet_id, sheet_name)
+
+    def prefetch(self, spreadsheet_id: str, sheet_names: List[str]):
+        remote = [name for name in sheet_names if self._replica_for(spreadsheet_id, name) is None]
+        if not remote:
+            return
+        self._flush_pending(spreadsheet_id, remote)
+        with self.acquire() as sc:
+            sc.prefetch(spreadsheet_id, remote)
+
+    def find_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[Tuple[int, Dict[str, Any]]]:
+        replica = self._replica_for(spreadsheet_id, sheet_name)
+        if replica is not None:
+            return replica.locate(sheet_name, key)
+        # Buffered appends must land first so their row numbers are known
+        self._flush_pending(spreadsheet_id, [sheet_name])
+        with self.acquire() as sc:
+            return sc.find_row(spreadsheet_id, sheet_name, key)
+
+    def locate_row(self, spreadsheet_id: str, sheet_name: str, key: Any) -> Optional[int]:
+        found = self.find_row(spreadsheet_id, sheet_name, key)
+        return found[0] if found else None
+
+    def update_fields(self, spreadsheet_id: str, sheet_name: str, key: Any, fields: Dict[str, Any]):
+        """Change some columns of the row with the given key; returns its row_index (None if missing)"""
+        found = self.find_row(spreadsheet_id, sheet_name, key)
+        if found is None:
+            return None
+        row_index, current = found
+        header = None
+        if self._replica_for(spreadsheet_id, sheet_name) is None:
+            with self.acquire() as sc:
+                header = sc.sheet_header(spreadsheet_id, sheet_name)
+        self.update_row(spreadsheet_id, sheet_name, row_index, row_values(header or list(current), current, fields))
+        return row_index
+
+    def append_row(self, spreadsheet_id: str, sheet_name: str, row: List[Any]):
+        if self._buffered():
+            future = self.writes.append(spreadsheet_id, sheet_name, row)
+            replica = self._replica_for(spreadsheet_id, sheet_name)
+            if replica is not None:
+                assumed = replica.apply_append(sheet_name, row)
+                future.add_done_callback(lambda f: self._settle_append(replica, sheet_name, assumed, f))
+            return future
+        with self.acquire() as sc:
+            resp = sc.append_row(spreadsheet_id, sheet_name, row)
+        self._mirror_append(spreadsheet_id, sheet_name, [row], resp)
+        return resp
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        with self.acquire() as sc:
+            resp = sc.append_rows(spreadsheet_id, sheet_name, rows)
+        self._mirror_append(spreadsheet_id, sheet_name, rows, resp)
+        return resp
+
+    def update_row(self, spreadsheet_id: str, sheet_name: str, row_index: int, row: List[Any]):
+        if self._buffered():
+            future = self.writes.update(spreadsheet_id, sheet_name, row_index, row)
+            self._mirror_updates(spreadsheet_id, sheet_name, {row_index: row})
+            return future
+        with self.acquire() as sc:
+            resp = sc.update_row(spreadsheet_id, sheet_name, row_index, row)
+        self._mirror_updates(spreadsheet_id, sheet_name, {row_index: row})
+        return resp
+
+    def batch_update_rows(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        with self.acquire() as sc:
+            resp = sc.batch_update_rows(spreadsheet_id, sheet_name, updates)
+        self._mirror_updates(spreadsheet_id, sheet_name, updates)
+        return resp
+
+    def list_sheets(self, spreadsheet_id: str) -> List[str]:
+        with self.acquire() as sc:
+            return sc.list_sheets(spreadsheet_id)
+
+    def ensure_sheets(self, spreadsheet_id: str, headers: Dict[str, List[Any]]) -> List[str]:
+        with self.acquire() as sc:
+            return sc.ensure_sheets(spreadsheet_id, headers)
+
+    def delete_rows(self, spreadsheet_id: str, sheet_name: str, row_indexes: List[int]) -> int:
+        # Buffered writes address rows by number, so they must land before rows shift
+        self._flush_pending(spreadsheet_id, [sheet_name])
+        with self.acquire() as sc:
+            deleted = sc.delete_rows(spreadsheet_id, sheet_name, row_indexes)
+        replica = self._replica_for(spreadsheet_id, sheet_name, ready=False)
+        if replica is not None:
+            replica.pull_sheet(sheet_name)
+        return deleted
+
+    def _mirror_append(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]], resp=None):
+        replica = self._replica_for(spreadsheet_id, sheet_name)
+        if replica is None:
+            return
+        start = first_row_number(resp) if resp is not None else None
+        for i, row in enumerate(rows):
+            replica.apply_append(sheet_name, row, start + i if start is not None else None)
+
+    @staticmethod
+    def _settle_append(replica, sheet_name: str, assumed: Optional[int], future):
+        """Move an optimistically mirrored append to the row Sheets actually used"""
+        if assumed is None:
+            return
+        if future.exception() is not None:
+            replica.discard(sheet_name, assumed)
+            return
+        actual = future.result()
+        if actual is not None and actual != assumed:
+            replica.relocate(sheet_name, assumed, actual)
+
+    def _mirror_updates(self, spreadsheet_id: str, sheet_name: str, updates: Dict[int, List[Any]]):
+        replica = self._replica_for(spreadsheet_id, sheet_name)
+        if replica is None:
+            return
+        for row_index, row in updates.items():
+            replica.apply_update(sheet_name, row_index, row)
+
+    def create_calendar_event(self, calendar_id: str, start_iso: str, end_iso: str, summary: str, description: str = "",
+                              event_id: Optional[str] = None) -> str:
+        with self.acquire() as sc:
+            return sc.create_calendar_event(calendar_id, start_iso, end_iso, summary, description, event_id)
+
+    def delete_calendar_event(self, calendar_id: str, event_id: str):
+        with self.acquire() as sc:
+            return sc.delete_calendar_event(calendar_id, event_id)
+
+    def list_calendar_events(self, calendar_id: str, time_min: str, time_max: str) -> List[Dict[str, Any]]:
+        with self.acquire() as sc:
+            return sc.list_calendar_events(calendar_id, time_min, time_max)
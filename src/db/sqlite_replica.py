@@ -0,0 +1,299 @@
+"""Local SQLite mirror of the spreadsheet tabs, kept fresh by a background puller"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.config.constants import (
+    SHEET_BOOKINGS, SHEET_CALENDAR, SHEET_CLIENTS, SHEET_HEADERS, SHEET_MASTERS,
+)
+from src.db.records import RECORD_TYPES
+from src.db.sheet_cache import key_columns, normalize_key
+
+logger = logging.getLogger(__name__)
+
+REPLICATED_SHEETS = (SHEET_CLIENTS, SHEET_MASTERS, SHEET_CALENDAR, SHEET_BOOKINGS)
+
+# Tabs the bot only ever appends to: the puller fetches just the rows past the
+# last one it has seen. The others are small and re-read in full.
+APPEND_ONLY_SHEETS = {SHEET_CALENDAR, SHEET_BOOKINGS}
+
+INDEXES = {
+    SHEET_CLIENTS: [("telegram_id",), ("phone",)],
+    SHEET_MASTERS: [("id",)],
+    SHEET_CALENDAR: [("master_id", "date", "slot_start"), ("date",)],
+    SHEET_BOOKINGS: [("client_id",), ("master_id", "date"), ("date",), ("id",)],
+}
+
+
+class SheetsReplica:
+    """
+    Read replica of the clients/masters/calendar/bookings tabs.
+
+    Each tab is a SQLite table with one TEXT column per header plus `_row`,
+    the sheet row number (header is row 1). A daemon thread pulls changes
+    every refresh_interval seconds: append-only tabs fetch only the rows past
+    the last known one, other tabs are replaced wholesale, and every
+    full_refresh_every-th pull re-reads everything to pick up manual edits.
+
+    Writes made through the pool are applied locally right away
+    (write-through), so the bot reads its own writes without waiting for the
+    next pull. When Google is unreachable the last pulled state keeps being
+    served.
+    """
+
+    def __init__(self, sheets_client, spreadsheet_id: str, path: str = "replica.sqlite3",
+                 refresh_interval: float = 30.0, full_refresh_every: int = 20):
+        self.sc = sheets_client
+        self.spreadsheet_id = spreadsheet_id
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.full_refresh_every = max(1, full_refresh_every)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._ready = set()
+        self._pulls = 0
+        self._pull_failures = 0
+        self._last_pull: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._create_schema()
+
+    # --- schema ---
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS _sync ("
+                "sheet TEXT PRIMARY KEY, header TEXT, row_count INTEGER, synced_at REAL)"
+            )
+            for sheet in REPLICATED_SHEETS:
+                cols = ", ".join(f'"{c}" TEXT' for c in SHEET_HEADERS[sheet])
+                self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{sheet}" (_row INTEGER PRIMARY KEY, {cols})')
+                # A replica file from before a column was added to SHEET_HEADERS
+                existing = {r["name"] for r in self._conn.execute(f'PRAGMA table_info("{sheet}")')}
+                for c in SHEET_HEADERS[sheet]:
+                    if c not in existing:
+                        self._conn.execute(f'ALTER TABLE "{sheet}" ADD COLUMN "{c}" TEXT')
+                for index_cols in INDEXES.get(sheet, []):
+                    name = f"ix_{sheet}_{'_'.join(index_cols)}"
+                    on = ", ".join(f'"{c}"' for c in index_cols)
+                    self._conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{sheet}" ({on})')
+            # A replica file that survived a restart can serve reads before the first pull
+            for row in self._conn.execute("SELECT sheet FROM _sync"):
+                self._ready.add(row["sheet"])
+
+    def handles(self, spreadsheet_id: str, sheet_name: str) -> bool:
+        return spreadsheet_id == self.spreadsheet_id and sheet_name in REPLICATED_SHEETS
+
+    def is_ready(self, sheet_name: str) -> bool:
+        return sheet_name in self._ready
+
+    # --- reads ---
+
+    def rows(self, sheet_name: str) -> List[Dict[str, Any]]:
+        return self.query(sheet_name)
+
+    def query(self, sheet_name: str, **equals) -> List[Dict[str, Any]]:
+        """Rows in sheet order whose columns equal the given values (uses the indexes)"""
+        columns = SHEET_HEADERS[sheet_name]
+        unknown = set(equals) - set(columns)
+        if unknown:
+            raise KeyError(f"Unknown column(s) for {sheet_name}: {', '.join(sorted(unknown))}")
+        where = " AND ".join(f'"{c}" = ?' for c in equals)
+        selected = ", ".join(f'COALESCE("{c}", \'\')' for c in columns)
+        sql = f'SELECT {selected} FROM "{sheet_name}"' + (f" WHERE {where}" if where else "") + " ORDER BY _row"
+        record_type = RECORD_TYPES[sheet_name]
+        with self._lock:
+            cursor = self._conn.execute(sql, [str(v) for v in equals.values()])
+            return [record_type(*r) for r in cursor.fetchall()]
+
+    def count(self, sheet_name: str) -> int:
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM "{sheet_name}"').fetchone()[0]
+
+    def locate(self, sheet_name: str, key) -> Optional[tuple]:
+        """(row_index, row) for a key (see SHEET_KEYS); row_index as in update_row"""
+        columns = key_columns(sheet_name)
+        where = " AND ".join(f'"{c}" = ?' for c in columns)
+        with self._lock:
+            r = self._conn.execute(
+                f'SELECT * FROM "{sheet_name}" WHERE {where} ORDER BY _row LIMIT 1', normalize_key(key)
+            ).fetchone()
+        if r is None:
+            return None
+        # In sheet column order; columns the replica does not mirror are None,
+        # which values.update leaves untouched
+        header = self._state(sheet_name)[0]
+        known = set(SHEET_HEADERS[sheet_name])
+        return r["_row"] - 1, {c: ((r[c] or "") if c in known else None) for c in header}
+
+    # --- write-through ---
+
+    def apply_append(self, sheet_name: str, values: List[Any], row_number: Optional[int] = None) -> Optional[int]:
+        """Mirror an appended row; without a row number it goes after the last known one"""
+        with self._lock, self._conn:
+            state = self._state(sheet_name)
+            if state is None:
+                return None
+            header, count = state
+            if row_number is None:
+                row_number = count + 2
+            self._upsert(sheet_name, header, row_number, values)
+            self._set_state(sheet_name, header, max(count, row_number - 1))
+            return row_number
+
+    def relocate(self, sheet_name: str, from_row: int, to_row: int):
+        """Move a row mirrored at a guessed position to the one Sheets reported"""
+        with self._lock, self._conn:
+            state = self._state(sheet_name)
+            if state is None:
+                return
+            header, count = state
+            self._conn.execute(f'DELETE FROM "{sheet_name}" WHERE _row = ?', (to_row,))
+            self._conn.execute(f'UPDATE "{sheet_name}" SET _row = ? WHERE _row = ?', (to_row, from_row))
+            # Someone else appended in between: rewind so the next tail pull fetches the gap
+            if to_row > from_row:
+                count = min(count, from_row - 2)
+            self._set_state(sheet_name, header, count)
+
+    def discard(self, sheet_name: str, row_number: int):
+        """Drop a mirrored append whose write to Sheets failed"""
+        with self._lock, self._conn:
+            state = self._state(sheet_name)
+            if state is None:
+                return
+            header, count = state
+            self._conn.execute(f'DELETE FROM "{sheet_name}" WHERE _row = ?', (row_number,))
+            if row_number == count + 1:
+                self._set_state(sheet_name, header, count - 1)
+
+    def apply_update(self, sheet_name: str, row_index: int, values: List[Any]):
+        """Mirror update_row(row_index) - row_index is the sheet row number minus one"""
+        with self._lock, self._conn:
+            state = self._state(sheet_name)
+            if state is None:
+                return
+            header, count = state
+            self._upsert(sheet_name, header, row_index + 1, values)
+            self._set_state(sheet_name, header, max(count, row_index))
+
+    # --- sync ---
+
+    def start(self):
+        """Start the background puller (the first pull runs immediately)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="sheets-replica", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        while True:
+            try:
+                self.pull()
+            except Exception as e:
+                self._pull_failures += 1
+                logger.warning("Replica pull failed, serving last synced state: %s", e)
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def pull(self, full: Optional[bool] = None):
+        """Bring every replicated tab up to date"""
+        if full is None:
+            full = self._pulls % self.full_refresh_every == 0
+        # Settle our own buffered appends first so their rows are not mistaken for a gap
+        flush = getattr(self.sc, "flush_writes", None)
+        if flush is not None:
+            flush(self.spreadsheet_id)
+        for sheet in REPLICATED_SHEETS:
+            if not full and sheet in APPEND_ONLY_SHEETS and self._state(sheet) is not None:
+                self._pull_tail(sheet)
+            else:
+                self._pull_full(sheet)
+        self._pulls += 1
+        self._last_pull = time.time()
+
+    def pull_sheet(self, sheet_name: str):
+        """Re-read one tab in full (after rows were deleted, which a tail pull cannot see)"""
+        self._pull_full(sheet_name)
+
+    def _pull_full(self, sheet_name: str):
+        values = self.sc.read_range(self.spreadsheet_id, sheet_name)
+        header = [str(h) for h in values[0]] if values else list(SHEET_HEADERS[sheet_name])
+        with self._lock, self._conn:
+            self._conn.execute(f'DELETE FROM "{sheet_name}"')
+            for i, row in enumerate(values[1:]):
+                if row:
+                    self._upsert(sheet_name, header, i + 2, row)
+            self._set_state(sheet_name, header, max(0, len(values) - 1))
+            self._ready.add(sheet_name)
+
+    def _pull_tail(self, sheet_name: str):
+        header, count = self._state(sheet_name)
+        values = self.sc.read_range(self.spreadsheet_id, f"{sheet_name}!A{count + 2}:ZZ")
+        if not values:
+            return
+        with self._lock, self._conn:
+            for i, row in enumerate(values):
+                if row:
+                    self._upsert(sheet_name, header, count + 2 + i, row)
+            self._set_state(sheet_name, header, count + len(values))
+        logger.debug("Replica pulled %s new %s rows", len(values), sheet_name)
+
+    def _state(self, sheet_name: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT header, row_count FROM _sync WHERE sheet = ?", (sheet_name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row["header"]), row["row_count"]
+
+    def _set_state(self, sheet_name: str, header: List[str], row_count: int):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO _sync (sheet, header, row_count, synced_at) VALUES (?, ?, ?, ?)",
+            (sheet_name, json.dumps(header), row_count, time.time()),
+        )
+
+    def _upsert(self, sheet_name: str, header: List[str], row_number: int, values: List[Any]):
+        # Columns are matched by header name, so reordered or extra sheet columns are tolerated
+        known = set(SHEET_HEADERS[sheet_name])
+        record = {}
+        for i, name in enumerate(header):
+            if name in known:
+                record[name] = str(values[i]) if i < len(values) and values[i] is not None else ""
+        cols = ["_row"] + list(record)
+        placeholders = ", ".join("?" for _ in cols)
+        quoted = ", ".join(f'"{c}"' for c in cols)
+        self._conn.execute(
+            f'INSERT OR REPLACE INTO "{sheet_name}" ({quoted}) VALUES ({placeholders})',
+            [row_number] + list(record.values()),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {
+                sheet: self._conn.execute(f'SELECT COUNT(*) FROM "{sheet}"').fetchone()[0]
+                for sheet in REPLICATED_SHEETS
+            }
+        return {
+            "path": self.path,
+            "ready": sorted(self._ready),
+            "rows": counts,
+            "pulls": self._pulls,
+            "pull_failures": self._pull_failures,
+            "last_pull_age": round(time.time() - self._last_pull, 1) if self._last_pull else None,
+        }
@@ -0,0 +1,180 @@
+"""Write-behind queue that coalesces row writes per tab"""
+import atexit
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_UPDATED_RANGE_RE = re.compile(r"![A-Z]+(\d+)")
+
+
+def first_row_number(append_response: Dict[str, Any]) -> Optional[int]:
+    """Sheet row number (1-based) of the first row written by values.append"""
+    updated = (append_response or {}).get("updates", {}).get("updatedRange", "")
+    match = _UPDATED_RANGE_RE.search(updated)
+    return int(match.group(1)) if match else None
+
+
+class _PendingTab:
+    __slots__ = ("appends", "updates", "since")
+
+    def __init__(self):
+        self.appends: List[Tuple[List[Any], Future]] = []
+        self.updates: Dict[int, Tuple[List[Any], List[Future]]] = {}
+        self.since = time.monotonic()
+
+    def __len__(self):
+        return len(self.appends) + len(self.updates)
+
+
+class WriteBehindQueue:
+    """
+    Buffers append_row/update_row calls and sends them per tab as one
+    values.append plus one values.batchUpdate.
+
+    A tab is flushed when it holds max_batch writes, when its oldest write is
+    flush_interval seconds old, before it is read, and on close(). Every write
+    returns a Future: appends resolve to the sheet row number they landed on,
+    updates to the row index passed in. Failed flushes fail their futures.
+    """
+
+    def __init__(self, sink, max_batch: int = 50, flush_interval: float = 0.5):
+        self.sink = sink
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._pending: Dict[Tuple[str, str], _PendingTab] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._enqueued = 0
+        self._requests = 0
+        self._failures = 0
+
+        self._worker = threading.Thread(target=self._run, name="sheets-write-behind", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def append(self, spreadsheet_id: str, sheet_name: str, row: List[Any]) -> Future:
+        future = Future()
+        with self._lock:
+            tab = self._tab(spreadsheet_id, sheet_name)
+            tab.appends.append((row, future))
+            self._after_enqueue(tab)
+        return future
+
+    def update(self, spreadsheet_id: str, sheet_name: str, row_index: int, row: List[Any]) -> Future:
+        """Queue an update; a later update to the same row replaces the earlier one"""
+        future = Future()
+        with self._lock:
+            tab = self._tab(spreadsheet_id, sheet_name)
+            _, futures = tab.updates.get(row_index, (None, []))
+            tab.updates[row_index] = (row, futures + [future])
+            self._after_enqueue(tab)
+        return future
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _tab(self, spreadsheet_id: str, sheet_name: str) -> _PendingTab:
+        if self._closed:
+            raise RuntimeError("Write queue is closed")
+        key = (spreadsheet_id, sheet_name)
+        tab = self._pending.get(key)
+        if tab is None:
+            tab = self._pending[key] = _PendingTab()
+        return tab
+
+    def _after_enqueue(self, tab: _PendingTab):
+        self._enqueued += 1
+        if len(tab) >= self.max_batch:
+            self._wake.set()
+
+    def has_pending(self, spreadsheet_id: str, sheet_name: Optional[str] = None) -> bool:
+        tab_name = sheet_name.split("!", 1)[0] if sheet_name else None
+        with self._lock:
+            return any(
+                sid == spreadsheet_id and (tab_name is None or name.split("!", 1)[0] == tab_name)
+                for sid, name in self._pending
+            )
+
+    def flush(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None, only_due: bool = False):
+        """Send pending writes now; filters narrow it to one spreadsheet/tab"""
+        tab_name = sheet_name.split("!", 1)[0] if sheet_name else None
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                batch = {}
+                for key, tab in list(self._pending.items()):
+                    if spreadsheet_id is not None and key[0] != spreadsheet_id:
+                        continue
+                    if tab_name is not None and key[1].split("!", 1)[0] != tab_name:
+                        continue
+                    if only_due and len(tab) < self.max_batch and now - tab.since < self.flush_interval:
+                        continue
+                    batch[key] = self._pending.pop(key)
+            for (sid, name), tab in batch.items():
+                self._send(sid, name, tab)
+
+    def _send(self, spreadsheet_id: str, sheet_name: str, tab: _PendingTab):
+        if tab.appends:
+            rows = [row for row, _ in tab.appends]
+            try:
+                self._requests += 1
+                start = first_row_number(self.sink.append_rows(spreadsheet_id, sheet_name, rows))
+                for i, (_, future) in enumerate(tab.appends):
+                    future.set_result(start + i if start is not None else None)
+            except Exception as e:
+                self._failures += 1
+                logger.error("Write-behind append to %s failed (%s rows): %s", sheet_name, len(rows), e)
+                for _, future in tab.appends:
+                    future.set_exception(e)
+        if tab.updates:
+            updates = {index: row for index, (row, _) in tab.updates.items()}
+            try:
+                self._requests += 1
+                self.sink.batch_update_rows(spreadsheet_id, sheet_name, updates)
+                for index, (_, futures) in tab.updates.items():
+                    for future in futures:
+                        future.set_result(index)
+            except Exception as e:
+                self._failures += 1
+                logger.error("Write-behind update of %s failed (%s rows): %s", sheet_name, len(updates), e)
+                for _, futures in tab.updates.values():
+                    for future in futures:
+                        future.set_exception(e)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush(only_due=True)
+            except Exception:
+                logger.exception("Write-behind flush loop error")
+
+    def close(self):
+        """Stop the worker and flush everything still pending"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._worker.join(timeout=self.flush_interval * 2 + 1)
+        self.flush()
+        logger.info("Write-behind queue flushed and closed")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(len(tab) for tab in self._pending.values())
+            return {
+                "pending": pending,
+                "enqueued": self._enqueued,
+                "requests": self._requests,
+                "failures": self._failures,
+            }
@@ -1,14 +1,22 @@
+from itertools import islice
+
 from src.db.repositories.clients_repo import ClientsRepo
 from src.db.repositories.masters_repo import MastersRepo
 from src.db.repositories.bookings_repo import BookingsRepo
+from src.config.constants import SHEET_CLIENTS, SHEET_MASTERS, SHEET_BOOKINGS
 
 class AdminService:
     def __init__(self, sheets_client, spreadsheet_id):
+        self.sc = sheets_client
+        self.spreadsheet_id = spreadsheet_id
         self.clients = ClientsRepo(sheets_client, spreadsheet_id)
         self.masters = MastersRepo(sheets_client, spreadsheet_id)
         self.bookings = BookingsRepo(sheets_client, spreadsheet_id)
 
-    def list_clients(self):
+    def list_clients(self, limit: int = None):
+        """All clients, or the first limit of them (read page by page, stopping once enough are in)"""
+        if limit is not None:
+            return list(islice(self.clients.iter_clients(), limit))
         return self.clients.list_clients()
 
     def list_masters(self):
@@ -16,3 +24,25 @@ class AdminService:
 
     def list_bookings(self):
         return self.bookings.list_bookings()
+
+    def read_tables(self, *sheet_names: str):
+        """Fetch several tabs in one batchGet round-trip: {sheet_name: rows}"""
+        return self.sc.read_sheets(self.spreadsheet_id, list(sheet_names))
+
+    def prefetch(self, *sheet_names: str):
+        """Warm the cache (and its indexes) for tabs that are not loaded yet, in one batchGet"""
+        self.sc.prefetch(self.spreadsheet_id, list(sheet_names))
+
+    def count_bookings(self) -> int:
+        """Number of bookings, without copying the tab (cached snapshot, replica or local store)"""
+        return self.bookings.count_bookings()
+
+    def bookings_on(self, date: str):
+        return self.bookings.list_by_date(date)
+
+    def booking_status_counts(self, *statuses: str):
+        return {status: len(self.bookings.list_by_status(status)) for status in statuses}
+
+    def dashboard_counts(self):
+        tables = self.read_tables(SHEET_CLIENTS, SHEET_MASTERS, SHEET_BOOKINGS)
+        return {name: len(rows) for name, rows in tables.items()}
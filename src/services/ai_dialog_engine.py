@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from enum import Enum
 
+from src.db.records import to_jsonable
+
 try:
     from openai import OpenAI
 except ImportError:
@@ -397,6 +399,10 @@ class AIDialogEngine:
                             "end_time": {
                                 "type": "string",
                                 "description": "Время окончания HH:MM"
+                            },
+                            "master_id": {
+                                "type": "string",
+                                "description": "ID мастера (если мастеров несколько)"
                             }
                         },
                         "required": ["date", "start_time", "end_time"]
@@ -410,7 +416,11 @@ class AIDialogEngine:
                         "properties": {
                             "slot_id": {
                                 "type": "string",
-                                "description": "ID слота для удаления"
+                                "description": "ID слота для удаления (master_id:YYYY-MM-DD:HH:MM)"
+                            },
+                            "master_id": {
+                                "type": "string",
+                                "description": "ID мастера (если мастеров несколько)"
                             },
                             "date": {
                                 "type": "string",
@@ -513,7 +523,7 @@ class AIDialogEngine:
             
             # Добавляем контекст если есть
             if context:
-                context_str = f"\n\nТЕКУЩИЙ КОНТЕКСТ:\n{json.dumps(context, ensure_ascii=False, indent=2)}"
+                context_str = f"\n\nТЕКУЩИЙ КОНТЕКСТ:\n{json.dumps(context, ensure_ascii=False, indent=2, default=to_jsonable)}"
                 system_prompt += context_str
             
             # Получаем определения функций
@@ -7,8 +7,11 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
+from src.config.constants import SHEET_CLIENTS, SHEET_BOOKINGS
 from src.services.ai_dialog_engine import AIDialogEngine, UserRole, ActionType
+from src.services.slot_leases import SlotUnavailableError
 from src.services.service_factory import (
+    get_async_sheets_client,
     get_booking_service,
     get_calendar_service,
     get_client_service,
@@ -38,6 +41,7 @@ class AIOrchestrator:
         self.client_service = get_client_service()
         self.master_service = get_master_service()
         self.admin_service = get_admin_service()
+        self.aio = get_async_sheets_client()
     
     async def process_user_message(
         self,
@@ -65,11 +69,15 @@ class AIOrchestrator:
             }
         """
         try:
+            # Клиенты и записи - одним batchGet-запросом, если ещё не в кэше
+            await self._prefetch_tables()
+            
             # Получаем информацию о пользователе
-            user_info = await self._get_user_info(user_id, telegram_user)
+            client = await self._find_client(user_id)
+            user_info = await self._get_user_info(user_id, telegram_user, client)
             
             # Получаем контекст для AI
-            context = await self._build_context(user_id, user_role)
+            context = await self._build_context(user_id, user_role, client)
             
             # Обрабатываем через AI
             ai_response = await self.ai_engine.process_message(
@@ -124,23 +132,31 @@ class AIOrchestrator:
                 "error": str(e)
             }
     
-    async def _get_user_info(self, user_id: int, telegram_user: Any) -> Dict:
+    async def _prefetch_tables(self):
+        """Загрузить clients и bookings за один round-trip (дальше - поиск по индексам)"""
+        try:
+            await self.aio.run(self.admin_service.prefetch, SHEET_CLIENTS, SHEET_BOOKINGS)
+        except Exception as e:
+            logger.warning(f"Failed to prefetch tables: {e}")
+    
+    async def _find_client(self, user_id: int) -> Optional[Dict]:
+        """Клиент по telegram_id (индекс, без перебора таблицы)"""
+        try:
+            return await self.aio.run(self.client_service.repo.find_by_telegram_id, user_id)
+        except Exception as e:
+            logger.debug(f"Could not get user from DB: {e}")
+            return None
+    
+    async def _get_user_info(self, user_id: int, telegram_user: Any, client: Optional[Dict] = None) -> Dict:
         """Получить информацию о пользователе"""
         try:
-            # Пытаемся получить из БД
-            clients = self.client_service.repo.list_clients()
-            client = None
-            for c in clients:
-                if str(c.get("telegram_id")) == str(user_id):
-                    client = c
-                    break
-            
             if client:
+                bookings = await self.aio.run(self.booking_service.bookings_repo.list_by_client, client.get("id"))
                 return {
                     "name": client.get("name", "Гость"),
                     "language": "ru",  # TODO: добавить поле language в БД
                     "phone": client.get("phone"),
-                    "total_bookings": 0  # TODO: посчитать
+                    "total_bookings": len(bookings)
                 }
         except Exception as e:
             logger.debug(f"Could not get user from DB: {e}")
@@ -164,13 +180,14 @@ class AIOrchestrator:
             "total_bookings": 0
         }
     
-    async def _build_context(self, user_id: int, user_role: UserRole) -> Dict:
+    async def _build_context(self, user_id: int, user_role: UserRole, client: Optional[Dict] = None) -> Dict:
         """
         Собирает контекст для AI (текущие записи, доступные слоты и т.д.)
         
         Args:
             user_id: ID пользователя
             user_role: Роль пользователя
+            client: Запись клиента (если уже найдена)
             
         Returns:
             Словарь с контекстом
@@ -178,16 +195,15 @@ class AIOrchestrator:
         context = {}
         
         try:
-            # Для всех - получаем все записи
-            all_bookings = self.admin_service.list_bookings()
-            
-            # Для клиентов - их записи
+            # Для клиентов - их записи (индекс client_id -> bookings)
             if user_role == UserRole.CLIENT:
-                user_bookings = [
-                    b for b in all_bookings
-                    if str(b.get("client_id")) == str(user_id) or 
-                       b.get("client_telegram_id") == str(user_id)
-                ]
+                if client is None:
+                    client = await self._find_client(user_id)
+                user_bookings = []
+                if client:
+                    user_bookings = await self.aio.run(
+                        self.booking_service.bookings_repo.list_by_client, client.get("id")
+                    )
                 # Фильтруем только pending/confirmed
                 active_bookings = [
                     b for b in user_bookings 
@@ -199,18 +215,17 @@ class AIOrchestrator:
             # Для админов и мастеров - сегодняшние записи
             if user_role in [UserRole.ADMIN, UserRole.MASTER]:
                 today = datetime.now().strftime("%Y-%m-%d")
-                today_bookings = [
-                    b for b in all_bookings
-                    if b.get("date") == today
-                ]
+                today_bookings = await self.aio.run(self.admin_service.bookings_on, today)
                 context["today_bookings"] = today_bookings
                 context["today_bookings_count"] = len(today_bookings)
                 
                 # Простая статистика
+                total_bookings = await self.aio.run(self.admin_service.count_bookings)
+                by_status = await self.aio.run(self.admin_service.booking_status_counts, "pending", "confirmed")
                 context["week_statistics"] = {
-                    "total_bookings": len(all_bookings),
-                    "pending": len([b for b in all_bookings if b.get("status") == "pending"]),
-                    "confirmed": len([b for b in all_bookings if b.get("status") == "confirmed"])
+                    "total_bookings": total_bookings,
+                    "pending": by_status["pending"],
+                    "confirmed": by_status["confirmed"]
                 }
         
         except Exception as e:
@@ -252,10 +267,10 @@ class AIOrchestrator:
                 return await self._show_my_bookings(user_id, params)
             
             elif action == "cancel_booking":
-                return await self._cancel_booking(params, user_id)
+                return await self._cancel_booking(params, user_id, user_role)
             
             elif action == "reschedule_booking":
-                return await self._reschedule_booking(params, user_id)
+                return await self._reschedule_booking(params, user_id, user_role)
             
             # === АДМИНИСТРАТИВНЫЕ ДЕЙСТВИЯ ===
             
@@ -307,44 +322,65 @@ class AIOrchestrator:
     async def _show_available_slots(self, params: Dict) -> Dict:
         """Показать доступные слоты"""
         start_date = params.get("start_date")
+        duration = int(params.get("duration_minutes") or 120)
         
-        # Используем реальный метод
-        slots = self.booking_service.list_available_slots(
-            date=start_date,
-            master_id=None  # TODO: добавить поддержку выбора мастера
-        )
+        # Ближайшие свободные слоты у любого мастера начиная с start_date (но не в прошлом)
+        now = datetime.now()
+        try:
+            after = max(datetime.strptime(start_date, "%Y-%m-%d"), now) if start_date else now
+        except ValueError:
+            after = now
+        # Последний день поиска включительно; без end_date — 30 дней вперёд
+        date_to = None
+        if params.get("end_date"):
+            try:
+                date_to = datetime.strptime(params["end_date"], "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                pass
+        if date_to is not None and date_to < after.strftime("%Y-%m-%d"):
+            # Период целиком в прошлом (или end_date раньше start_date)
+            slots, start_times = [], []
+        else:
+            slots = await self.aio.run(
+                self.booking_service.find_next_free_slots,
+                n=10,
+                after=after,
+                min_duration=duration,
+                date_to=date_to
+            )
+            # Точное время начала, где вся длительность сеанса помещается в свободное время подряд
+            start_times = await self.aio.run(
+                self.booking_service.find_fitting_times,
+                duration,
+                n=10,
+                after=after,
+                date_to=date_to
+            )
         
         return {
             "success": True,
             "slots": slots,
+            "start_times": start_times,
             "count": len(slots),
             "start_date": start_date,
-            "duration": params.get("duration_minutes", 120)
+            "duration": duration
         }
     
     async def _create_booking(self, params: Dict, user_id: int) -> Dict:
         """Создать бронирование"""
         try:
-            # Получаем или создаём клиента
-            clients = self.client_service.repo.list_clients()
-            client = None
-            for c in clients:
-                if str(c.get("telegram_id")) == str(user_id):
-                    client = c
-                    break
+            # Получаем или создаём клиента (поиск по индексу telegram_id)
+            client = await self._find_client(user_id)
             
             if not client:
                 # Регистрируем нового клиента
-                client = self.client_service.register_client(
+                client = await self.aio.run(
+                    self.client_service.register_client,
                     telegram_id=user_id,
                     name="Client",  # TODO: получить реальное имя
                     phone=""
                 )
             
-            # Получаем первого мастера (TODO: добавить выбор мастера)
-            masters = self.master_service.list_masters()
-            master_id = masters[0]["id"] if masters else "1"
-            
             # Создаём бронирование
             date = params.get("date")
             time = params.get("time")
@@ -356,7 +392,29 @@ class AIOrchestrator:
             end_time_obj = time_obj + timedelta(minutes=duration)
             slot_end = end_time_obj.strftime("%H:%M")
             
-            result = self.booking_service.create_booking(
+            # Первый мастер, у которого свободен весь интервал сеанса
+            master_ids = await self.aio.run(self.booking_service.active_master_ids)
+            master_id = None
+            for mid in master_ids:
+                if await self.aio.run(self.booking_service.slot_fits, date, mid, time, slot_end):
+                    master_id = mid
+                    break
+            if master_id is None:
+                alternatives = await self.aio.run(
+                    self.booking_service.find_fitting_times,
+                    duration,
+                    n=5,
+                    after=datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+                )
+                return {
+                    "success": False,
+                    "error": "slot_unavailable",
+                    "alternatives": alternatives,
+                    "message": f"{date} {time}-{slot_end} is not free for {duration} minutes"
+                }
+            
+            result = await self.aio.run(
+                self.booking_service.create_booking,
                 client_telegram_id=user_id,
                 client_name=client.get("name", "Client"),
                 client_phone=client.get("phone", ""),
@@ -386,13 +444,11 @@ class AIOrchestrator:
         """Показать записи пользователя"""
         status_filter = params.get("status", "all")
         
-        # Получаем все записи и фильтруем
-        all_bookings = self.admin_service.list_bookings()
-        bookings = [
-            b for b in all_bookings
-            if str(b.get("client_id")) == str(user_id) or
-               str(b.get("client_telegram_id")) == str(user_id)
-        ]
+        # Записи клиента по индексу client_id
+        client = await self._find_client(user_id)
+        bookings = []
+        if client:
+            bookings = await self.aio.run(self.booking_service.bookings_repo.list_by_client, client.get("id"))
         
         # Фильтруем по статусу если нужно
         if status_filter != "all":
@@ -412,35 +468,93 @@ class AIOrchestrator:
             "filter": status_filter
         }
     
-    async def _cancel_booking(self, params: Dict, user_id: int) -> Dict:
+    async def _own_booking(self, booking_id: Optional[str], user_id: int, user_role: UserRole) -> Optional[Dict]:
+        """Запись по id (одна точечная выборка); клиент видит только свои"""
+        if not booking_id:
+            return None
+        booking = await self.aio.run(self.booking_service.bookings_repo.get_booking, booking_id)
+        if booking is None or user_role in [UserRole.ADMIN, UserRole.MASTER]:
+            return booking
+        client = await self._find_client(user_id)
+        if not client or str(booking.get("client_id")) != str(client.get("id")):
+            return None
+        return booking
+    
+    async def _cancel_booking(self, params: Dict, user_id: int, user_role: UserRole = UserRole.CLIENT) -> Dict:
         """Отменить бронирование"""
-        # TODO: реализовать метод cancel в BookingsRepo
         booking_id = params.get("booking_id")
+        booking = await self._own_booking(booking_id, user_id, user_role)
+        if booking is None:
+            return {"success": False, "error": "booking_not_found", "booking_id": booking_id}
+        
+        # Статус, освобождение времени и удаление события - одной операцией сервиса
+        cancelled = await self.aio.run(self.booking_service.cancel_booking, booking_id)
+        if not cancelled:
+            # Запись уже отменена или завершена
+            return {"success": False, "error": "booking_not_active", "booking_id": booking_id,
+                    "status": booking.get("status")}
         
         return {
             "success": True,
             "booking_id": booking_id,
-            "message": "Booking cancelled (TODO: implement in repo)"
+            "date": booking.get("date"),
+            "time": booking.get("slot_start"),
+            "message": "Booking cancelled"
         }
     
-    async def _reschedule_booking(self, params: Dict, user_id: int) -> Dict:
+    async def _reschedule_booking(self, params: Dict, user_id: int, user_role: UserRole = UserRole.CLIENT) -> Dict:
         """Перенести бронирование"""
-        # TODO: реализовать метод reschedule в BookingsRepo
         booking_id = params.get("booking_id")
-        new_date = params.get("new_date")
-        new_time = params.get("new_time")
+        booking = await self._own_booking(booking_id, user_id, user_role)
+        if booking is None:
+            return {"success": False, "error": "booking_not_found", "booking_id": booking_id}
+        
+        new_date = params.get("new_date") or booking.get("date")
+        new_time = params.get("new_time") or booking.get("slot_start")
+        client = await self._find_client(user_id)
+        
+        try:
+            result = await self.aio.run(
+                self.booking_service.reschedule_booking,
+                booking_id,
+                new_date,
+                new_time,
+                owner=user_id,
+                client_name=client.get("name") if client else None
+            )
+        except SlotUnavailableError:
+            # Длительность сеанса сохраняется - ищем, куда она помещается у того же мастера
+            start, end = booking.get("slot_start", ""), booking.get("slot_end", "")
+            duration = (datetime.strptime(end, "%H:%M") - datetime.strptime(start, "%H:%M")).seconds // 60
+            alternatives = await self.aio.run(
+                self.booking_service.find_fitting_times,
+                duration,
+                n=5,
+                after=datetime.strptime(f"{new_date} {new_time}", "%Y-%m-%d %H:%M"),
+                master_id=booking.get("master_id"),
+                owner=user_id
+            )
+            return {
+                "success": False,
+                "error": "slot_unavailable",
+                "alternatives": alternatives,
+                "message": f"{new_date} {new_time} is not free"
+            }
+        if result is None:
+            return {"success": False, "error": "booking_not_found", "booking_id": booking_id}
         
         return {
             "success": True,
             "booking_id": booking_id,
-            "new_date": new_date,
-            "new_time": new_time,
-            "message": "Booking rescheduled (TODO: implement in repo)"
+            "new_date": result["date"],
+            "new_time": result["slot_start"],
+            "slot_end": result["slot_end"],
+            "message": "Booking rescheduled"
         }
     
     async def _view_all_bookings(self, params: Dict) -> Dict:
         """Просмотр всех бронирований (админ)"""
-        bookings = self.admin_service.list_bookings()
+        bookings = await self.aio.run(self.admin_service.list_bookings)
         
         # Фильтрация
         date_filter = params.get("date")
@@ -464,8 +578,8 @@ class AIOrchestrator:
         start_date = params.get("start_date")
         
         # Получаем слоты и записи
-        slots = self.booking_service.list_available_slots(start_date)
-        bookings = self.admin_service.list_bookings()
+        slots = await self.aio.run(self.booking_service.list_available_slots, start_date)
+        bookings = await self.aio.run(self.admin_service.list_bookings)
         date_bookings = [b for b in bookings if b.get("date") == start_date]
         
         schedule = {
@@ -479,26 +593,54 @@ class AIOrchestrator:
             "start_date": start_date
         }
     
+    async def _slot_master_id(self, params: Dict) -> Optional[str]:
+        """Мастер слота: из параметров, иначе единственный активный мастер"""
+        if params.get("master_id"):
+            return str(params["master_id"])
+        master_ids = await self.aio.run(self.booking_service.active_master_ids)
+        return master_ids[0] if len(master_ids) == 1 else None
+    
     async def _add_available_slot(self, params: Dict) -> Dict:
         """Добавить доступный слот (админ)"""
-        # TODO: реализовать метод add_slot в CalendarRepo
+        master_id = await self._slot_master_id(params)
+        if master_id is None:
+            return {"success": False, "error": "master_id_required"}
+        
+        date, start, end = params.get("date"), params.get("start_time"), params.get("end_time")
+        await self.aio.run(self.booking_service.add_slot, date, master_id, start, end)
         return {
             "success": True,
-            "message": "Slot added (TODO: implement in repo)",
-            "slot_id": "new_slot_id"
+            "message": "Slot added",
+            "slot_id": f"{master_id}:{date}:{start}",
+            "date": date,
+            "start_time": start,
+            "end_time": end
         }
     
     async def _remove_slot(self, params: Dict) -> Dict:
         """Удалить слот (админ)"""
-        # TODO: реализовать метод remove_slot в CalendarRepo
+        # slot_id имеет вид master_id:date:HH:MM (как его возвращает _add_available_slot)
+        slot_id = params.get("slot_id") or ""
+        if slot_id.count(":") >= 2:
+            master_id, date, start = slot_id.split(":", 2)
+        else:
+            master_id, date, start = await self._slot_master_id(params), params.get("date"), params.get("time")
+        if master_id is None:
+            return {"success": False, "error": "master_id_required"}
+        
+        removed = await self.aio.run(self.booking_service.remove_slot, date, master_id, start)
+        if not removed:
+            return {"success": False, "error": "slot_not_found", "date": date, "time": start}
         return {
             "success": True,
-            "message": "Slot removed (TODO: implement in repo)"
+            "message": "Slot removed",
+            "date": date,
+            "time": start
         }
     
     async def _view_statistics(self, params: Dict) -> Dict:
         """Просмотр статистики (админ)"""
-        bookings = self.admin_service.list_bookings()
+        bookings = await self.aio.run(self.admin_service.list_bookings)
         
         # Простая статистика
         stats = {
@@ -543,6 +685,16 @@ class AIOrchestrator:
             Отформатированный текст ответа
         """
         if not action_result.get("success"):
+            if action_result.get("error") == "slot_unavailable":
+                busy_msg = {
+                    "ru": "😔 Это время занято на всю длительность сеанса.",
+                    "en": "😔 This time is not free for the whole session.",
+                    "he": "😔 השעה הזו אינה פנויה לכל משך הפגישה."
+                }
+                text = busy_msg.get(language, busy_msg["en"])
+                if action_result.get("alternatives"):
+                    text += "\n\n" + self._format_slots(action_result["alternatives"], language)
+                return text
             # Ошибка выполнения
             error_messages = {
                 "ru": f"❌ К сожалению, не удалось выполнить действие: {action_result.get('error', 'Неизвестная ошибка')}",
@@ -555,7 +707,8 @@ class AIOrchestrator:
         action = ai_response.get("action")
         
         if action == "show_available_slots":
-            slots = action_result.get("slots", [])
+            # Время начала, где помещается весь сеанс, точнее отдельных слотов
+            slots = action_result.get("start_times") or action_result.get("slots", [])
             if not slots:
                 no_slots_msg = {
                     "ru": "К сожалению, на указанные даты нет свободных слотов. Попробуйте другие даты.",
@@ -595,7 +748,16 @@ class AIOrchestrator:
                 "he": "✅ ההזמנה בוטלה. אתה יכול להזמין שוב בכל עת!"
             }
             return cancel_msg.get(language, cancel_msg["en"])
-        
+
+        elif action == "reschedule_booking":
+            when = f"{action_result.get('new_date')} {action_result.get('new_time')}-{action_result.get('slot_end')}"
+            reschedule_msg = {
+                "ru": f"✅ Запись перенесена:\n📅 {when}",
+                "en": f"✅ Booking rescheduled:\n📅 {when}",
+                "he": f"✅ ההזמנה הועברה:\n📅 {when}"
+            }
+            return reschedule_msg.get(language, reschedule_msg["en"])
+
         # Для остальных действий - общий ответ
         return ai_response.get("response", "✅ Готово!")
     
@@ -611,9 +773,8 @@ class AIOrchestrator:
         
         for i, slot in enumerate(slots[:10], 1):  # Показываем максимум 10
             date = slot.get("date", "")
-            time = slot.get("time", "")
-            duration = slot.get("duration", 120)
-            text += f"{i}. {date} в {time} ({duration} мин)\n"
+            time = slot.get("time") or f"{slot.get('slot_start', '')}-{slot.get('slot_end', '')}"
+            text += f"{i}. {date} {time}\n"
         
         if len(slots) > 10:
             more_msg = {
@@ -0,0 +1,147 @@
+"""Moves finished rows out of the hot bookings/calendar tabs into monthly archive tabs"""
+import datetime
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.constants import (
+    ARCHIVE_SEPARATOR, ARCHIVED_BOOKING_STATUSES, ARCHIVED_SHEETS, DATE_FORMAT,
+    SHEET_BOOKINGS, SHEET_CALENDAR, archive_sheet_name,
+)
+from src.db.records import RowDecoder
+from src.db.sheet_cache import key_columns, row_key
+
+logger = logging.getLogger(__name__)
+
+
+def _month(date: Any) -> Optional[str]:
+    """'2026-01-15' -> '2026-01'; None for rows without a valid date"""
+    try:
+        return datetime.datetime.strptime(str(date)[:10], DATE_FORMAT).strftime("%Y-%m")
+    except ValueError:
+        return None
+
+
+def _cells(row: List[Any]) -> List[str]:
+    cells = [str(v) for v in row]
+    while cells and cells[-1] == "":
+        cells.pop()
+    return cells
+
+
+class ArchiveService:
+    """
+    Keeps the hot tabs bounded: archive() moves past-dated slots and
+    completed/cancelled bookings into one archive tab per month
+    (bookings_archive_2026_01), so full reads of calendar and bookings cost
+    what is current, not all history.
+
+    Per hot tab a run is one read, one batchUpdate creating the missing
+    archive tabs, one append per month, a verification read and one
+    batchUpdate deleting every moved row. At most batch_size rows move per
+    tab and run. Rows whose key is already in the archive tab are not
+    appended again, so an interrupted run is safe to repeat.
+
+    Nothing else reads archive tabs; history() and client_history() are the
+    explicit history queries.
+    """
+
+    def __init__(self, sheets_client, spreadsheet_id, batch_size: int = 500):
+        self.sc = sheets_client
+        self.spreadsheet_id = spreadsheet_id
+        self.batch_size = max(1, batch_size)
+
+    # --- archiving ---
+
+    def archive(self, today: Optional[str] = None) -> Dict[str, int]:
+        """Move finished rows of every archived tab; returns {tab: rows moved}"""
+        today = today or datetime.date.today().strftime(DATE_FORMAT)
+        # Row positions are about to shift: buffered writes must land first
+        self.sc.flush_writes(self.spreadsheet_id)
+        return {sheet: self._archive_sheet(sheet, today) for sheet in ARCHIVED_SHEETS}
+
+    @staticmethod
+    def is_finished(sheet_name: str, row, today: str) -> bool:
+        if sheet_name == SHEET_CALENDAR:
+            return str(row.get("date", ""))[:10] < today
+        return str(row.get("status", "")).lower() in ARCHIVED_BOOKING_STATUSES
+
+    def _archive_sheet(self, sheet_name: str, today: str) -> int:
+        values = self.sc.read_range(self.spreadsheet_id, sheet_name)
+        if len(values) < 2:
+            return 0
+        header, decoder = values[0], RowDecoder(sheet_name, values[0])
+        moved: Dict[str, List[Tuple[int, List[Any]]]] = defaultdict(list)
+        count = 0
+        for row_index, raw in enumerate(values[1:], 1):
+            row = decoder.decode(raw)
+            month = _month(row.get("date"))
+            if month is None or not self.is_finished(sheet_name, row, today):
+                continue
+            moved[archive_sheet_name(sheet_name, month)].append((row_index, raw))
+            count += 1
+            if count >= self.batch_size:
+                break
+        if not moved:
+            return 0
+
+        created = self.sc.ensure_sheets(self.spreadsheet_id, {tab: header for tab in moved})
+        if created:
+            logger.info("Created archive tabs: %s", ", ".join(created))
+        self._append_missing(sheet_name, decoder, moved)
+        deleted = self._delete_moved(sheet_name, moved)
+        logger.info("Archived %s %s rows into %s tab(s)", deleted, sheet_name, len(moved))
+        return deleted
+
+    def _append_missing(self, sheet_name: str, decoder: RowDecoder,
+                        moved: Dict[str, List[Tuple[int, List[Any]]]]):
+        """Append moved rows to their archive tabs, skipping keys a previous run already copied"""
+        archived = self.sc.read_sheets(self.spreadsheet_id, list(moved))
+        columns = key_columns(sheet_name)
+        for tab, rows in moved.items():
+            known = {row_key(columns, r) for r in archived[tab]}
+            new = []
+            for _, raw in rows:
+                key = row_key(columns, decoder.decode(raw))
+                if key not in known:
+                    known.add(key)
+                    new.append(raw)
+            if new:
+                self.sc.append_rows(self.spreadsheet_id, tab, new)
+
+    def _delete_moved(self, sheet_name: str, moved: Dict[str, List[Tuple[int, List[Any]]]]) -> int:
+        """Delete the moved rows from the hot tab, unless they changed since they were read"""
+        fresh = self.sc.read_range(self.spreadsheet_id, sheet_name)
+        indexes, changed = [], 0
+        for rows in moved.values():
+            for row_index, raw in rows:
+                if row_index < len(fresh) and _cells(fresh[row_index]) == _cells(raw):
+                    indexes.append(row_index)
+                else:
+                    changed += 1
+        if changed:
+            logger.warning("%s %s rows changed while archiving; left in place", changed, sheet_name)
+        return self.sc.delete_rows(self.spreadsheet_id, sheet_name, indexes)
+
+    # --- history queries ---
+
+    def archived_months(self, sheet_name: str = SHEET_BOOKINGS) -> List[str]:
+        """Months ('2026-01') that have an archive tab, oldest first"""
+        prefix = sheet_name + ARCHIVE_SEPARATOR
+        return sorted(
+            title[len(prefix):].replace("_", "-")
+            for title in self.sc.list_sheets(self.spreadsheet_id) if title.startswith(prefix)
+        )
+
+    def history(self, month: str, sheet_name: str = SHEET_BOOKINGS, **equals) -> List[Any]:
+        """Archived rows of one month, optionally filtered: history("2026-01", status="completed")"""
+        if month not in self.archived_months(sheet_name):
+            return []
+        return self.sc.query_sheet(self.spreadsheet_id, archive_sheet_name(sheet_name, month), **equals)
+
+    def client_history(self, client_id: str) -> List[Any]:
+        """Archived bookings of a client across all months, oldest month first"""
+        tabs = [archive_sheet_name(SHEET_BOOKINGS, month) for month in self.archived_months()]
+        self.sc.prefetch(self.spreadsheet_id, tabs)
+        return [b for tab in tabs for b in self.sc.query_sheet(self.spreadsheet_id, tab, client_id=client_id)]
+
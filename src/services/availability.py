@@ -0,0 +1,403 @@
+"""Per-master, per-day index of free time built from calendar slots and bookings"""
+import datetime
+import heapq
+import threading
+import time
+from bisect import bisect_right
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.config.constants import DATE_FORMAT, RELEASED_BOOKING_STATUSES
+
+Interval = Tuple[int, int]
+
+
+def to_minutes(value: Any) -> Optional[int]:
+    """'09:30' -> 570; None for anything that is not HH:MM ('24:00' is allowed as end of day)"""
+    try:
+        hours, minutes = str(value).strip().split(":")[:2]
+        total = int(hours) * 60 + int(minutes)
+    except ValueError:
+        return None
+    return total if 0 <= total <= 24 * 60 else None
+
+
+def to_hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def date_range(date_from: str, date_to: str) -> List[str]:
+    """Every date from date_from to date_to inclusive, as YYYY-MM-DD"""
+    current = datetime.datetime.strptime(date_from, DATE_FORMAT).date()
+    last = datetime.datetime.strptime(date_to, DATE_FORMAT).date()
+    dates = []
+    while current <= last:
+        dates.append(current.strftime(DATE_FORMAT))
+        current += datetime.timedelta(days=1)
+    return dates
+
+
+def merge(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sorted, non-overlapping union of intervals (touching ones are joined)"""
+    merged: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+
+def subtract(free: List[Interval], blocks: List[Interval]) -> List[Interval]:
+    """free minus blocks; both sorted and non-overlapping"""
+    result, i = [], 0
+    for start, end in free:
+        while i < len(blocks) and blocks[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(blocks) and blocks[j][0] < end:
+            if blocks[j][0] > start:
+                result.append((start, blocks[j][0]))
+            start = max(start, blocks[j][1])
+            j += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+class DayAvailability:
+    """
+    Free time of one master on one day as two parallel sorted lists of
+    interval starts and ends (minutes since midnight), so fits() is a
+    single bisect.
+
+    Working time is the union of the day's available calendar slots; slots
+    marked unavailable and active bookings are carved out of it.
+    """
+    __slots__ = ("slots", "working", "busy", "bookings", "starts", "ends", "block_starts", "block_ends")
+
+    def __init__(self):
+        self.slots: List[Tuple[Any, int, int]] = []
+        self.working: List[Interval] = []
+        self.busy: List[Interval] = []
+        self.bookings: Dict[str, Interval] = {}
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.block_starts: List[int] = []
+        self.block_ends: List[int] = []
+
+    def add_slot(self, slot, start: int, end: int):
+        self.slots.append((slot, start, end))
+        if slot.is_available:
+            self.working.append((start, end))
+        else:
+            self.busy.append((start, end))
+
+    def rebuild(self):
+        self.working = merge(self.working)
+        blocks = merge(self.busy + list(self.bookings.values()))
+        self._set_blocks(blocks)
+        free = subtract(self.working, blocks)
+        self.starts = [s for s, _ in free]
+        self.ends = [e for _, e in free]
+
+    def _set_blocks(self, blocks: List[Interval]):
+        self.block_starts = [s for s, _ in blocks]
+        self.block_ends = [e for _, e in blocks]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Does start-end overlap a booking or busy slot (working time is not checked)?"""
+        i = bisect_right(self.block_ends, start)
+        return i < len(self.block_starts) and self.block_starts[i] < end
+
+    def fits(self, start: int, end: int) -> bool:
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and end <= self.ends[i] and start < end
+
+    def free(self) -> List[Interval]:
+        return list(zip(self.starts, self.ends))
+
+    def fitting_starts(self, duration: int, step: int, floor: int = 0) -> Iterator[int]:
+        """
+        Start minutes, every step minutes from the start of each free run,
+        where duration minutes fit in that run (consecutive free slots form one run)
+        """
+        step = max(1, step)
+        for i in range(bisect_right(self.ends, floor), len(self.starts)):
+            start, last = self.starts[i], self.ends[i] - duration
+            if start < floor:
+                start += -(-(floor - start) // step) * step
+            while start <= last:
+                yield start
+                start += step
+
+    def book(self, booking_id: str, start: int, end: int):
+        """Carve a booking out of the free interval holding it (full rebuild if it straddles several)"""
+        self.bookings[booking_id] = (start, end)
+        self._set_blocks(merge(list(zip(self.block_starts, self.block_ends)) + [(start, end)]))
+        i = bisect_right(self.starts, start) - 1
+        if not (i >= 0 and end <= self.ends[i]):
+            self.rebuild()
+            return
+        pieces = [(s, e) for s, e in ((self.starts[i], start), (end, self.ends[i])) if s < e]
+        self.starts[i:i + 1] = [s for s, _ in pieces]
+        self.ends[i:i + 1] = [e for _, e in pieces]
+
+    def release(self, booking_id: str) -> bool:
+        if self.bookings.pop(booking_id, None) is None:
+            return False
+        self.rebuild()
+        return True
+
+
+class AvailabilityIndex:
+    """
+    Free time per (date, master), loaded a whole date at a time with two
+    indexed queries (calendar slots and bookings of that date) and kept for
+    ttl seconds. "HH:MM" strings are parsed once, at load.
+
+    book()/release() update a loaded day in place when a booking is
+    created or cancelled through BookingService; the ttl bounds how long
+    changes made elsewhere (the spreadsheet, other processes) go unseen.
+    Loads run outside the lock, so every date has a generation that
+    book()/release()/invalidate() bump: a load that started before such a
+    change may have read the tabs before it and is dropped, not cached.
+    """
+
+    def __init__(self, calendar_repo, bookings_repo, ttl: float = 30.0):
+        self.calendar_repo = calendar_repo
+        self.bookings_repo = bookings_repo
+        self.ttl = ttl
+        self._days: Dict[str, Tuple[float, Dict[str, DayAvailability]]] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0  # bumped by invalidate() of every date
+        self._lock = threading.RLock()
+
+    # --- loading ---
+
+    def _date(self, date: str) -> Dict[str, DayAvailability]:
+        while True:
+            with self._lock:
+                if self._fresh(date):
+                    return self._days[date][1]
+                generation = self._generation(date)
+            masters = self._load(date)
+            with self._lock:
+                if self._generation(date) == generation:
+                    self._days[date] = (time.monotonic(), masters)
+                    return masters
+            # The day was booked or released while loading: load it again
+
+    def _generation(self, date: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(date, 0)
+
+    def _changed(self, date: str):
+        """Bump the date's generation (lock held) so loads already running are not cached"""
+        self._generations[date] = self._generations.get(date, 0) + 1
+
+    def _fresh(self, date: str) -> bool:
+        cached = self._days.get(date)
+        return cached is not None and time.monotonic() - cached[0] < self.ttl
+
+    def _load(self, date: str) -> Dict[str, DayAvailability]:
+        return self._build(self.calendar_repo.list_slots_for(date), self.bookings_repo.list_by_date(date))
+
+    def _load_range(self, dates: List[str]):
+        """Load every stale date of the list with one pass over each tab instead of two queries per date"""
+        with self._lock:
+            stale = {d: self._generation(d) for d in dates if not self._fresh(d)}
+        if len(stale) < 2:
+            for date in stale:
+                self._date(date)
+            return
+        slots: Dict[str, List[Any]] = {d: [] for d in stale}
+        bookings: Dict[str, List[Any]] = {d: [] for d in stale}
+        for slot in self.calendar_repo.list_slots():
+            if slot.get("date") in slots:
+                slots[slot.get("date")].append(slot)
+        for booking in self.bookings_repo.list_bookings():
+            if booking.get("date") in bookings:
+                bookings[booking.get("date")].append(booking)
+        built = {d: self._build(slots[d], bookings[d]) for d in stale}
+        with self._lock:
+            now = time.monotonic()
+            for date, masters in built.items():
+                # Dates changed meanwhile are left stale; _date() reloads them on use
+                if self._generation(date) == stale[date]:
+                    self._days[date] = (now, masters)
+
+    @staticmethod
+    def _build(slots: Iterable[Any], bookings: Iterable[Any]) -> Dict[str, DayAvailability]:
+        masters: Dict[str, DayAvailability] = {}
+        for slot in slots:
+            start, end = to_minutes(slot.get("slot_start")), to_minutes(slot.get("slot_end"))
+            if start is None or end is None or start >= end:
+                continue
+            masters.setdefault(str(slot.get("master_id")), DayAvailability()).add_slot(slot, start, end)
+        for booking in bookings:
+            if str(booking.get("status", "")).lower() in RELEASED_BOOKING_STATUSES:
+                continue
+            start, end = to_minutes(booking.get("slot_start")), to_minutes(booking.get("slot_end"))
+            if start is None or end is None or start >= end:
+                continue
+            day = masters.setdefault(str(booking.get("master_id")), DayAvailability())
+            day.bookings[str(booking.get("id"))] = (start, end)
+        for day in masters.values():
+            day.rebuild()
+        return masters
+
+    def day(self, date: str, master_id: str) -> DayAvailability:
+        return self._date(date).get(str(master_id)) or DayAvailability()
+
+    def invalidate(self, date: Optional[str] = None):
+        with self._lock:
+            if date is None:
+                self._epoch += 1
+                self._days.clear()
+                self._generations.clear()
+            else:
+                self._changed(date)
+                self._days.pop(date, None)
+
+    # --- queries ---
+
+    def fits(self, date: str, master_id: str, slot_start: str, slot_end: str) -> bool:
+        """Is slot_start-slot_end entirely free for the master on that date?"""
+        start, end = to_minutes(slot_start), to_minutes(slot_end)
+        if start is None or end is None:
+            return False
+        day = self.day(date, master_id)
+        with self._lock:
+            return day.fits(start, end)
+
+    def overlaps(self, date: str, master_id: str, slot_start: str, slot_end: str) -> bool:
+        """Is any part of slot_start-slot_end already booked or marked busy?"""
+        start, end = to_minutes(slot_start), to_minutes(slot_end)
+        if start is None or end is None:
+            return False
+        day = self.day(date, master_id)
+        with self._lock:
+            return day.overlaps(start, end)
+
+    def free_intervals(self, date: str, master_id: str) -> List[Tuple[str, str]]:
+        """Free stretches of the day as ("HH:MM", "HH:MM"), earliest first"""
+        day = self.day(date, master_id)
+        with self._lock:
+            return [(to_hhmm(s), to_hhmm(e)) for s, e in day.free()]
+
+    def free_slots(self, date: str, master_id: Optional[str] = None) -> List[Any]:
+        """Available calendar slots of the date that no booking or busy slot overlaps"""
+        masters = self._date(date)
+        ids = [str(master_id)] if master_id else list(masters)
+        result = []
+        with self._lock:
+            for mid in ids:
+                day = masters.get(mid)
+                if day is None:
+                    continue
+                result.extend(slot for slot, start, end in day.slots if slot.is_available and day.fits(start, end))
+        return result
+
+    def free_slots_between(self, date_from: str, date_to: str, master_id: Optional[str] = None) -> Dict[str, List[Any]]:
+        """free_slots() for every date from date_from to date_to inclusive; dates without any are left out"""
+        dates = date_range(date_from, date_to)
+        self._load_range(dates)
+        result = {}
+        for date in dates:
+            slots = self.free_slots(date, master_id)
+            if slots:
+                result[date] = slots
+        return result
+
+    def iter_free_slots(self, master_id: str, date_from: str, date_to: str, after_minute: int = 0,
+                        min_duration: int = 0) -> Iterator[Tuple[str, int, str, Any]]:
+        """
+        Free slots of one master in time order as (date, start minute,
+        master_id, slot), loading days only as the iteration reaches them.
+        On date_from only slots starting at or after after_minute count; a
+        slot matches when at least min_duration minutes are free from its start.
+        """
+        mid = str(master_id)
+        for date in date_range(date_from, date_to):
+            day = self._date(date).get(mid)
+            if day is None:
+                continue
+            floor = after_minute if date == date_from else 0
+            with self._lock:
+                matches = sorted(
+                    ((start, slot) for slot, start, end in day.slots
+                     if slot.is_available and start >= floor and day.fits(start, max(end, start + min_duration))),
+                    key=lambda m: m[0],
+                )
+            for start, slot in matches:
+                yield date, start, mid, slot
+
+    def next_free_slots(self, master_ids: Iterable[str], n: int, date_from: str, date_to: str,
+                        after_minute: int = 0, min_duration: int = 0,
+                        skip: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """
+        The n earliest free slots across masters: a heap merge of the
+        per-master iter_free_slots streams, so days past the n-th match are
+        never loaded. skip(slot) drops a match (e.g. held by someone else).
+        """
+        streams = [self.iter_free_slots(mid, date_from, date_to, after_minute, min_duration) for mid in master_ids]
+        merged = (m[3] for m in heapq.merge(*streams, key=lambda m: m[:3]) if skip is None or not skip(m[3]))
+        return list(islice(merged, max(0, n)))
+
+    def iter_fitting_times(self, master_id: str, date_from: str, date_to: str, duration: int,
+                           step: int = 30, after_minute: int = 0) -> Iterator[Tuple[str, int, str]]:
+        """(date, start minute, master_id) where duration minutes of free time begin, in time order"""
+        mid = str(master_id)
+        for date in date_range(date_from, date_to):
+            day = self._date(date).get(mid)
+            if day is None:
+                continue
+            with self._lock:
+                starts = list(day.fitting_starts(duration, step, after_minute if date == date_from else 0))
+            for start in starts:
+                yield date, start, mid
+
+    def next_fitting_times(self, master_ids: Iterable[str], n: int, date_from: str, date_to: str, duration: int,
+                           step: int = 30, after_minute: int = 0,
+                           skip: Optional[Callable[[str, str, str, str], bool]] = None) -> List[Dict[str, str]]:
+        """
+        The n earliest (date, master, start-end) where a duration-minute
+        session fits in consecutive free time, merged across masters like
+        next_free_slots. skip(date, master_id, start, end) drops a candidate.
+        """
+        streams = [self.iter_fitting_times(mid, date_from, date_to, duration, step, after_minute) for mid in master_ids]
+        result = []
+        for date, start, mid in heapq.merge(*streams):
+            slot_start, slot_end = to_hhmm(start), to_hhmm(start + duration)
+            if skip is not None and skip(date, mid, slot_start, slot_end):
+                continue
+            result.append({"date": date, "master_id": mid, "slot_start": slot_start, "slot_end": slot_end})
+            if len(result) >= n:
+                break
+        return result
+
+    # --- incremental updates ---
+
+    def book(self, booking_id: str, date: str, master_id: str, slot_start: str, slot_end: str):
+        """Take a new booking's time off a loaded day (unloaded days pick it up when loaded)"""
+        start, end = to_minutes(slot_start), to_minutes(slot_end)
+        if start is None or end is None or start >= end:
+            return
+        with self._lock:
+            self._changed(date)
+            cached = self._days.get(date)
+            if cached is None:
+                return
+            day = cached[1].setdefault(str(master_id), DayAvailability())
+            day.book(str(booking_id), start, end)
+
+    def release(self, booking_id: str, date: str, master_id: str):
+        """Give a cancelled booking's time back on a loaded day"""
+        with self._lock:
+            self._changed(date)
+            cached = self._days.get(date)
+            if cached is None:
+                return
+            day = cached[1].get(str(master_id))
+            if day is not None:
+                day.release(str(booking_id))
@@ -1,61 +1,251 @@
+import datetime
+import threading
+from contextlib import contextmanager
+
+from src.config.constants import ARCHIVED_BOOKING_STATUSES, DATE_FORMAT
 from src.db.repositories.calendar_repo import CalendarRepo
 from src.db.repositories.bookings_repo import BookingsRepo
 from src.db.repositories.clients_repo import ClientsRepo
+from src.db.repositories.masters_repo import MastersRepo
+from src.services.availability import AvailabilityIndex, to_hhmm, to_minutes
+from src.services.calendar_jobs import CalendarJobQueue
 from src.services.calendar_service import CalendarService
+from src.services.slot_leases import SlotLeaseManager, SlotUnavailableError
+
+# Striped locks serializing the check-write-book sequence per (master, date)
+_DAY_LOCK_STRIPES = 64
+
 
 class BookingService:
-    def __init__(self, sheets_client, spreadsheet_id):
+    def __init__(self, sheets_client, spreadsheet_id, availability_ttl: float = 30.0,
+                 leases: SlotLeaseManager = None, calendar_jobs: CalendarJobQueue = None):
         self.sp_client = sheets_client
         self.spreadsheet_id = spreadsheet_id
         self.calendar_repo = CalendarRepo(sheets_client, spreadsheet_id)
         self.bookings_repo = BookingsRepo(sheets_client, spreadsheet_id)
         self.clients_repo = ClientsRepo(sheets_client, spreadsheet_id)
+        self.masters_repo = MastersRepo(sheets_client, spreadsheet_id)
         self.calendar_service = CalendarService(sheets_client)
+        self.availability = AvailabilityIndex(self.calendar_repo, self.bookings_repo, ttl=availability_ttl)
+        self.leases = leases or SlotLeaseManager()
+        self._calendar_jobs = calendar_jobs
+        self._calendar_jobs_lock = threading.Lock()
+        self._day_locks = [threading.Lock() for _ in range(_DAY_LOCK_STRIPES)]
+
+    @property
+    def calendar_jobs(self) -> CalendarJobQueue:
+        """
+        The queue that writes bookings' calendar events. Without an injected
+        one (service_factory passes its started queue) a queue is created on
+        first use but not started: jobs wait in it until the owner calls
+        start(), so constructing a service never spawns a thread.
+        """
+        if self._calendar_jobs is None:
+            with self._calendar_jobs_lock:
+                if self._calendar_jobs is None:
+                    self._calendar_jobs = CalendarJobQueue(self.sp_client, self.spreadsheet_id, self.calendar_service)
+        return self._calendar_jobs
+
+    @contextmanager
+    def _locked(self, *days):
+        """
+        Hold the locks of (master_id, date) pairs while a booking's time is
+        checked, written and taken off the availability index, so two
+        overlapping bookings cannot both pass the check. Locks are taken in
+        stripe order, so two days never deadlock.
+        """
+        stripes = sorted({hash((str(m), str(d))) % len(self._day_locks) for m, d in days})
+        for i in stripes:
+            self._day_locks[i].acquire()
+        try:
+            yield
+        finally:
+            for i in reversed(stripes):
+                self._day_locks[i].release()
+
+    def _not_held(self, slots, owner=None):
+        return [s for s in slots if not self.leases.held_by_other(
+            s.get("master_id"), s.get("date"), s.get("slot_start"), owner, s.get("slot_end"))]
+
+    def list_available_slots(self, date: str, master_id: str = None, owner=None):
+        """Available slots of the date that no active booking overlaps and no other client holds"""
+        return self._not_held(self.availability.free_slots(date, master_id), owner)
+
+    def list_available_slots_between(self, date_from: str, date_to: str, master_id: str = None, owner=None):
+        """{date: free slots} for a date range, inclusive"""
+        found = self.availability.free_slots_between(date_from, date_to, master_id)
+        return {date: slots for date, slots in ((d, self._not_held(s, owner)) for d, s in found.items()) if slots}
+
+    def free_slot_counts(self, date_from: str, date_to: str, master_id: str = None, owner=None):
+        """{date: number of free slots} for a date range (active masters or one); dates with none are left out"""
+        found = self.list_available_slots_between(date_from, date_to, master_id, owner)
+        if master_id is None:
+            # Inactive masters keep their slot rows but cannot be booked
+            active = set(self.active_master_ids())
+            found = {date: [s for s in slots if str(s.get("master_id")) in active] for date, slots in found.items()}
+        return {date: len(slots) for date, slots in found.items() if slots}
 
-    def list_available_slots(self, date: str, master_id: str = None):
-        slots = self.calendar_repo.list_slots()
-        res = []
-        for s in slots:
-            if s.get("available", "").lower() in ("yes", "true", "1"):
-                if (not master_id) or s.get("master_id") == master_id:
-                    if s.get("date") == date:
-                        res.append(s)
-        return res
+    def find_next_free_slots(self, n: int = 5, after: datetime.datetime = None, specialty: str = None,
+                             min_duration: int = 0, horizon_days: int = 30, owner=None, date_to: str = None):
+        """
+        The n earliest free slots after `after` (default: now) across all
+        active masters, or those whose specialties mention `specialty`, with
+        at least min_duration free minutes from the slot start. The search
+        ends on date_to (inclusive) if given, else horizon_days after `after`.
+        """
+        after = after or datetime.datetime.now()
+        master_ids = self.active_master_ids(specialty)
+        date_from = after.strftime(DATE_FORMAT)
+        date_to = date_to or (after + datetime.timedelta(days=horizon_days)).strftime(DATE_FORMAT)
+        return self.availability.next_free_slots(
+            master_ids, n, date_from, date_to,
+            after_minute=after.hour * 60 + after.minute,
+            min_duration=min_duration,
+            skip=lambda s: self.leases.held_by_other(s.get("master_id"), s.get("date"), s.get("slot_start"), owner,
+                                                     s.get("slot_end")),
+        )
+
+    def find_fitting_times(self, duration: int, n: int = 5, after: datetime.datetime = None, master_id: str = None,
+                           specialty: str = None, step: int = 30, horizon_days: int = 30, owner=None,
+                           date_to: str = None):
+        """
+        The n earliest start times (as {date, master_id, slot_start, slot_end})
+        where a duration-minute session fits in consecutive free time, e.g. a
+        4-hour piece across four free 60-minute slots; every step minutes
+        within each free stretch is a candidate. The search ends as in
+        find_next_free_slots.
+        """
+        after = after or datetime.datetime.now()
+        master_ids = [str(master_id)] if master_id else self.active_master_ids(specialty)
+        return self.availability.next_fitting_times(
+            master_ids, n,
+            after.strftime(DATE_FORMAT),
+            date_to or (after + datetime.timedelta(days=horizon_days)).strftime(DATE_FORMAT),
+            duration, step=step,
+            after_minute=after.hour * 60 + after.minute,
+            skip=lambda date, mid, start, end: self.leases.held_by_other(mid, date, start, owner, end),
+        )
+
+    def active_master_ids(self, specialty: str = None):
+        """Active masters, optionally only those whose specialties mention specialty"""
+        return [
+            str(m.get("id")) for m in self.masters_repo.list_masters()
+            if str(m.get("active", "")).lower() in ("yes", "true", "1")
+            and (not specialty or specialty.lower() in str(m.get("specialties", "")).lower())
+        ]
+
+    def hold_slot(self, owner, date: str, master_id: str, slot_start: str, slot_end: str) -> bool:
+        """Reserve a free slot for a client until they confirm (or the hold expires)"""
+        if not self.availability.fits(date, master_id, slot_start, slot_end):
+            return False
+        return self.leases.hold(master_id, date, slot_start, owner, slot_end=slot_end)
+
+    def release_slot(self, owner, date: str, master_id: str, slot_start: str) -> bool:
+        return self.leases.release(master_id, date, slot_start, owner)
+
+    def slot_fits(self, date: str, master_id: str, slot_start: str, slot_end: str) -> bool:
+        return self.availability.fits(date, master_id, slot_start, slot_end)
 
     def create_booking(self, client_telegram_id: int, client_name: str, client_phone: str, date: str, master_id: str, slot_start: str, slot_end: str, notes: str = ""):
-        client = self.clients_repo.create_client(client_telegram_id, client_name, phone=client_phone, notes=notes)
-        b = self.bookings_repo.create_booking(client["id"], master_id, date, slot_start, slot_end, status="pending")
-        masters = self.sp_client.read_sheet(self.spreadsheet_id, "masters")
-        calendar_id = None
-        for m in masters:
-            if m.get("id") == master_id:
-                calendar_id = m.get("calendar_id")
-                break
-        if calendar_id:
-            start_iso = f"{date}T{slot_start}:00"
-            end_iso = f"{date}T{slot_end}:00"
-            try:
-                event_id = self.calendar_service.push_booking_to_calendar(calendar_id, start_iso, end_iso, f"Tattoo - {client_name}")
-                return {"booking_id": b["id"], "event_id": event_id}
-            except Exception:
-                pass
+        # The client's hold (taken when the slot was chosen) turns into the booking;
+        # without one it is taken now, so no other client can take overlapping time
+        if not self.leases.hold(master_id, date, slot_start, client_telegram_id, slot_end=slot_end):
+            raise SlotUnavailableError(f"{date} {slot_start} is held by another client")
+        try:
+            client = self.clients_repo.upsert_client(client_telegram_id, client_name, phone=client_phone)
+            with self._locked((master_id, date)):
+                if self.availability.overlaps(date, master_id, slot_start, slot_end):
+                    raise SlotUnavailableError(f"{date} {slot_start}-{slot_end} is already booked")
+                b = self.bookings_repo.create_booking(client["id"], master_id, date, slot_start, slot_end, status="pending", notes=notes)
+                self.availability.book(b["id"], date, master_id, slot_start, slot_end)
+        finally:
+            self.leases.release(master_id, date, slot_start, client_telegram_id)
+        # The Calendar event is created in the background and its id written back to the row
+        self.calendar_jobs.enqueue_create(b["id"], master_id, date, slot_start, slot_end, f"Tattoo - {client_name}")
         return {"booking_id": b["id"], "event_id": None}
 
+    def cancel_booking(self, booking_id: str) -> bool:
+        """Mark a booking cancelled and give its time back; False if there is no such active booking"""
+        booking = self.bookings_repo.cancel(booking_id)
+        if booking is None:
+            return False
+        self.availability.release(booking_id, booking.get("date"), booking.get("master_id"))
+        self.calendar_jobs.enqueue_delete(booking_id, booking.get("master_id"), booking.get("google_event_id", ""),
+                                          booking.get("date"), booking.get("slot_start"))
+        return True
+
+    def reschedule_booking(self, booking_id: str, date: str, slot_start: str, slot_end: str = None,
+                           owner=None, client_name: str = None):
+        """
+        Move a booking (same master) to another date/time; slot_end defaults
+        to keeping its length. One row update; the old time is given back,
+        the new one taken, and the Calendar event is replaced in the
+        background. None if there is no such active booking; raises
+        SlotUnavailableError if the new time is held or booked.
+        """
+        booking = self.bookings_repo.get_booking(booking_id)
+        if booking is None or str(booking.get("status", "")).lower() in ARCHIVED_BOOKING_STATUSES:
+            return None
+        master_id, old_date, old_start, old_end = (
+            booking.get("master_id"), booking.get("date"), booking.get("slot_start"), booking.get("slot_end"))
+        if to_minutes(slot_start) is None:
+            raise ValueError(f"Invalid slot start: {slot_start}")
+        if slot_end is None:
+            length = (to_minutes(old_end) or 0) - (to_minutes(old_start) or 0)
+            slot_end = to_hhmm(to_minutes(slot_start) + max(length, 0))
+        owner = owner if owner is not None else f"booking:{booking_id}"
+        if not self.leases.hold(master_id, date, slot_start, owner, slot_end=slot_end):
+            raise SlotUnavailableError(f"{date} {slot_start} is held by another client")
+        try:
+            with self._locked((master_id, date), (master_id, old_date)):
+                # Load the new day before giving the old time back, so a move
+                # within the same day is not blocked by the booking itself
+                self.availability.day(date, master_id)
+                self.availability.release(booking_id, old_date, master_id)
+                moved = False
+                try:
+                    if self.availability.overlaps(date, master_id, slot_start, slot_end):
+                        raise SlotUnavailableError(f"{date} {slot_start}-{slot_end} is already booked")
+                    moved = self.bookings_repo.reschedule(booking_id, date, slot_start, slot_end) is not None
+                finally:
+                    # Take the new time, or put the old one back if the move did not happen
+                    if moved:
+                        self.availability.book(booking_id, date, master_id, slot_start, slot_end)
+                    else:
+                        self.availability.book(booking_id, old_date, master_id, old_start, old_end)
+        finally:
+            self.leases.release(master_id, date, slot_start, owner)
+        if not moved:
+            return None
+        self.calendar_jobs.enqueue_delete(booking_id, master_id, booking.get("google_event_id", ""), old_date, old_start)
+        self.calendar_jobs.enqueue_create(booking_id, master_id, date, slot_start, slot_end,
+                                          f"Tattoo - {client_name}" if client_name else "Tattoo booking")
+        return {"booking_id": booking_id, "master_id": master_id, "date": date,
+                "slot_start": slot_start, "slot_end": slot_end}
+
+    def add_slot(self, date: str, master_id: str, slot_start: str, slot_end: str, note: str = ""):
+        """Open a slot for booking (reopens a blocked one instead of adding a duplicate row)"""
+        self.calendar_repo.open_slot(date, master_id, slot_start, slot_end, note=note)
+        self.availability.invalidate(date)
+
+    def remove_slot(self, date: str, master_id: str, slot_start: str, note: str = "") -> bool:
+        """Block a slot; bookings already in it are kept"""
+        if not self.calendar_repo.remove_slot(master_id, date, slot_start, note=note):
+            return False
+        self.availability.invalidate(date)
+        return True
+
     def get_user_bookings(self, user_id: int, spreadsheet_id: str):
         """Get all bookings for a specific user by telegram ID"""
         # First, find the client by telegram_id
-        clients = self.clients_repo.list_clients()
-        client_id = None
-        for client in clients:
-            if str(client.get("telegram_id")) == str(user_id):
-                client_id = client.get("id")
-                break
+        client = self.clients_repo.find_by_telegram_id(user_id)
+        client_id = client.get("id") if client else None
         
         if not client_id:
             return []
         
         # Get all bookings for this client
-        bookings = self.bookings_repo.list_bookings()
+        bookings = self.bookings_repo.list_by_client(client_id)
         user_bookings = []
         for booking in bookings:
             if booking.get("client_id") == client_id:
@@ -0,0 +1,242 @@
+"""Background queue that mirrors bookings into Google Calendar, with retries"""
+import datetime
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from src.config.constants import ARCHIVED_BOOKING_STATUSES, DATE_FORMAT
+from src.db.repositories.bookings_repo import BookingsRepo
+from src.db.repositories.masters_repo import MastersRepo
+from src.utils.time_utils import to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Calendar event ids are base32hex (a-v, 0-9), 5-1024 characters
+_EVENT_ID_RE = re.compile(r"^[a-v0-9]{5,1024}$")
+
+# Deleting an event that is already gone
+_GONE_STATUSES = (404, 410)
+
+
+def booking_event_id(booking_id: str, date: str = "", slot_start: str = "") -> Optional[str]:
+    """
+    Event id derived from the booking id and its time, so a retried insert
+    cannot create a second event and a rescheduled booking never reuses the
+    id of its deleted event (Calendar keeps deleted ids reserved).
+    """
+    candidate = re.sub(r"[^0-9a-z]", "", f"{booking_id}{date}{slot_start}".lower())
+    return candidate if _EVENT_ID_RE.match(candidate) else None
+
+
+class CalendarJobQueue:
+    """
+    Creates and deletes the Google Calendar events of bookings on a
+    background thread, so confirming a booking costs only the row write.
+
+    A created event's id is written back to the booking's google_event_id.
+    Failed jobs are retried with exponential backoff (retry_base doubling up
+    to retry_max seconds) up to max_attempts, then logged and dropped. Jobs
+    live in memory; reconcile() re-queues upcoming bookings that still have
+    no event, which start() runs first to pick up work lost in a restart.
+    """
+
+    def __init__(self, sheets_client, spreadsheet_id: str, calendar_service,
+                 timezone: str = "Asia/Jerusalem", max_attempts: int = 8,
+                 retry_base: float = 5.0, retry_max: float = 600.0):
+        self.sc = sheets_client
+        self.spreadsheet_id = spreadsheet_id
+        self.calendar_service = calendar_service
+        self.timezone = timezone
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.bookings_repo = BookingsRepo(sheets_client, spreadsheet_id)
+        self.masters_repo = MastersRepo(sheets_client, spreadsheet_id)
+
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._done = 0
+        self._retries = 0
+        self._failed = 0
+        self._last_error: Optional[str] = None
+
+    # --- enqueueing ---
+
+    def enqueue_create(self, booking_id: str, master_id: str, date: str, slot_start: str, slot_end: str,
+                       summary: str, description: str = ""):
+        self._put({"op": "create", "booking_id": booking_id, "master_id": master_id, "date": date,
+                   "slot_start": slot_start, "slot_end": slot_end, "summary": summary,
+                   "description": description, "attempts": 0})
+
+    def enqueue_delete(self, booking_id: str, master_id: str, event_id: str = "",
+                       date: str = "", slot_start: str = ""):
+        """
+        Remove a booking's event; a create still waiting in the queue is
+        simply dropped. Without a stored event_id the id a create for
+        date/slot_start would have used is deleted, which covers a create
+        that was in flight.
+        """
+        with self._cond:
+            dropped = [j for j in self._queue if j[2]["op"] == "create" and j[2]["booking_id"] == booking_id]
+            if dropped:
+                self._queue = [j for j in self._queue if j not in dropped]
+                heapq.heapify(self._queue)
+                # A create that never ran has nothing to undo
+                if not event_id and all(j[2]["attempts"] == 0 for j in dropped):
+                    return
+        if not event_id and date:
+            event_id = booking_event_id(booking_id, date, slot_start) or ""
+        self._put({"op": "delete", "booking_id": booking_id, "master_id": master_id,
+                   "event_id": event_id, "attempts": 0})
+
+    def _put(self, job: Dict[str, Any], delay: float = 0.0):
+        with self._cond:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._seq), job))
+            self._cond.notify()
+
+    def reconcile(self, today: Optional[str] = None) -> int:
+        """Queue events for upcoming active bookings that have none; returns how many"""
+        today = today or datetime.date.today().strftime(DATE_FORMAT)
+        with self._cond:
+            queued = {j[2]["booking_id"] for j in self._queue}
+        count = 0
+        for b in self.bookings_repo.list_bookings():
+            if (b.get("google_event_id") or str(b.get("date", "")) < today
+                    or str(b.get("status", "")).lower() in ARCHIVED_BOOKING_STATUSES
+                    or b.get("id") in queued):
+                continue
+            self.enqueue_create(b.get("id"), b.get("master_id"), b.get("date"), b.get("slot_start"),
+                                b.get("slot_end"), "Tattoo booking")
+            count += 1
+        if count:
+            logger.info("Queued %s missing calendar events", count)
+        return count
+
+    # --- worker ---
+
+    def start(self, reconcile: bool = True):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(reconcile,), name="calendar-jobs", daemon=True)
+        self._thread.start()
+
+    def _run(self, reconcile: bool):
+        if reconcile:
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.warning("Calendar reconcile failed: %s", e)
+        while True:
+            with self._cond:
+                while not self._stop and (not self._queue or self._queue[0][0] > time.monotonic()):
+                    self._cond.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+                if self._stop:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                self._running += 1
+            try:
+                self._process(job)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def _process(self, job: Dict[str, Any]):
+        try:
+            if job["op"] == "create":
+                self._create(job)
+            else:
+                self._delete(job)
+            self._done += 1
+        except Exception as e:
+            job["attempts"] += 1
+            self._last_error = str(e)
+            if job["attempts"] >= self.max_attempts:
+                self._failed += 1
+                logger.error("Calendar %s for booking %s failed after %s attempts: %s",
+                             job["op"], job["booking_id"], job["attempts"], e)
+                return
+            self._retries += 1
+            delay = min(self.retry_max, self.retry_base * 2 ** (job["attempts"] - 1))
+            logger.warning("Calendar %s for booking %s failed (%s), retry in %.0fs",
+                           job["op"], job["booking_id"], e, delay)
+            self._put(job, delay)
+
+    def _calendar_id(self, master_id: str) -> Optional[str]:
+        for m in self.masters_repo.list_masters():
+            if str(m.get("id")) == str(master_id):
+                return m.get("calendar_id") or None
+        return None
+
+    def _create(self, job: Dict[str, Any]):
+        calendar_id = self._calendar_id(job["master_id"])
+        if not calendar_id:
+            return
+        start = to_datetime(job["date"], job["slot_start"], self.timezone).isoformat()
+        end = to_datetime(job["date"], job["slot_end"], self.timezone).isoformat()
+        event_id = self.calendar_service.push_booking_to_calendar(
+            calendar_id, start, end, job["summary"], job["description"],
+            event_id=booking_event_id(job["booking_id"], job["date"], job["slot_start"]),
+        )
+        if event_id:
+            self.bookings_repo.update_booking(job["booking_id"], google_event_id=event_id)
+
+    def _delete(self, job: Dict[str, Any]):
+        event_id = job["event_id"]
+        if not event_id:
+            booking = self.bookings_repo.get_booking(job["booking_id"])
+            event_id = booking.get("google_event_id") if booking else ""
+        calendar_id = self._calendar_id(job["master_id"])
+        if not event_id or not calendar_id:
+            return
+        try:
+            self.calendar_service.remove_booking_from_calendar(calendar_id, event_id)
+        except HttpError as e:
+            if getattr(e.resp, "status", None) not in _GONE_STATUSES:
+                raise
+
+    # --- lifecycle ---
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue) + self._running
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """Block until no job is due or running (jobs waiting for a retry do not count)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._running or (self._queue and self._queue[0][0] <= time.monotonic()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 0.1))
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Let due jobs finish (up to timeout), then stop; jobs still queued are picked up by the next reconcile"""
+        if self._thread is not None:
+            self.wait_idle(timeout)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending(),
+            "done": self._done,
+            "retries": self._retries,
+            "failed": self._failed,
+            "last_error": self._last_error,
+        }
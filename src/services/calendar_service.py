@@ -1,12 +1,18 @@
 import logging
+
+from src.db.metrics import tracked
+
 logger = logging.getLogger(__name__)
 
 class CalendarService:
     def __init__(self, sheets_client):
         self.sc = sheets_client
 
-    def push_booking_to_calendar(self, calendar_id: str, start_iso: str, end_iso: str, summary: str, description: str = ""):
-        return self.sc.create_calendar_event(calendar_id, start_iso, end_iso, summary, description)
+    @tracked("services.calendar_service.push_booking_to_calendar")
+    def push_booking_to_calendar(self, calendar_id: str, start_iso: str, end_iso: str, summary: str, description: str = "",
+                                 event_id: str = None):
+        return self.sc.create_calendar_event(calendar_id, start_iso, end_iso, summary, description, event_id)
 
+    @tracked("services.calendar_service.remove_booking_from_calendar")
     def remove_booking_from_calendar(self, calendar_id: str, event_id: str):
         return self.sc.delete_calendar_event(calendar_id, event_id)
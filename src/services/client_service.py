@@ -1,11 +1,146 @@
+import logging
+from typing import Any, Dict, List
+
+from src.config.constants import SHEET_BOOKINGS, SHEET_CLIENTS
+from src.db.records import RowDecoder
 from src.db.repositories.clients_repo import ClientsRepo
+from src.utils.validation import phone_normalize
+
+logger = logging.getLogger(__name__)
+
 
 class ClientService:
     def __init__(self, sheets_client, spreadsheet_id):
+        self.sc = sheets_client
+        self.spreadsheet_id = spreadsheet_id
         self.repo = ClientsRepo(sheets_client, spreadsheet_id)
 
     def register_client(self, telegram_id: int, name: str, phone: str = "", email: str = ""):
-        existing = [c for c in self.repo.list_clients() if c.get("telegram_id") == str(telegram_id)]
-        if existing:
-            return existing[0]
-        return self.repo.create_client(telegram_id, name, phone, email)
+        return self.repo.upsert_client(telegram_id, name, phone, email)
+
+    def dedupe_clients(self, apply: bool = False) -> Dict[str, Any]:
+        """
+        One-off compaction of the clients tab: rows sharing a telegram_id, or
+        a normalized phone without conflicting telegram_ids, are merged into
+        the oldest one (its empty fields filled from the duplicates, phone
+        normalized), bookings of the duplicates are re-pointed to it, and the
+        duplicate rows are deleted. Rows sharing a phone but belonging to
+        different telegram accounts are left alone and listed under
+        "conflicts". Costs two reads, two batch updates and one delete; with
+        apply=False only reports what it would do.
+        """
+        self.sc.flush_writes(self.spreadsheet_id)
+        values = self.sc.read_range(self.spreadsheet_id, SHEET_CLIENTS)
+        if len(values) < 2:
+            return {"clients": 0, "duplicates": 0, "bookings_moved": 0, "conflicts": []}
+        header, decoder = [str(h) for h in values[0]], RowDecoder(SHEET_CLIENTS, values[0])
+        rows = [decoder.decode(raw) for raw in values[1:]]
+
+        # Union rows that share a telegram_id, then rows that share a phone as
+        # long as that joins at most one telegram_id (two telegram accounts on
+        # one phone are two people, as in upsert_client); the earliest row of
+        # a group is kept
+        parent = list(range(len(rows)))
+        telegram_ids: Dict[int, set] = {}
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int):
+            a, b = sorted((find(i), find(j)))
+            if a != b:
+                parent[b] = a
+                telegram_ids[a] = telegram_ids.get(a, set()) | telegram_ids.pop(b, set())
+
+        by_telegram: Dict[str, int] = {}
+        by_phone: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            telegram_id = str(row.get("telegram_id", "")).strip()
+            if telegram_id:
+                telegram_ids[i] = {telegram_id}
+                if telegram_id in by_telegram:
+                    union(by_telegram[telegram_id], i)
+                else:
+                    by_telegram[telegram_id] = i
+            phone = phone_normalize(str(row.get("phone", "")))
+            if phone:
+                by_phone.setdefault(phone, []).append(i)
+
+        conflicts: List[Dict[str, Any]] = []
+        for phone, members in by_phone.items():
+            roots = {find(i) for i in members}
+            involved = set().union(*(telegram_ids.get(r, set()) for r in roots))
+            if len(involved) > 1:
+                conflicts.append({"phone": phone, "telegram_ids": sorted(involved),
+                                  "client_ids": [str(rows[i].get("id")) for i in members]})
+                continue
+            for i in members[1:]:
+                union(members[0], i)
+        keeper_of = {i: find(i) for i in range(len(rows))}
+
+        groups: Dict[int, List[int]] = {}
+        for i, keeper in keeper_of.items():
+            groups.setdefault(keeper, []).append(i)
+
+        client_updates: Dict[int, List[Any]] = {}
+        redirect: Dict[str, str] = {}
+        duplicates: List[int] = []
+        for keeper, members in groups.items():
+            merged = {c: str(rows[keeper].get(c, "")) for c in header}
+            for i in members[1:]:
+                for c in header:
+                    if not merged[c] and rows[i].get(c, ""):
+                        merged[c] = str(rows[i].get(c, ""))
+                redirect[str(rows[i].get("id"))] = merged.get("id", "")
+                duplicates.append(i + 1)
+            if "phone" in merged:
+                merged["phone"] = phone_normalize(merged["phone"])
+            new_row = [merged[c] for c in header]
+            if [str(rows[keeper].get(c, "")) for c in header] != new_row:
+                client_updates[keeper + 1] = new_row
+
+        booking_updates = self._redirect_bookings(redirect)
+        report = {
+            "clients": len(rows),
+            "duplicates": len(duplicates),
+            "clients_updated": len(client_updates),
+            "bookings_moved": len(booking_updates),
+            "conflicts": conflicts,
+        }
+        for conflict in conflicts:
+            logger.warning("Clients %s share phone %s but have different telegram ids %s; not merged",
+                           ", ".join(conflict["client_ids"]), conflict["phone"], ", ".join(conflict["telegram_ids"]))
+        if not apply:
+            return report
+        if booking_updates:
+            self.sc.batch_update_rows(self.spreadsheet_id, SHEET_BOOKINGS, booking_updates)
+        if client_updates:
+            self.sc.batch_update_rows(self.spreadsheet_id, SHEET_CLIENTS, client_updates)
+        if duplicates:
+            self.sc.delete_rows(self.spreadsheet_id, SHEET_CLIENTS, duplicates)
+        logger.info("Deduplicated clients: %s", report)
+        return report
+
+    def _redirect_bookings(self, redirect: Dict[str, str]) -> Dict[int, List[Any]]:
+        """row_index -> row that only rewrites client_id, for bookings of merged-away clients"""
+        if not redirect:
+            return {}
+        values = self.sc.read_range(self.spreadsheet_id, SHEET_BOOKINGS)
+        if not values:
+            return {}
+        header = [str(h) for h in values[0]]
+        if "client_id" not in header:
+            return {}
+        col = header.index("client_id")
+        updates = {}
+        for row_index, raw in enumerate(values[1:], 1):
+            old = str(raw[col]) if col < len(raw) else ""
+            if old in redirect:
+                # None cells are left untouched by the write
+                row: List[Any] = [None] * (col + 1)
+                row[col] = redirect[old]
+                updates[row_index] = row
+        return updates
@@ -632,12 +632,12 @@ class INKA:
     Now includes S2 Booking Engine integration
     """
 
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize INKA with all components including S2 Booking Engine"""
+    def __init__(self, api_key: Optional[str] = None, leases=None):
+        """Initialize INKA with all components including S2 Booking Engine (leases: shared slot holds)"""
         self.classifier = INKAClassifier()
         self.consultant = INKAConsultant(api_key)
         self.booking_assistant = INKABookingAssistant()
-        self.booking_engine = INKABookingEngine()  # New S2 Booking Engine
+        self.booking_engine = INKABookingEngine(leases)  # New S2 Booking Engine
 
     def process(
         self,
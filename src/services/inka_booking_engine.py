@@ -16,6 +16,8 @@ from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
+from src.services.slot_leases import SlotLeaseManager
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,9 +45,10 @@ class INKABookingEngine:
     - Directly interact with database
     """
 
-    def __init__(self):
-        """Initialize Booking Engine"""
+    def __init__(self, leases: Optional[SlotLeaseManager] = None):
+        """Initialize Booking Engine (leases: shared slot holds, see SlotLeaseManager)"""
         self.stage = None
+        self.leases = leases
 
     def format_slots_for_display(self, slots: List[Dict]) -> List[Dict]:
         """
@@ -204,7 +207,8 @@ class INKABookingEngine:
     def validate_slot_selection(
         self,
         slot_id: str,
-        available_slots: List[Dict]
+        available_slots: List[Dict],
+        owner: Optional[str] = None
     ) -> Dict:
         """
         Validate that selected slot is still available
@@ -212,6 +216,7 @@ class INKABookingEngine:
         Args:
             slot_id: Selected slot ID
             available_slots: Current list of available slots
+            owner: Client choosing the slot; a hold by anyone else makes it invalid
         
         Returns:
             {
@@ -222,6 +227,12 @@ class INKABookingEngine:
         """
         for slot in available_slots:
             if slot.get("slot_id") == slot_id:
+                if self._held_by_other(slot, owner):
+                    return {
+                        "valid": False,
+                        "slot": None,
+                        "reason": "Slot is held by another client"
+                    }
                 if slot.get("available", True):
                     return {
                         "valid": True,
@@ -241,6 +252,13 @@ class INKABookingEngine:
             "reason": "Slot not found"
         }
 
+    def _held_by_other(self, slot: Dict, owner: Optional[str]) -> bool:
+        if self.leases is None:
+            return False
+        start = slot.get("start_time") or slot.get("slot_start")
+        end = slot.get("end_time") or slot.get("slot_end")
+        return self.leases.held_by_other(slot.get("master_id", ""), slot.get("date"), start, owner, end)
+
     def get_system_prompt_for_stage(self, stage: str) -> str:
         """
         Get system prompt for OpenAI based on current stage
@@ -3,7 +3,9 @@
 from typing import Optional
 from src.config.env_loader import load_env
 from src.config.config import Config
+from src.config.constants import SHEET_CLIENTS
 from src.db.sheets_client import SheetsClient
+from src.services.service_factory import get_sheets_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,41 +22,24 @@ class UserLanguageService:
         """Set user language preference"""
         try:
             # Check if user exists in clients table
-            clients = self.sheets.read_sheet(self.spreadsheet_id, "clients")
-            user_exists = False
-            user_row = None
+            clients = self.sheets.query_sheet(self.spreadsheet_id, SHEET_CLIENTS, telegram_id=str(user_id))
 
-            for i, client in enumerate(clients):
-                if len(client) > 1 and str(client[1]) == str(user_id):
-                    user_exists = True
-                    user_row = i + 2  # +2 because of header and 1-based indexing
-                    break
-
-            if user_exists and user_row:
+            if clients:
                 # Update language in clients table (add language column if needed)
                 # For now, store in a separate language mapping
                 try:
-                    languages = self.sheets.read_sheet(self.spreadsheet_id, "user_languages")
-                except:
+                    # Update existing (located by user_id, one targeted write)
+                    if self.sheets.update_fields(
+                        self.spreadsheet_id, "user_languages", str(user_id), {"language": language}
+                    ) is not None:
+                        return True
+                except Exception:
                     # Create table if doesn't exist
                     self.sheets.append_row(
                         self.spreadsheet_id,
                         "user_languages!A:B",
                         ["user_id", "language"]
                     )
-                    languages = []
-
-                # Check if user already has language set
-                for lang_row in languages[1:]:  # Skip header
-                    if len(lang_row) > 0 and str(lang_row[0]) == str(user_id):
-                        # Update existing
-                        self.sheets.update_row(
-                            self.spreadsheet_id,
-                            "user_languages",
-                            languages.index(lang_row) + 1,
-                            [user_id, language]
-                        )
-                        return True
 
                 # Add new
                 self.sheets.append_row(
@@ -73,11 +58,9 @@ class UserLanguageService:
     def get_user_language(self, user_id: int) -> str:
         """Get user language preference (default: Russian)"""
         try:
-            languages = self.sheets.read_sheet(self.spreadsheet_id, "user_languages")
-
-            for lang_row in languages[1:]:  # Skip header
-                if len(lang_row) > 0 and str(lang_row[0]) == str(user_id):
-                    return lang_row[1] if len(lang_row) > 1 else "ru"
+            found = self.sheets.find_row(self.spreadsheet_id, "user_languages", str(user_id))
+            if found:
+                return found[1].get("language") or "ru"
 
             return "ru"  # Default to Russian
 
@@ -87,9 +70,14 @@ class UserLanguageService:
 
 
 # Global instance
+_language_service: Optional[UserLanguageService] = None
+
+
 def get_language_service() -> UserLanguageService:
     """Get or create language service"""
-    load_env()
-    cfg = Config.from_env()
-    sc = SheetsClient(cfg.GOOGLE_CREDENTIALS_PATH, cfg.GOOGLE_TOKEN_PATH)
-    return UserLanguageService(sc, cfg.SPREADSHEET_ID)
+    global _language_service
+    if _language_service is None:
+        load_env()
+        cfg = Config.from_env()
+        _language_service = UserLanguageService(get_sheets_client(), cfg.SPREADSHEET_ID)
+    return _language_service
@@ -3,46 +3,159 @@ Service factories - создают экземпляры сервисов с по
 """
 
 import logging
+import threading
 from typing import Optional
 
-from src.db.sheets_client import SheetsClient
+from src.db.backends import MemoryBackend, SheetsBackend, SQLiteBackend, StorageBackend
+from src.db.async_sheets import AsyncSheetsClient
+from src.db.journal import JournaledStorage, WriteJournal
+from src.db.rate_limit import configure_limits
+from src.db.sqlite_replica import SheetsReplica
 from src.services.booking_service import BookingService
+from src.services.calendar_jobs import CalendarJobQueue
 from src.services.calendar_service import CalendarService
 from src.services.client_service import ClientService
 from src.services.admin_service import AdminService
+from src.services.archive_service import ArchiveService
 from src.services.master_service import MasterService
+from src.services.slot_leases import SlotLeaseManager
 from src.config.config import Config
 from src.config.env_loader import load_env
 
 logger = logging.getLogger(__name__)
 
 # Глобальные экземпляры
-_sheets_client: Optional[SheetsClient] = None
+_sheets_client: Optional[StorageBackend] = None
+_sheets_client_lock = threading.Lock()
+_async_sheets_client: Optional[AsyncSheetsClient] = None
 _booking_service: Optional[BookingService] = None
 _calendar_service: Optional[CalendarService] = None
 _client_service: Optional[ClientService] = None
 _admin_service: Optional[AdminService] = None
 _master_service: Optional[MasterService] = None
+_archive_service: Optional[ArchiveService] = None
+_slot_leases: Optional[SlotLeaseManager] = None
+_calendar_jobs: Optional[CalendarJobQueue] = None
 
 
-def get_sheets_client() -> SheetsClient:
-    """Получить или создать sheets client"""
+def _create_storage_backend(cfg: Config) -> StorageBackend:
+    """Хранилище по Config.STORAGE_BACKEND: sheets, sqlite или memory"""
+    if cfg.STORAGE_BACKEND == MemoryBackend.name:
+        return MemoryBackend(page_size=cfg.SHEETS_READ_CHUNK)
+    if cfg.STORAGE_BACKEND == SQLiteBackend.name:
+        return SQLiteBackend(cfg.STORAGE_SQLITE_PATH, page_size=cfg.SHEETS_READ_CHUNK)
+    if cfg.STORAGE_BACKEND != SheetsBackend.name:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {cfg.STORAGE_BACKEND}")
+
+    configure_limits(cfg.SHEETS_QUOTA_PER_MINUTE, cfg.CALENDAR_QUOTA_PER_MINUTE)
+    pool = SheetsBackend(
+        creds_path=cfg.GOOGLE_CREDENTIALS_PATH,
+        token_path=cfg.GOOGLE_TOKEN_PATH,
+        size=cfg.SHEETS_POOL_SIZE,
+        cache_ttl=cfg.SHEETS_CACHE_TTL,
+        full_refresh_interval=cfg.SHEETS_FULL_REFRESH,
+        # С журналом записи уже буферизуются и пакетируются при воспроизведении
+        write_behind=cfg.SHEETS_WRITE_BEHIND and not cfg.SHEETS_JOURNAL_PATH,
+        flush_interval=cfg.SHEETS_FLUSH_INTERVAL,
+        write_batch=cfg.SHEETS_WRITE_BATCH,
+        read_chunk=cfg.SHEETS_READ_CHUNK
+    )
+    if cfg.SHEETS_REPLICA_PATH:
+        pool.attach_replica(SheetsReplica(
+            pool,
+            cfg.SPREADSHEET_ID,
+            path=cfg.SHEETS_REPLICA_PATH,
+            refresh_interval=cfg.SHEETS_REPLICA_REFRESH
+        ))
+        logger.info(f"✅ SQLite replica attached: {cfg.SHEETS_REPLICA_PATH}")
+    if cfg.SHEETS_JOURNAL_PATH:
+        journal = WriteJournal(cfg.SHEETS_JOURNAL_PATH)
+        logger.info(f"✅ Write journal: {cfg.SHEETS_JOURNAL_PATH} ({len(journal.pending())} pending)")
+        return JournaledStorage(pool, journal, replay_interval=cfg.SHEETS_JOURNAL_REPLAY_INTERVAL,
+                                max_attempts=cfg.SHEETS_JOURNAL_MAX_ATTEMPTS)
+    return pool
+
+
+def get_sheets_client() -> StorageBackend:
+    """Получить или создать общее хранилище (один на процесс; по умолчанию пул Google Sheets)"""
     global _sheets_client
     if _sheets_client is None:
-        try:
-            load_env()
-            cfg = Config.from_env()
-            _sheets_client = SheetsClient(
-                creds_path=cfg.GOOGLE_CREDENTIALS_PATH,
-                token_path=cfg.GOOGLE_TOKEN_PATH
-            )
-            logger.info("✅ Sheets client initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize sheets client: {e}")
-            raise
+        with _sheets_client_lock:
+            if _sheets_client is None:
+                try:
+                    load_env()
+                    cfg = Config.from_env()
+                    _sheets_client = _create_storage_backend(cfg)
+                    logger.info(f"✅ Storage backend initialized: {cfg.STORAGE_BACKEND}")
+                except Exception as e:
+                    logger.error(f"Failed to initialize sheets client: {e}")
+                    raise
     return _sheets_client
 
 
+def get_async_sheets_client() -> AsyncSheetsClient:
+    """Получить asyncio-фасад над общим пулом (для async handlers)"""
+    global _async_sheets_client
+    if _async_sheets_client is None:
+        sheets_client = get_sheets_client()
+        cfg = Config.from_env()
+        with _sheets_client_lock:
+            if _async_sheets_client is None:
+                _async_sheets_client = AsyncSheetsClient(
+                    sheets_client,
+                    max_workers=cfg.SHEETS_POOL_SIZE,
+                    timeout=cfg.SHEETS_CALL_TIMEOUT
+                )
+                logger.info("✅ Async sheets client initialized")
+    return _async_sheets_client
+
+
+def shutdown_sheets_client():
+    """Дописать буферизованные записи и остановить фоновые потоки (при остановке бота)"""
+    global _async_sheets_client, _calendar_jobs
+    if _calendar_jobs is not None:
+        _calendar_jobs.close()
+        _calendar_jobs = None
+    if _async_sheets_client is not None:
+        _async_sheets_client.shutdown()
+        _async_sheets_client = None
+    if _sheets_client is not None:
+        _sheets_client.close()
+        logger.info("✅ Storage backend closed")
+
+
+def get_slot_leases() -> SlotLeaseManager:
+    """Получить общие удержания слотов (между выбором слота и подтверждением)"""
+    global _slot_leases
+    if _slot_leases is None:
+        load_env()
+        cfg = Config.from_env()
+        _slot_leases = SlotLeaseManager(ttl=cfg.SLOT_HOLD_SECONDS)
+    return _slot_leases
+
+
+def get_calendar_jobs() -> CalendarJobQueue:
+    """Получить фоновую очередь событий Google Calendar (создание/удаление с повторами)"""
+    global _calendar_jobs
+    if _calendar_jobs is None:
+        sheets_client = get_sheets_client()
+        calendar_service = get_calendar_service()
+        cfg = Config.from_env()
+        with _sheets_client_lock:
+            if _calendar_jobs is None:
+                jobs = CalendarJobQueue(
+                    sheets_client,
+                    cfg.SPREADSHEET_ID,
+                    calendar_service,
+                    timezone=cfg.DEFAULT_TIMEZONE,
+                    max_attempts=cfg.CALENDAR_JOB_ATTEMPTS
+                )
+                jobs.start()
+                _calendar_jobs = jobs
+                logger.info("✅ Calendar job queue started")
+    return _calendar_jobs
+
+
 def get_booking_service() -> BookingService:
     """Получить или создать booking service"""
     global _booking_service
@@ -51,7 +164,10 @@ def get_booking_service() -> BookingService:
         cfg = Config.from_env()
         _booking_service = BookingService(
             sheets_client=sheets_client,
-            spreadsheet_id=cfg.SPREADSHEET_ID
+            spreadsheet_id=cfg.SPREADSHEET_ID,
+            availability_ttl=cfg.AVAILABILITY_TTL,
+            leases=get_slot_leases(),
+            calendar_jobs=get_calendar_jobs()
         )
         logger.info("✅ Booking service initialized")
     return _booking_service
@@ -109,12 +225,32 @@ def get_master_service() -> MasterService:
     return _master_service
 
 
+def get_archive_service() -> ArchiveService:
+    """Получить или создать archive service (перенос старых строк в архивные вкладки)"""
+    global _archive_service
+    if _archive_service is None:
+        sheets_client = get_sheets_client()
+        cfg = Config.from_env()
+        _archive_service = ArchiveService(
+            sheets_client=sheets_client,
+            spreadsheet_id=cfg.SPREADSHEET_ID,
+            batch_size=cfg.ARCHIVE_BATCH
+        )
+        logger.info("✅ Archive service initialized")
+    return _archive_service
+
+
 # Export
 __all__ = [
     "get_sheets_client",
+    "get_async_sheets_client",
+    "shutdown_sheets_client",
     "get_booking_service",
     "get_calendar_service",
     "get_client_service",
     "get_admin_service",
-    "get_master_service"
+    "get_master_service",
+    "get_archive_service",
+    "get_slot_leases",
+    "get_calendar_jobs"
 ]
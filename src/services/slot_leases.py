@@ -0,0 +1,120 @@
+"""In-process TTL holds on slots between selection and confirmation"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from src.services.availability import to_minutes
+
+SlotKey = Tuple[str, str, str]
+# owner, expiry (monotonic), start and end minute of the held time
+Lease = Tuple[str, float, Optional[int], Optional[int]]
+
+
+class SlotUnavailableError(Exception):
+    """The slot is held by another client or already booked"""
+
+
+def slot_key(master_id: Any, date: Any, slot_start: Any) -> SlotKey:
+    return str(master_id), str(date), str(slot_start)
+
+
+def _span(slot_start: Any, slot_end: Any = None) -> Tuple[Optional[int], Optional[int]]:
+    """Held minutes [start, end); without a usable end just the start minute"""
+    start, end = to_minutes(slot_start), to_minutes(slot_end) if slot_end else None
+    if start is None:
+        return None, None
+    return start, end if end is not None and end > start else start + 1
+
+
+class SlotLeaseManager:
+    """
+    Holds on a master's time, keyed by (master, date, slot_start) and owned
+    by an owner (the client's telegram id). A hold covers slot_start to
+    slot_end when the end is given: a client takes one when choosing a slot,
+    and other clients neither see nor can hold or book any time overlapping
+    it until the hold is released (on booking or cancel) or expires after
+    ttl seconds. Holds of the same owner may overlap.
+
+    Everything lives in memory under one lock, so checks cost no API
+    reads; the holds only cover this process.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._days: Dict[Tuple[str, str], Dict[str, Lease]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, master_id: Any, date: Any, now: float) -> Dict[str, Lease]:
+        """Unexpired holds of a master's day (lock held)"""
+        day_key = (str(master_id), str(date))
+        day = self._days.get(day_key)
+        if not day:
+            return {}
+        for start in [s for s, lease in day.items() if lease[1] <= now]:
+            del day[start]
+        if not day:
+            del self._days[day_key]
+        return day
+
+    @staticmethod
+    def _conflicts(day: Dict[str, Lease], slot_start: str, span, owner: Optional[str]) -> Optional[str]:
+        """Owner of another hold overlapping [start, end) (or at the same key), None if there is none"""
+        start, end = span
+        for key, (holder, _, s, e) in day.items():
+            if owner is not None and holder == owner:
+                continue
+            if key == slot_start or (start is not None and s is not None and s < end and start < e):
+                return holder
+        return None
+
+    def hold(self, master_id, date, slot_start, owner, ttl: Optional[float] = None, slot_end=None) -> bool:
+        """Take or extend a hold; False if another owner holds overlapping time"""
+        slot_start, owner, now = str(slot_start), str(owner), time.monotonic()
+        span = _span(slot_start, slot_end)
+        with self._lock:
+            day = self._live(master_id, date, now)
+            if self._conflicts(day, slot_start, span, owner) is not None:
+                return False
+            expires = now + (self.ttl if ttl is None else ttl)
+            self._days.setdefault((str(master_id), str(date)), {})[slot_start] = (owner, expires) + span
+            return True
+
+    def release(self, master_id, date, slot_start, owner=None) -> bool:
+        """Drop a hold (only the owner's, if owner is given)"""
+        slot_start = str(slot_start)
+        with self._lock:
+            day = self._live(master_id, date, time.monotonic())
+            lease = day.get(slot_start)
+            if lease is None or (owner is not None and lease[0] != str(owner)):
+                return False
+            del day[slot_start]
+            if not day:
+                del self._days[(str(master_id), str(date))]
+            return True
+
+    def release_owner(self, owner) -> int:
+        """Drop every hold of an owner (the client left the booking flow)"""
+        owner, count = str(owner), 0
+        with self._lock:
+            for day_key in list(self._days):
+                day = self._days[day_key]
+                for start in [s for s, lease in day.items() if lease[0] == owner]:
+                    del day[start]
+                    count += 1
+                if not day:
+                    del self._days[day_key]
+        return count
+
+    def held_by_other(self, master_id, date, slot_start, owner=None, slot_end=None) -> bool:
+        """Whether someone other than owner holds time overlapping slot_start (to slot_end)"""
+        slot_start = str(slot_start)
+        span = _span(slot_start, slot_end)
+        with self._lock:
+            day = self._live(master_id, date, time.monotonic())
+            return self._conflicts(day, slot_start, span, None if owner is None else str(owner)) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            live = sum(len(self._live(m, d, now)) for m, d in list(self._days))
+        return {"held": live, "ttl": self.ttl}
@@ -3,6 +3,8 @@ import logging
 from datetime import datetime, timedelta
 from src.db.repositories.calendar_repo import CalendarRepo
 from src.db.repositories.masters_repo import MastersRepo
+from src.config.constants import SHEET_CALENDAR
+from src.db.metrics import tracked
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,7 @@ class SyncService:
         self.calendar_repo = CalendarRepo(sheets_client, spreadsheet_id)
         self.masters_repo = MastersRepo(sheets_client, spreadsheet_id)
 
+    @tracked("services.sync_service.sync_calendar_slots")
     def sync_calendar_slots(self, master_id: str, calendar_id: str, days_ahead: int = 30, slot_duration_minutes: int = 60):
         """
         Sync free slots from Google Calendar to Sheets
@@ -52,12 +55,11 @@ class SyncService:
                 )
                 all_slots.extend(free_slots)
             
-            # Add all slots in batch (single request)
-            if all_slots:
-                self._add_slots_batch(master_id, all_slots)
+            # Add all new slots in batch (single request)
+            added = self._add_slots_batch(master_id, all_slots) if all_slots else 0
             
-            logger.info(f"✅ Synced {len(all_slots)} slots for master {master_id}")
-            return {"status": "success", "synced": len(all_slots)}
+            logger.info(f"✅ Synced {len(all_slots)} slots for master {master_id} ({added} new)")
+            return {"status": "success", "synced": len(all_slots), "added": added}
         except Exception as e:
             logger.exception(f"❌ Calendar sync failed: {e}")
             return {"status": "error", "message": str(e)}
@@ -69,15 +71,9 @@ class SyncService:
             start_iso = f"{start_date}T00:00:00Z"
             end_iso = f"{end_date}T23:59:59Z"
             
-            events = self.sheets_client.service_calendar.events().list(
-                calendarId=calendar_id,
-                timeMin=start_iso,
-                timeMax=end_iso,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+            events = self.sheets_client.list_calendar_events(calendar_id, start_iso, end_iso)
             
-            for event in events.get('items', []):
+            for event in events:
                 if event.get('start', {}).get('dateTime'):
                     start_dt = datetime.fromisoformat(event['start']['dateTime'].replace('Z', '+00:00'))
                     end_dt = datetime.fromisoformat(event['end']['dateTime'].replace('Z', '+00:00'))
@@ -150,8 +146,12 @@ class SyncService:
     def _add_slots_batch(self, master_id: str, slots: list):
         """Add multiple slots in a single batch request"""
         try:
+            # Slots from earlier syncs are already in the tab; only new ones are appended
+            existing = {(s.get("date"), s.get("slot_start")) for s in self.calendar_repo.list_by_master(master_id)}
             rows = []
             for slot in slots:
+                if (slot["date"], slot["start"]) in existing:
+                    continue
                 row = [
                     slot["date"],
                     master_id,
@@ -164,14 +164,9 @@ class SyncService:
             
             # Batch append all rows at once
             if rows:
-                body = {"values": rows}
-                self.sheets_client.service_sheets.spreadsheets().values().append(
-                    spreadsheetId=self.spreadsheet_id,
-                    range="calendar",
-                    valueInputOption="RAW",
-                    body=body
-                ).execute()
+                self.sheets_client.append_rows(self.spreadsheet_id, SHEET_CALENDAR, rows)
                 logger.info(f"✅ Added {len(rows)} slots for {master_id}")
+            return len(rows)
         except Exception as e:
             logger.exception(f"Failed to add slots batch: {e}")
             raise
@@ -8,9 +8,12 @@ def now(tz_name: str = "Asia/Jerusalem") -> datetime:
     return datetime.now(tz)
 
 def to_datetime(date_str: str, time_str: str, tz_name: str = "Asia/Jerusalem") -> datetime:
-    """Convert date and time strings to datetime with timezone"""
+    """Convert date and time strings to datetime with timezone ("24:00" is midnight at the end of the day)"""
     tz = pytz.timezone(tz_name)
-    dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+    if time_str == "24:00":
+        dt = datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)
+    else:
+        dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
     return tz.localize(dt)
 
 def to_iso_format(dt: datetime) -> str:
@@ -1,6 +1,8 @@
 """Pytest configuration and fixtures"""
 import pytest
 import sys
+import time
+import types
 from pathlib import Path
 from unittest.mock import Mock, MagicMock
 from datetime import datetime, timedelta
@@ -10,6 +12,8 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.config.config import Config
+import src.db.rate_limit as rate_limit
+import src.db.sheet_cache as sheet_cache
 
 
 @pytest.fixture
@@ -114,3 +118,19 @@ def sample_free_slots():
         }
         for i in range(1, 8)
     ]
+
+
+@pytest.fixture
+def cache_clock(monkeypatch):
+    """Drives the monotonic clock of SheetCache only (rate limiting keeps real time): cache_clock[0] = seconds"""
+    now = [1000.0]
+    monkeypatch.setattr(sheet_cache, "time", types.SimpleNamespace(monotonic=lambda: now[0], time=time.time))
+    return now
+
+
+@pytest.fixture(autouse=True)
+def quota_limiters(monkeypatch):
+    """Fresh API limiters per test with room for every call, so tests neither share counters nor wait for tokens"""
+    limiters = {api: rate_limit.QuotaLimiter(api, 60_000) for api in ("sheets", "calendar")}
+    monkeypatch.setattr(rate_limit, "_limiters", limiters)
+    return limiters
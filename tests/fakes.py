@@ -0,0 +1,118 @@
+"""In-memory stand-ins for the Google APIs, shared by the tests"""
+import re
+from typing import Any, Dict, List
+
+from src.db.sheet_cache import SheetCache
+from src.db.sheets_client import SheetsClient
+
+_A1_RE = re.compile(r"A(\d+)(?::[A-Z]+(\d+)?)?$")
+
+
+class _Request:
+    def __init__(self, run):
+        self.run = run
+
+    def execute(self, *args, **kwargs):
+        return self.run()
+
+
+class FakeSheets:
+    """
+    The part of the Sheets v4 service SheetsClient uses, over in-memory tabs
+    (lists of rows, header first). Windows come back with trailing blank
+    rows trimmed, as from Sheets. Every range read is logged in `calls`,
+    every batchGet in `batches`, every write in `writes`.
+    """
+
+    def __init__(self, tabs: Dict[str, List[List[Any]]]):
+        self.tabs = {name: [list(r) for r in rows] for name, rows in tabs.items()}
+        self.calls: List[str] = []
+        self.batches: List[List[str]] = []
+        self.writes: List[str] = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, range_a1: str) -> List[List[Any]]:
+        tab, _, cells = range_a1.partition("!")
+        rows = self.tabs.get(tab, [])
+        if not cells:
+            return [list(r) for r in rows]
+        match = _A1_RE.match(cells)
+        first, last = int(match.group(1)), int(match.group(2) or len(rows))
+        window = [list(r) for r in rows[first - 1:last]]
+        while window and not any(window[-1]):
+            window.pop()
+        return window
+
+    def _write(self, range_a1: str, values: List[List[Any]]):
+        tab, _, cells = range_a1.partition("!")
+        rows = self.tabs.setdefault(tab, [])
+        first = int(_A1_RE.match(cells).group(1))
+        for i, row in enumerate(values, first - 1):
+            while len(rows) <= i:
+                rows.append([])
+            rows[i] = list(row)
+
+    # --- values ---
+
+    def get(self, spreadsheetId, range=None, fields=None):
+        if range is None:
+            # spreadsheets().get: tab titles and ids (tabs are numbered in order)
+            return _Request(lambda: {"sheets": [
+                {"properties": {"sheetId": i, "title": title}} for i, title in enumerate(self.tabs)
+            ]})
+        self.calls.append(range)
+        return _Request(lambda: {"values": self._read(range)})
+
+    def batchGet(self, spreadsheetId, ranges):
+        self.calls.extend(ranges)
+        self.batches.append(list(ranges))
+        return _Request(lambda: {"valueRanges": [{"values": self._read(r)} for r in ranges]})
+
+    def update(self, spreadsheetId, range, valueInputOption, body):
+        self.writes.append(range)
+        return _Request(lambda: self._write(range, body["values"]) or {})
+
+    def append(self, spreadsheetId, range, valueInputOption, body):
+        self.writes.append(range)
+
+        def run():
+            rows = self.tabs.setdefault(range.split("!", 1)[0], [])
+            first = len(rows) + 1
+            rows.extend(list(r) for r in body["values"])
+            return {"updates": {"updatedRange": f"{range}!A{first}:ZZ{len(rows)}",
+                                "updatedRows": len(body["values"])}}
+        return _Request(run)
+
+    def batchUpdate(self, spreadsheetId, body):
+        if "data" in body:
+            self.writes.extend(d["range"] for d in body["data"])
+
+            def write_all():
+                for data in body["data"]:
+                    self._write(data["range"], data["values"])
+                return {}
+            return _Request(write_all)
+        self.writes.append("batchUpdate")
+
+        def run():
+            titles = list(self.tabs)
+            for request in body["requests"]:
+                if "addSheet" in request:
+                    self.tabs.setdefault(request["addSheet"]["properties"]["title"], [])
+                elif "deleteDimension" in request:
+                    span = request["deleteDimension"]["range"]
+                    del self.tabs[titles[span["sheetId"]]][span["startIndex"]:span["endIndex"]]
+            return {}
+        return _Request(run)
+
+
+def sheets_client(fake: FakeSheets, cache: SheetCache = None) -> SheetsClient:
+    """A SheetsClient talking to fake, without credentials"""
+    client = SheetsClient(creds=object(), cache=cache if cache is not None else SheetCache())
+    client.service_sheets = fake
+    return client
@@ -0,0 +1,94 @@
+"""Tests for moving finished rows into monthly archive tabs"""
+import pytest
+
+from src.db.backends.memory import MemoryBackend
+from src.services.archive_service import ArchiveService
+
+TODAY = "2030-02-10"
+
+
+def _booking(booking_id, date, status):
+    return [booking_id, "c1", "m1", date, "10:00", "11:00", status, "", ""]
+
+
+def _slot(date, start):
+    return [date, "m1", start, "11:00", "yes", ""]
+
+
+def _ids(backend, tab):
+    return [row.get("id") for row in backend.read_sheet("", tab)]
+
+
+@pytest.fixture
+def backend():
+    backend = MemoryBackend()
+    backend.append_rows("", "bookings", [
+        _booking("b1", "2030-01-05", "completed"),
+        _booking("b2", "2030-01-20", "confirmed"),
+        _booking("b3", "2030-02-01", "cancelled"),
+        _booking("b4", "2030-03-01", "pending"),
+    ])
+    backend.append_rows("", "calendar", [_slot("2030-01-05", "10:00"), _slot("2030-02-11", "10:00")])
+    return backend
+
+
+@pytest.fixture
+def service(backend):
+    return ArchiveService(backend, "")
+
+
+@pytest.mark.unit
+class TestArchiveService:
+    def test_finished_rows_move_to_their_month(self, service, backend):
+        assert service.archive(TODAY) == {"calendar": 1, "bookings": 2}
+        assert _ids(backend, "bookings") == ["b2", "b4"]
+        assert _ids(backend, "bookings_archive_2030_01") == ["b1"]
+        assert _ids(backend, "bookings_archive_2030_02") == ["b3"]
+        assert [s.get("date") for s in backend.read_sheet("", "calendar")] == ["2030-02-11"]
+        assert service.archived_months() == ["2030-01", "2030-02"]
+
+    def test_second_run_moves_nothing(self, service, backend):
+        service.archive(TODAY)
+        assert service.archive(TODAY) == {"calendar": 0, "bookings": 0}
+        assert _ids(backend, "bookings_archive_2030_01") == ["b1"]
+
+    def test_interrupted_run_is_safe_to_repeat(self, service, backend, monkeypatch):
+        delete_rows = backend.delete_rows
+
+        def fail(*args):
+            raise OSError("connection reset")
+
+        monkeypatch.setattr(backend, "delete_rows", fail)
+        with pytest.raises(OSError):
+            service.archive(TODAY)
+        # Copied but not deleted: the repeat deletes without copying again
+        monkeypatch.setattr(backend, "delete_rows", delete_rows)
+        assert service.archive(TODAY)["bookings"] == 2
+        assert _ids(backend, "bookings_archive_2030_01") == ["b1"]
+        assert _ids(backend, "bookings_archive_2030_02") == ["b3"]
+
+    def test_row_changed_during_the_run_is_left_in_place(self, service, backend, monkeypatch):
+        read_range = backend.read_range
+        reads = []
+
+        def edited_between_reads(spreadsheet_id, range_a1):
+            reads.append(range_a1)
+            if range_a1 == "bookings" and reads.count("bookings") == 2:
+                backend.update_fields("", "bookings", "b1", {"slot_end": "12:00"})
+            return read_range(spreadsheet_id, range_a1)
+
+        monkeypatch.setattr(backend, "read_range", edited_between_reads)
+        assert service.archive(TODAY)["bookings"] == 1
+        assert _ids(backend, "bookings") == ["b1", "b2", "b4"]
+
+    def test_batch_size_limits_a_run(self, backend):
+        service = ArchiveService(backend, "", batch_size=1)
+        assert service.archive(TODAY)["bookings"] == 1
+        assert service.archive(TODAY)["bookings"] == 1
+        assert _ids(backend, "bookings") == ["b2", "b4"]
+
+    def test_history_queries(self, service):
+        service.archive(TODAY)
+        assert [b.get("id") for b in service.history("2030-02", status="cancelled")] == ["b3"]
+        assert service.history("2029-12") == []
+        assert [b.get("id") for b in service.client_history("c1")] == ["b1", "b3"]
@@ -0,0 +1,62 @@
+"""Tests for the asyncio facade: calls run off the event loop, with a timeout"""
+import asyncio
+import threading
+
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.async_sheets import AsyncSheetsClient
+from src.db.repositories.bookings_repo import BookingsRepo
+from tests.fakes import FakeSheets, sheets_client
+
+HEADER = SHEET_HEADERS["bookings"]
+
+
+def _booking(booking_id):
+    return [booking_id, "c1", "m1", "2030-01-07", "10:00", "11:00", "pending", "", ""]
+
+
+@pytest.fixture
+def aio():
+    fake = FakeSheets({"bookings": [HEADER] + [_booking(f"b{i}") for i in range(5)]})
+    aio = AsyncSheetsClient(sheets_client(fake), max_workers=2, timeout=5)
+    yield aio
+    aio.shutdown()
+
+
+@pytest.mark.unit
+class TestAsyncSheetsClient:
+    @pytest.mark.asyncio
+    async def test_calls_run_in_a_worker_thread(self, aio):
+        loop_thread = threading.get_ident()
+        assert await aio.run(threading.get_ident) != loop_thread
+        rows = await aio.read_sheet("sid", "bookings")
+        assert [r.get("id") for r in rows] == [f"b{i}" for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_slow_call_times_out_without_blocking_the_loop(self, aio):
+        release = threading.Event()
+        ticks = []
+
+        async def ticker():
+            while not release.is_set():
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        with pytest.raises(asyncio.TimeoutError):
+            await aio.run(release.wait, 5, timeout=0.1)
+        release.set()
+        await task
+        assert len(ticks) > 1
+
+    @pytest.mark.asyncio
+    async def test_iter_sheet_yields_every_row(self, aio):
+        ids = [row.get("id") async for row in aio.iter_sheet("sid", "bookings", chunk_size=2)]
+        assert ids == [f"b{i}" for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_repo_methods_become_awaitable(self, aio):
+        repo = aio.repo(BookingsRepo(aio.sc, "sid"))
+        assert (await repo.get_booking("b3")).get("id") == "b3"
+        assert repo.spreadsheet_id == "sid"
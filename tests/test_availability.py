@@ -0,0 +1,210 @@
+"""Tests for the availability index (interval math, loading, booking in place)"""
+import pytest
+
+from src.db.backends.memory import MemoryBackend
+from src.db.repositories.bookings_repo import BookingsRepo
+from src.db.repositories.calendar_repo import CalendarRepo
+from src.services.availability import AvailabilityIndex, merge, subtract, to_minutes
+
+DATE = "2030-01-07"
+NEXT_DATE = "2030-01-08"
+
+
+def _slot(date, master_id, start, end, available="yes"):
+    return [date, master_id, start, end, available, ""]
+
+
+def _booking(booking_id, master_id, date, start, end, status="confirmed"):
+    return [booking_id, "c1", master_id, date, start, end, status, "", ""]
+
+
+@pytest.fixture
+def backend():
+    backend = MemoryBackend()
+    backend.append_rows("", "calendar", [
+        _slot(DATE, "m1", "10:00", "11:00"),
+        _slot(DATE, "m1", "11:00", "12:00"),
+        _slot(DATE, "m1", "12:00", "13:00"),
+        _slot(DATE, "m1", "15:00", "16:00"),
+        _slot(DATE, "m2", "09:00", "10:00"),
+        _slot(DATE, "m2", "11:30", "12:30"),
+        _slot(NEXT_DATE, "m1", "08:00", "09:00"),
+    ])
+    return backend
+
+
+@pytest.fixture
+def index(backend):
+    return AvailabilityIndex(CalendarRepo(backend, ""), BookingsRepo(backend, ""), ttl=300)
+
+
+@pytest.mark.unit
+class TestIntervals:
+    def test_merge_joins_overlapping_and_touching(self):
+        assert merge([(60, 120), (0, 30), (30, 45), (100, 150), (200, 210)]) == [(0, 45), (60, 150), (200, 210)]
+
+    def test_merge_empty(self):
+        assert merge([]) == []
+
+    def test_subtract_carves_blocks(self):
+        free = [(0, 100), (200, 300)]
+        blocks = [(10, 20), (90, 210), (250, 260)]
+        assert subtract(free, blocks) == [(0, 10), (20, 90), (210, 250), (260, 300)]
+
+    def test_subtract_block_covering_everything(self):
+        assert subtract([(10, 20), (30, 40)], [(0, 50)]) == []
+
+    def test_subtract_without_blocks(self):
+        assert subtract([(10, 20)], []) == [(10, 20)]
+
+
+@pytest.mark.unit
+class TestDayAvailability:
+    def test_consecutive_slots_form_one_run(self, index):
+        day = index.day(DATE, "m1")
+        assert day.free() == [(to_minutes("10:00"), to_minutes("13:00")), (to_minutes("15:00"), to_minutes("16:00"))]
+        assert day.fits(to_minutes("10:30"), to_minutes("12:30"))
+        assert not day.fits(to_minutes("12:30"), to_minutes("15:30"))
+        assert not day.fits(to_minutes("11:00"), to_minutes("11:00"))
+
+    def test_book_and_release(self, index):
+        day = index.day(DATE, "m1")
+        day.book("b1", to_minutes("11:00"), to_minutes("12:00"))
+        assert day.free() == [(600, 660), (720, 780), (900, 960)]
+        assert day.overlaps(to_minutes("11:30"), to_minutes("12:30"))
+        assert not day.overlaps(to_minutes("12:00"), to_minutes("12:30"))
+        assert not day.fits(to_minutes("10:00"), to_minutes("12:00"))
+
+        assert day.release("b1")
+        assert not day.release("b1")
+        assert day.free() == [(600, 780), (900, 960)]
+        assert not day.overlaps(to_minutes("11:30"), to_minutes("12:30"))
+
+    def test_booking_straddling_runs_rebuilds(self, index):
+        day = index.day(DATE, "m1")
+        day.book("b1", to_minutes("12:30"), to_minutes("15:30"))
+        assert day.free() == [(600, 750), (930, 960)]
+
+    def test_bookings_and_busy_slots_are_carved_out_at_load(self, backend, index):
+        backend.append_rows("", "calendar", [_slot(DATE, "m1", "10:00", "10:30", available="no")])
+        backend.append_rows("", "bookings", [
+            _booking("b1", "m1", DATE, "12:00", "13:00"),
+            _booking("b2", "m1", DATE, "15:00", "16:00", status="cancelled"),
+        ])
+        assert index.free_intervals(DATE, "m1") == [("10:30", "12:00"), ("15:00", "16:00")]
+
+    def test_index_book_updates_loaded_day(self, index):
+        assert index.fits(DATE, "m1", "11:00", "12:00")
+        index.book("b1", DATE, "m1", "11:00", "12:00")
+        assert not index.fits(DATE, "m1", "11:00", "12:00")
+        assert index.overlaps(DATE, "m1", "10:30", "11:30")
+        index.release("b1", DATE, "m1")
+        assert index.fits(DATE, "m1", "11:00", "12:00")
+
+
+@pytest.mark.unit
+class TestFittingStarts:
+    def test_steps_from_the_start_of_each_run(self, index):
+        day = index.day(DATE, "m1")
+        starts = list(day.fitting_starts(120, 30))
+        assert starts == [to_minutes(t) for t in ("10:00", "10:30", "11:00")]
+
+    def test_floor_rounds_up_to_the_step(self, index):
+        day = index.day(DATE, "m1")
+        starts = list(day.fitting_starts(60, 30, floor=to_minutes("10:10")))
+        assert starts == [to_minutes(t) for t in ("10:30", "11:00", "11:30", "12:00", "15:00")]
+
+    def test_duration_longer_than_any_run(self, index):
+        assert list(index.day(DATE, "m1").fitting_starts(240, 30)) == []
+
+    def test_next_fitting_times_skip(self, index):
+        held = {(DATE, "m1", "10:00")}
+        found = index.next_fitting_times(
+            ["m1"], 2, DATE, DATE, 120,
+            skip=lambda date, mid, start, end: (date, mid, start) in held,
+        )
+        assert [(f["slot_start"], f["slot_end"]) for f in found] == [("10:30", "12:30"), ("11:00", "13:00")]
+
+    def test_session_may_end_at_midnight(self, backend, index):
+        backend.append_rows("", "calendar", [_slot(NEXT_DATE, "m2", "22:00", "24:00")])
+        found = index.next_fitting_times(["m2"], 5, NEXT_DATE, NEXT_DATE, 120)
+        assert [(f["slot_start"], f["slot_end"]) for f in found] == [("22:00", "24:00")]
+
+
+@pytest.mark.unit
+class TestNextFreeSlots:
+    def test_merged_across_masters_in_time_order(self, index):
+        found = index.next_free_slots(["m1", "m2"], 10, DATE, NEXT_DATE)
+        order = [(s.get("date"), s.get("slot_start"), s.get("master_id")) for s in found]
+        assert order == [
+            (DATE, "09:00", "m2"),
+            (DATE, "10:00", "m1"),
+            (DATE, "11:00", "m1"),
+            (DATE, "11:30", "m2"),
+            (DATE, "12:00", "m1"),
+            (DATE, "15:00", "m1"),
+            (NEXT_DATE, "08:00", "m1"),
+        ]
+
+    def test_after_minute_and_limit(self, index):
+        found = index.next_free_slots(["m1", "m2"], 3, DATE, NEXT_DATE, after_minute=to_minutes("11:15"))
+        assert [(s.get("slot_start"), s.get("master_id")) for s in found] == [
+            ("11:30", "m2"), ("12:00", "m1"), ("15:00", "m1"),
+        ]
+
+    def test_min_duration_and_skip(self, index):
+        found = index.next_free_slots(
+            ["m1", "m2"], 10, DATE, DATE, min_duration=120,
+            skip=lambda s: s.get("slot_start") == "10:00",
+        )
+        assert [(s.get("slot_start"), s.get("master_id")) for s in found] == [("11:00", "m1")]
+
+
+class BookedDuringLoad(BookingsRepo):
+    """Bookings repo where a booking is written and booked right after the first read of the tab"""
+
+    def __init__(self, backend, booking):
+        super().__init__(backend, "")
+        self.booking = booking
+        self.index = None
+        self.reads = 0
+
+    def _booked_after(self, rows):
+        self.reads += 1
+        if self.reads == 1:
+            self.sc.append_row("", "bookings", self.booking)
+            b = self.booking
+            self.index.book(b[0], b[3], b[2], b[4], b[5])
+        return rows
+
+    def list_by_date(self, date):
+        return self._booked_after(super().list_by_date(date))
+
+    def list_bookings(self):
+        return self._booked_after(super().list_bookings())
+
+
+@pytest.mark.unit
+class TestLoadRaces:
+    @pytest.fixture
+    def racing(self, backend):
+        repo = BookedDuringLoad(backend, _booking("b1", "m1", DATE, "11:00", "12:00"))
+        repo.index = AvailabilityIndex(CalendarRepo(backend, ""), repo, ttl=300)
+        return repo
+
+    def test_load_overtaken_by_a_booking_is_not_cached(self, racing):
+        assert not racing.index.fits(DATE, "m1", "11:00", "12:00")
+        assert racing.index.fits(DATE, "m1", "10:00", "11:00")
+        assert racing.reads == 2
+
+    def test_range_load_overtaken_by_a_booking_is_not_cached(self, racing):
+        racing.index.free_slots_between(DATE, NEXT_DATE, "m1")
+        assert not racing.index.fits(DATE, "m1", "11:00", "12:00")
+        assert racing.index.fits(NEXT_DATE, "m1", "08:00", "09:00")
+
+    def test_invalidate_drops_loaded_days(self, backend, index):
+        assert index.fits(DATE, "m1", "11:00", "12:00")
+        backend.append_rows("", "bookings", [_booking("b1", "m1", DATE, "11:00", "12:00")])
+        assert index.fits(DATE, "m1", "11:00", "12:00")  # cached until the ttl or an invalidation
+        index.invalidate(DATE)
+        assert not index.fits(DATE, "m1", "11:00", "12:00")
@@ -0,0 +1,133 @@
+"""Tests for the local storage backends (memory and SQLite share the Sheets row model)"""
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.backends.base import LocalBackend
+from src.db.backends.memory import MemoryBackend
+from src.db.backends.sqlite import SQLiteBackend
+
+
+def _booking(booking_id, status="pending"):
+    return [booking_id, "c1", "m1", "2030-01-07", "10:00", "11:00", status, "", "", ""]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryBackend()
+    else:
+        backend = SQLiteBackend(str(tmp_path / "storage.sqlite3"))
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def bookings(backend):
+    backend.append_rows("", "bookings", [_booking(f"b{i}") for i in range(1, 6)])
+    return backend
+
+
+@pytest.mark.unit
+def test_local_backend_is_abstract():
+    with pytest.raises(TypeError):
+        LocalBackend()
+
+
+@pytest.mark.unit
+class TestRows:
+    def test_update_fields_by_key(self, bookings):
+        assert bookings.update_fields("", "bookings", "b3", {"status": "confirmed"}) == 3
+        assert bookings.find_row("", "bookings", "b3")[1].get("status") == "confirmed"
+        assert bookings.update_fields("", "bookings", "missing", {"status": "confirmed"}) is None
+
+    def test_query_and_count(self, bookings):
+        bookings.update_fields("", "bookings", "b2", {"status": "cancelled"})
+        assert [b.get("id") for b in bookings.query_sheet("", "bookings", status="pending")] == ["b1", "b3", "b4", "b5"]
+        assert bookings.count_rows("", "bookings") == 5
+
+    def test_append_reports_the_row_it_landed_on(self, bookings):
+        response = bookings.append_rows("", "bookings", [_booking("b6"), _booking("b7")])
+        assert response["updates"]["updatedRange"].startswith("bookings!A7")
+
+    def test_ensure_sheets_creates_missing_tabs_once(self, backend):
+        assert backend.ensure_sheets("", {"extra": ["key", "value"]}) == ["extra"]
+        assert backend.ensure_sheets("", {"extra": ["key", "value"]}) == []
+        assert "extra" in backend.list_sheets("")
+
+    def test_pages(self, bookings):
+        pages = list(bookings.iter_sheet_pages("", "bookings", 2))
+        assert [[b.get("id") for b in page] for page in pages] == [["b1", "b2"], ["b3", "b4"], ["b5"]]
+
+
+@pytest.mark.unit
+def test_sqlite_rows_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "storage.sqlite3")
+    backend = SQLiteBackend(path)
+    backend.append_row("", "bookings", _booking("b1"))
+    backend.close()
+    reopened = SQLiteBackend(path)
+    assert reopened.find_row("", "bookings", "b1")[0] == 1
+    reopened.close()
+
+
+@pytest.mark.unit
+def test_sqlite_file_gains_columns_added_since_it_was_created(tmp_path, monkeypatch):
+    path = str(tmp_path / "storage.sqlite3")
+    old_header = [c for c in SHEET_HEADERS["bookings"] if c != "notes"]
+    monkeypatch.setitem(SHEET_HEADERS, "bookings", old_header)
+    backend = SQLiteBackend(path)
+    backend.append_row("", "bookings", _booking("b1"))
+    backend.close()
+    monkeypatch.undo()
+
+    reopened = SQLiteBackend(path)
+    assert reopened.read_range("", "bookings")[0][-1] == "notes"
+    reopened.update_fields("", "bookings", "b1", {"notes": "small rose"})
+    assert reopened.find_row("", "bookings", "b1")[1].get("notes") == "small rose"
+    reopened.close()
+
+
+@pytest.mark.unit
+class TestDeleteRows:
+    def test_rows_below_move_up(self, bookings):
+        assert bookings.delete_rows("", "bookings", [2, 4]) == 2
+        assert [b.get("id") for b in bookings.read_sheet("", "bookings")] == ["b1", "b3", "b5"]
+        assert bookings.find_row("", "bookings", "b5")[0] == 3
+        assert bookings.locate_row("", "bookings", "b2") is None
+
+    def test_update_after_delete_hits_the_shifted_row(self, bookings):
+        bookings.delete_rows("", "bookings", [1])
+        bookings.update_row("", "bookings", 1, [None] * 6 + ["confirmed"])
+        assert bookings.find_row("", "bookings", "b2")[1].get("status") == "confirmed"
+        assert bookings.query_sheet("", "bookings", status="confirmed")[0].get("id") == "b2"
+
+    def test_header_and_out_of_range_rows_are_ignored(self, bookings):
+        assert bookings.delete_rows("", "bookings", [0, 99]) == 0
+        assert bookings.count_rows("", "bookings") == 5
+
+    def test_appends_continue_after_the_last_row(self, bookings):
+        bookings.delete_rows("", "bookings", [1, 2])
+        bookings.append_row("", "bookings", _booking("b6"))
+        assert bookings.find_row("", "bookings", "b6")[0] == 4
+
+
+@pytest.mark.unit
+class TestReadRange:
+    def test_whole_tab(self, bookings):
+        values = bookings.read_range("", "bookings")
+        assert values[0][0] == "id"
+        assert [v[0] for v in values[1:]] == ["b1", "b2", "b3", "b4", "b5"]
+
+    def test_row_window(self, bookings):
+        assert [v[0] for v in bookings.read_range("", "bookings!A3:ZZ4")] == ["b2", "b3"]
+        assert bookings.read_range("", "bookings!A1:ZZ1")[0][0] == "id"
+        assert bookings.read_range("", "bookings!A10:ZZ20") == []
+
+    def test_open_ended_rows_and_columns(self, bookings):
+        assert bookings.read_range("", "bookings!A5:ZZ") == [_booking("b4"), _booking("b5")]
+        assert bookings.read_range("", "bookings!B:C")[:2] == [["client_id", "master_id"], ["c1", "m1"]]
+        assert bookings.read_range("", "bookings!G2") == [["pending"]]
+
+    def test_unsupported_range_is_rejected(self, bookings):
+        with pytest.raises(ValueError):
+            bookings.read_range("", "bookings!R1C1")
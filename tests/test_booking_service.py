@@ -0,0 +1,116 @@
+"""Tests for BookingService over the in-memory backend"""
+import datetime
+
+import pytest
+
+from src.db.backends.memory import MemoryBackend
+from src.services.booking_service import BookingService
+from src.services.slot_leases import SlotUnavailableError
+
+DATE = "2030-01-07"
+NEXT_DATE = "2030-01-08"
+
+
+def _slot(date, master_id, start, end, available="yes"):
+    return [date, master_id, start, end, available, ""]
+
+
+def _master(master_id, active="yes", specialties=""):
+    return [master_id, master_id.upper(), "", specialties, active, ""]
+
+
+@pytest.fixture
+def backend():
+    backend = MemoryBackend()
+    backend.append_rows("", "masters", [_master("m1"), _master("m2"), _master("m3", active="no")])
+    backend.append_rows("", "calendar", [
+        _slot(DATE, "m1", "10:00", "11:00"),
+        _slot(DATE, "m2", "10:00", "11:00"),
+        _slot(DATE, "m3", "12:00", "13:00"),
+        _slot(NEXT_DATE, "m3", "10:00", "11:00"),
+    ])
+    return backend
+
+
+@pytest.fixture
+def service(backend):
+    return BookingService(backend, "")
+
+
+@pytest.mark.unit
+class TestFreeSlotCounts:
+    def test_only_active_masters_count(self, service):
+        assert service.free_slot_counts(DATE, NEXT_DATE) == {DATE: 2}
+
+    def test_one_master_is_counted_as_asked(self, service):
+        assert service.free_slot_counts(DATE, NEXT_DATE, master_id="m3") == {DATE: 1, NEXT_DATE: 1}
+
+    def test_booked_and_held_slots_are_left_out(self, service):
+        service.create_booking(100, "Dana", "", DATE, "m1", "10:00", "11:00")
+        assert service.hold_slot(200, DATE, "m2", "10:00", "11:00")
+        assert service.free_slot_counts(DATE, NEXT_DATE) == {}
+        assert service.free_slot_counts(DATE, NEXT_DATE, owner=200) == {DATE: 1}
+
+
+@pytest.mark.unit
+class TestFindNextFreeSlots:
+    def test_search_ends_on_date_to(self, backend, service):
+        backend.append_rows("", "calendar", [_slot(NEXT_DATE, "m1", "09:00", "10:00")])
+        after = datetime.datetime(2030, 1, 7)
+        found = service.find_next_free_slots(10, after=after, date_to=DATE)
+        assert [(s.get("date"), s.get("master_id")) for s in found] == [(DATE, "m1"), (DATE, "m2")]
+        found = service.find_next_free_slots(10, after=after, date_to=NEXT_DATE)
+        assert [(s.get("date"), s.get("master_id")) for s in found][-1] == (NEXT_DATE, "m1")
+
+    def test_inactive_and_held_slots_are_skipped(self, service):
+        assert service.hold_slot(200, DATE, "m1", "10:00", "11:00")
+        found = service.find_next_free_slots(10, after=datetime.datetime(2030, 1, 7), date_to=NEXT_DATE)
+        assert [s.get("master_id") for s in found] == ["m2"]
+
+
+@pytest.mark.unit
+class TestCancelAndReschedule:
+    def _status(self, backend, booking_id):
+        return backend.find_row("", "bookings", booking_id)[1].get("status")
+
+    def test_cancel_gives_the_time_back(self, backend, service):
+        booking_id = service.create_booking(100, "Dana", "", DATE, "m1", "10:00", "11:00")["booking_id"]
+        assert not service.slot_fits(DATE, "m1", "10:00", "11:00")
+        assert service.cancel_booking(booking_id)
+        assert self._status(backend, booking_id) == "cancelled"
+        assert service.slot_fits(DATE, "m1", "10:00", "11:00")
+        assert service.calendar_jobs.pending() == 0  # the create that never ran is dropped
+
+    @pytest.mark.parametrize("status", ["cancelled", "completed"])
+    def test_finished_booking_is_not_cancelled_again(self, backend, service, status):
+        backend.append_rows("", "bookings", [["b1", "c1", "m1", DATE, "10:00", "11:00", status, "", "evt1", ""]])
+        assert not service.cancel_booking("b1")
+        assert self._status(backend, "b1") == status
+        assert service.calendar_jobs.pending() == 0
+
+    def test_cancel_unknown_booking(self, service):
+        assert not service.cancel_booking("missing")
+
+    def test_reschedule_moves_the_booking(self, backend, service):
+        backend.append_rows("", "calendar", [_slot(DATE, "m1", "11:00", "12:00")])
+        booking_id = service.create_booking(100, "Dana", "", DATE, "m1", "10:00", "11:00")["booking_id"]
+        assert service.reschedule_booking(booking_id, DATE, "10:30")
+        row = backend.find_row("", "bookings", booking_id)[1]
+        assert (row.get("slot_start"), row.get("slot_end")) == ("10:30", "11:30")
+        assert not service.slot_fits(DATE, "m1", "11:00", "11:30")
+        assert service.slot_fits(DATE, "m1", "11:30", "12:00")
+
+    def test_reschedule_onto_a_booked_time_is_refused(self, backend, service):
+        backend.append_rows("", "calendar", [_slot(DATE, "m1", "11:00", "12:00")])
+        first = service.create_booking(100, "Dana", "", DATE, "m1", "10:00", "11:00")["booking_id"]
+        second = service.create_booking(200, "Noa", "", DATE, "m1", "11:00", "12:00")["booking_id"]
+        with pytest.raises(SlotUnavailableError):
+            service.reschedule_booking(second, DATE, "10:30", owner=200)
+        assert backend.find_row("", "bookings", second)[1].get("slot_start") == "11:00"
+        assert not service.slot_fits(DATE, "m1", "11:00", "12:00")
+        assert service.cancel_booking(first)
+        assert service.reschedule_booking(second, DATE, "10:30", owner=200)
+
+    def test_cancelled_booking_is_not_rescheduled(self, backend, service):
+        backend.append_rows("", "bookings", [["b1", "c1", "m1", DATE, "10:00", "11:00", "cancelled", "", "", ""]])
+        assert service.reschedule_booking("b1", DATE, "10:00") is None
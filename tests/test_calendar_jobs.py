@@ -0,0 +1,148 @@
+"""Tests for the background calendar queue: write-back, retries, drops and deletes"""
+import time
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.db.backends.memory import MemoryBackend
+from src.services.booking_service import BookingService
+from src.services.calendar_jobs import CalendarJobQueue, booking_event_id
+
+DATE = "2030-01-07"
+
+
+class _Resp(dict):
+    def __init__(self, status):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = "error"
+
+
+class FakeCalendar:
+    """CalendarService stand-in: the first `failures` calls raise, the rest succeed"""
+
+    def __init__(self, failures=0, error=None):
+        self.failures = failures
+        self.error = error or OSError("calendar unavailable")
+        self.created = []
+        self.removed = []
+
+    def _maybe_fail(self):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+
+    def push_booking_to_calendar(self, calendar_id, start_iso, end_iso, summary, description="", event_id=None):
+        self._maybe_fail()
+        self.created.append((calendar_id, start_iso, end_iso, event_id))
+        return event_id
+
+    def remove_booking_from_calendar(self, calendar_id, event_id):
+        self._maybe_fail()
+        self.removed.append((calendar_id, event_id))
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def backend():
+    backend = MemoryBackend()
+    backend.append_rows("", "masters", [["m1", "M1", "cal-1", "", "yes", ""]])
+    backend.append_rows("", "bookings", [["b1", "c1", "m1", DATE, "22:00", "24:00", "pending", "", "", ""]])
+    return backend
+
+
+@pytest.fixture
+def make_queue(backend):
+    queues = []
+
+    def make(calendar, **kwargs):
+        kwargs.setdefault("retry_base", 0.01)
+        queue = CalendarJobQueue(backend, "", calendar, **kwargs)
+        queues.append(queue)
+        return queue
+    yield make
+    for queue in queues:
+        queue.close(timeout=1)
+
+
+@pytest.mark.unit
+class TestCalendarJobQueue:
+    def test_created_event_id_is_written_back(self, backend, make_queue):
+        calendar = FakeCalendar()
+        queue = make_queue(calendar)
+        queue.enqueue_create("b1", "m1", DATE, "22:00", "24:00", "Tattoo")
+        queue.start(reconcile=False)
+        assert queue.wait_idle()
+        event_id = booking_event_id("b1", DATE, "22:00")
+        assert calendar.created == [
+            ("cal-1", "2030-01-07T22:00:00+02:00", "2030-01-08T00:00:00+02:00", event_id),
+        ]
+        assert backend.find_row("", "bookings", "b1")[1].get("google_event_id") == event_id
+
+    def test_failed_job_is_retried_with_backoff(self, make_queue):
+        calendar = FakeCalendar(failures=2)
+        queue = make_queue(calendar)
+        queue.enqueue_create("b1", "m1", DATE, "22:00", "24:00", "Tattoo")
+        queue.start(reconcile=False)
+        _wait_for(lambda: queue.stats()["done"] == 1)
+        stats = queue.stats()
+        assert (stats["retries"], stats["failed"], stats["pending"]) == (2, 0, 0)
+        assert len(calendar.created) == 1
+
+    def test_job_is_dropped_after_max_attempts(self, backend, make_queue):
+        calendar = FakeCalendar(failures=10)
+        queue = make_queue(calendar, max_attempts=3)
+        queue.enqueue_create("b1", "m1", DATE, "22:00", "24:00", "Tattoo")
+        queue.start(reconcile=False)
+        _wait_for(lambda: queue.stats()["failed"] == 1)
+        assert queue.wait_idle()
+        stats = queue.stats()
+        assert (stats["retries"], stats["done"], stats["pending"]) == (2, 0, 0)
+        assert calendar.failures == 7  # three attempts
+        assert stats["last_error"] == "calendar unavailable"
+        assert backend.find_row("", "bookings", "b1")[1].get("google_event_id") == ""
+
+    def test_delete_drops_a_create_that_never_ran(self, make_queue):
+        calendar = FakeCalendar()
+        queue = make_queue(calendar)
+        queue.enqueue_create("b1", "m1", DATE, "22:00", "24:00", "Tattoo")
+        queue.enqueue_delete("b1", "m1", date=DATE, slot_start="22:00")
+        assert queue.pending() == 0
+        queue.start(reconcile=False)
+        assert queue.wait_idle()
+        assert calendar.created == calendar.removed == []
+
+    def test_deleting_an_event_that_is_gone_counts_as_done(self, make_queue):
+        calendar = FakeCalendar(failures=1, error=HttpError(_Resp(404), b"gone"))
+        queue = make_queue(calendar)
+        queue.enqueue_delete("b1", "m1", event_id="abcde123")
+        queue.start(reconcile=False)
+        assert queue.wait_idle()
+        assert (queue.stats()["done"], queue.stats()["retries"]) == (1, 0)
+
+    def test_reconcile_queues_upcoming_bookings_without_an_event(self, backend, make_queue):
+        backend.append_rows("", "bookings", [
+            ["b2", "c1", "m1", DATE, "10:00", "11:00", "cancelled", "", "", ""],
+            ["b3", "c1", "m1", "2020-01-01", "10:00", "11:00", "pending", "", "", ""],
+            ["b4", "c1", "m1", DATE, "12:00", "13:00", "confirmed", "", "evt", ""],
+        ])
+        queue = make_queue(FakeCalendar())
+        assert queue.reconcile(today="2030-01-01") == 1
+        assert queue.reconcile(today="2030-01-01") == 0  # already queued
+
+
+@pytest.mark.unit
+def test_booking_service_queue_is_created_lazily_and_not_started(backend):
+    service = BookingService(backend, "")
+    assert service._calendar_jobs is None
+    queue = service.calendar_jobs
+    assert queue is service.calendar_jobs
+    assert queue._thread is None
+    service.cancel_booking("b1")
+    assert queue.pending() == 1
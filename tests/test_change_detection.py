@@ -0,0 +1,76 @@
+"""Tests for tail-probe change detection on expired tabs"""
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.sheet_cache import SheetCache, TabSnapshot
+from tests.fakes import FakeSheets, sheets_client
+
+HEADER = SHEET_HEADERS["bookings"]
+
+
+def _booking(booking_id, status="pending"):
+    return [booking_id, "c1", "m1", "2030-01-07", "10:00", "11:00", status, "", ""]
+
+
+@pytest.mark.unit
+class TestTabSnapshotExtend:
+    def test_probe_starts_at_the_known_tail(self):
+        snap = TabSnapshot.from_values("bookings", [HEADER] + [_booking(f"b{i}") for i in range(5)])
+        assert (snap.row_count, snap.tail_start()) == (6, 4)
+
+    def test_unchanged_tail_keeps_the_snapshot(self):
+        snap = TabSnapshot.from_values("bookings", [HEADER, _booking("b1")])
+        assert snap.extend([_booking("b1") + ["", ""]]) is snap
+
+    def test_appended_rows_are_added(self):
+        snap = TabSnapshot.from_values("bookings", [HEADER, _booking("b1")])
+        fresh = snap.extend([_booking("b1"), _booking("b2")])
+        assert [r.get("id") for r in fresh.rows] == ["b1", "b2"]
+        assert fresh.lookup({"id": "b2"}) == [1]
+
+    def test_changed_or_shorter_tail_needs_a_full_download(self):
+        snap = TabSnapshot.from_values("bookings", [HEADER, _booking("b1"), _booking("b2")])
+        assert snap.extend([_booking("b1"), _booking("b2", status="confirmed")]) is None
+        assert snap.extend([_booking("b1")]) is None
+
+
+@pytest.mark.unit
+class TestExpiredTabRefresh:
+    @pytest.fixture
+    def fake(self):
+        return FakeSheets({"bookings": [HEADER] + [_booking(f"b{i}") for i in range(5)]})
+
+    @pytest.fixture
+    def cache(self, cache_clock):
+        return SheetCache(default_ttl=30, ttls={}, full_refresh_interval=300)
+
+    @pytest.fixture
+    def client(self, fake, cache):
+        client = sheets_client(fake, cache)
+        client.read_sheet("sid", "bookings")
+        fake.calls.clear()
+        return client
+
+    def test_unchanged_tab_is_only_probed(self, client, fake, cache, cache_clock):
+        cache_clock[0] += 31
+        assert len(client.read_sheet("sid", "bookings")) == 5
+        assert fake.calls == ["bookings!A4:ZZ"]
+        assert cache.stats()["unchanged"] == 1
+
+    def test_appended_rows_come_with_the_probe(self, client, fake, cache, cache_clock):
+        fake.tabs["bookings"].append(_booking("b5"))
+        cache_clock[0] += 31
+        assert client.read_sheet("sid", "bookings")[-1].get("id") == "b5"
+        assert fake.calls == ["bookings!A4:ZZ"]
+        assert cache.stats()["tail_fetches"] == 1
+
+    def test_edited_tail_falls_back_to_a_full_download(self, client, fake, cache_clock):
+        fake.tabs["bookings"][5] = _booking("b4", status="confirmed")
+        cache_clock[0] += 31
+        assert client.read_sheet("sid", "bookings")[-1].get("status") == "confirmed"
+        assert fake.calls == ["bookings!A4:ZZ", "bookings"]
+
+    def test_old_snapshot_is_downloaded_in_full(self, client, fake, cache_clock):
+        cache_clock[0] += 301
+        client.read_sheet("sid", "bookings")
+        assert fake.calls == ["bookings"]
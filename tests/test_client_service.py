@@ -0,0 +1,114 @@
+"""Tests for client upserts and ClientService.dedupe_clients"""
+import pytest
+
+from src.db.backends.memory import MemoryBackend
+from src.db.repositories.clients_repo import ClientsRepo
+from src.services.booking_service import BookingService
+from src.services.client_service import ClientService
+
+
+def _client(client_id, telegram_id, name="", phone="", email="", created_at=""):
+    return [client_id, telegram_id, name, phone, email, "", created_at]
+
+
+def _booking(booking_id, client_id):
+    return [booking_id, client_id, "m1", "2030-01-07", "10:00", "11:00", "pending", "", ""]
+
+
+@pytest.fixture
+def backend():
+    return MemoryBackend()
+
+
+@pytest.fixture
+def service(backend):
+    return ClientService(backend, "")
+
+
+@pytest.mark.unit
+class TestUpsertClient:
+    @pytest.fixture
+    def repo(self, backend):
+        return ClientsRepo(backend, "")
+
+    def test_existing_client_keeps_its_notes(self, backend, repo):
+        backend.append_rows("", "clients", [[
+            "c1", "100", "Dana", "0501234567", "", "allergic to latex", "",
+        ]])
+        client = repo.upsert_client(100, "Dana L", phone="+972 50-123-4567", email="dana@example.com",
+                                    notes="small rose on the wrist")
+        assert client["id"] == "c1"
+        row = backend.find_row("", "clients", "c1")[1]
+        assert (row.get("name"), row.get("email"), row.get("notes")) == (
+            "Dana L", "dana@example.com", "allergic to latex")
+        assert backend.count_rows("", "clients") == 1
+
+    def test_phone_match_of_another_account_creates_a_client(self, backend, repo):
+        backend.append_rows("", "clients", [_client("c1", "100", name="Dana", phone="0501234567")])
+        client = repo.upsert_client(200, "Noa", phone="0501234567")
+        assert client["id"] != "c1"
+        assert backend.count_rows("", "clients") == 2
+
+    def test_booking_notes_stay_on_the_booking(self, backend):
+        service = BookingService(backend, "")
+        backend.append_rows("", "calendar", [["2030-01-07", "m1", "10:00", "11:00", "yes", ""]])
+        backend.append_rows("", "clients", [_client("c1", "100", name="Dana")])
+        booking = service.create_booking(100, "Dana", "", "2030-01-07", "m1", "10:00", "11:00", notes="rose")
+        assert backend.find_row("", "bookings", booking["booking_id"])[1].get("notes") == "rose"
+        assert backend.find_row("", "clients", "c1")[1].get("notes") == ""
+
+
+@pytest.mark.unit
+class TestDedupeClients:
+    def test_same_telegram_id_is_merged_into_the_oldest(self, backend, service):
+        backend.append_rows("", "clients", [
+            _client("c1", "100", name="Dana"),
+            _client("c2", "200", name="Noa"),
+            _client("c3", "100", phone="050-123 4567", email="dana@example.com"),
+        ])
+        backend.append_rows("", "bookings", [_booking("b1", "c3"), _booking("b2", "c2")])
+
+        report = service.dedupe_clients(apply=True)
+
+        assert report["duplicates"] == 1
+        assert report["bookings_moved"] == 1
+        assert report["conflicts"] == []
+        clients = backend.read_sheet("", "clients")
+        assert [c.get("id") for c in clients] == ["c1", "c2"]
+        assert clients[0].get("phone") == "0501234567"
+        assert clients[0].get("email") == "dana@example.com"
+        assert backend.find_row("", "bookings", "b1")[1].get("client_id") == "c1"
+        assert backend.find_row("", "bookings", "b2")[1].get("client_id") == "c2"
+
+    def test_same_phone_without_conflicting_telegram_ids_is_merged(self, backend, service):
+        backend.append_rows("", "clients", [
+            _client("c1", "", name="Dana", phone="+972 50 123-4567"),
+            _client("c2", "100", phone="+972501234567"),
+        ])
+        report = service.dedupe_clients(apply=True)
+        assert report["duplicates"] == 1
+        clients = backend.read_sheet("", "clients")
+        assert [(c.get("id"), c.get("telegram_id")) for c in clients] == [("c1", "100")]
+
+    def test_shared_phone_of_different_telegram_accounts_is_a_conflict(self, backend, service):
+        backend.append_rows("", "clients", [
+            _client("c1", "100", name="Alice", phone="0501234567"),
+            _client("c2", "200", name="Bob", phone="050-1234567"),
+        ])
+        report = service.dedupe_clients(apply=True)
+        assert report["duplicates"] == 0
+        assert report["conflicts"] == [
+            {"phone": "0501234567", "telegram_ids": ["100", "200"], "client_ids": ["c1", "c2"]},
+        ]
+        assert [c.get("id") for c in backend.read_sheet("", "clients")] == ["c1", "c2"]
+
+    def test_dry_run_changes_nothing(self, backend, service):
+        backend.append_rows("", "clients", [_client("c1", "100"), _client("c2", "100")])
+        report = service.dedupe_clients()
+        assert report["duplicates"] == 1
+        assert backend.count_rows("", "clients") == 2
+
+    def test_empty_tab(self, service):
+        assert service.dedupe_clients(apply=True) == {
+            "clients": 0, "duplicates": 0, "bookings_moved": 0, "conflicts": [],
+        }
@@ -0,0 +1,44 @@
+"""Tests for the process-wide discovery document cache"""
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+import src.db.discovery as discovery
+
+
+@pytest.fixture
+def documents(monkeypatch):
+    """An empty document cache with the bundled reads counted"""
+    reads = []
+    static = discovery.get_static_doc
+
+    def counting(api, version):
+        reads.append((api, version))
+        return static(api, version)
+
+    monkeypatch.setattr(discovery, "_documents", {})
+    monkeypatch.setattr(discovery, "get_static_doc", counting)
+    return reads
+
+
+@pytest.mark.unit
+class TestDiscovery:
+    def test_document_is_parsed_once(self, documents):
+        first = discovery.get_discovery_document("sheets")
+        assert discovery.get_discovery_document("sheets", "v4") is first
+        assert documents == [("sheets", "v4")]
+
+    def test_preload_reads_every_pinned_api(self, documents):
+        discovery.preload_discovery_documents()
+        assert sorted(documents) == sorted(discovery.API_VERSIONS.items())
+
+    def test_service_is_built_without_the_network(self, documents):
+        service = discovery.build_service("sheets", AnonymousCredentials())
+        assert hasattr(service.spreadsheets().values(), "batchGet")
+
+    def test_missing_document_falls_back_to_build(self, documents, monkeypatch):
+        monkeypatch.setattr(discovery, "get_static_doc", lambda api, version: None)
+        built = []
+        monkeypatch.setattr(discovery, "build", lambda api, version, credentials: built.append((api, version)))
+        assert discovery.get_discovery_document("sheets", "v0") is None
+        discovery.build_service("sheets", None, version="v0")
+        assert built == [("sheets", "v0")]
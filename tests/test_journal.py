@@ -0,0 +1,251 @@
+"""Tests for the write-ahead journal (recovery, idempotent replay, dead letters)"""
+import json
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.db.backends.memory import MemoryBackend
+from src.db.journal import JournaledStorage, WriteJournal
+
+BOOKING = ["b1", "c1", "m1", "2030-01-07", "10:00", "11:00", "pending", "", ""]
+
+
+def _storage(backend, journal, **kwargs):
+    """JournaledStorage whose background worker stays idle, so tests drive replay() themselves"""
+    storage = JournaledStorage(backend, journal, replay_interval=3600, retry_delay=0, **kwargs)
+    storage._stop.set()
+    storage._wake.set()
+    storage._worker.join(timeout=5)
+    return storage
+
+
+class _Resp(dict):
+    reason = "Bad Request"
+
+    def __init__(self, status):
+        super().__init__()
+        self.status = status
+
+
+class RefreshingBackend(MemoryBackend):
+    """A backend whose appends are rejected with 401 until credentials are refreshed `fixes_after` times"""
+
+    def __init__(self, fixes_after=1):
+        super().__init__()
+        self.fixes_after = fixes_after
+        self.refreshes = 0
+
+    def refresh_credentials(self):
+        self.refreshes += 1
+        return True
+
+    def append_rows(self, spreadsheet_id, sheet_name, rows):
+        if self.refreshes < self.fixes_after:
+            raise HttpError(_Resp(401), b"invalid credentials")
+        return super().append_rows(spreadsheet_id, sheet_name, rows)
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "writes.journal")
+
+
+@pytest.mark.unit
+class TestWriteJournal:
+    def test_pending_entries_survive_reopen(self, journal_path):
+        journal = WriteJournal(journal_path)
+        first = journal.record("append", "sid", "bookings", row=BOOKING)
+        second = journal.record("append", "sid", "bookings", row=BOOKING)
+        journal.ack(first["key"])
+        journal.close()
+
+        reopened = WriteJournal(journal_path)
+        pending = reopened.pending()
+        assert [e["key"] for e in pending] == [second["key"]]
+        assert pending[0]["recovered"] is True
+        reopened.close()
+
+    def test_torn_last_line_is_skipped_and_rewritten(self, journal_path):
+        journal = WriteJournal(journal_path)
+        kept = journal.record("append", "sid", "bookings", row=BOOKING)
+        journal.close()
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.write('{"key": "torn", "op": "app')
+
+        reopened = WriteJournal(journal_path)
+        assert [e["key"] for e in reopened.pending()] == [kept["key"]]
+        # The next entry must not be glued onto the broken line
+        added = reopened.record("append", "sid", "bookings", row=BOOKING)
+        reopened.close()
+        with open(journal_path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["key"] for line in lines] == [kept["key"], added["key"]]
+
+    def test_dead_letter_moves_entry_out(self, journal_path):
+        journal = WriteJournal(journal_path)
+        entry = journal.record("append", "sid", "bookings", row=BOOKING)
+        journal.dead_letter(entry["key"], "bad row")
+        assert journal.pending() == []
+        journal.close()
+
+        with open(journal.dead_letter_path, encoding="utf-8") as f:
+            dead = [json.loads(line) for line in f]
+        assert [(d["key"], d["error"]) for d in dead] == [(entry["key"], "bad row")]
+        assert WriteJournal(journal_path).pending() == []
+
+    def test_draining_does_not_rewrite_the_file(self, journal_path):
+        journal = WriteJournal(journal_path, compact_after=2)
+        entry = journal.record("append", "sid", "bookings", row=BOOKING)
+        journal.ack(entry["key"])
+        with open(journal_path, encoding="utf-8") as f:
+            assert len(f.readlines()) == 2  # the entry and its ack
+        for _ in range(2):
+            journal.ack(journal.record("append", "sid", "bookings", row=BOOKING)["key"])
+        with open(journal_path, encoding="utf-8") as f:
+            assert len(f.readlines()) == 2  # compacted at the second ack, then one more entry and ack
+        journal.close()
+        with open(journal_path, encoding="utf-8") as f:
+            assert f.read() == ""
+
+
+@pytest.mark.unit
+class TestJournaledStorage:
+    def test_append_resolves_to_row_number(self, journal_path):
+        backend = MemoryBackend()
+        storage = _storage(backend, WriteJournal(journal_path))
+        future = storage.append_row("", "bookings", BOOKING)
+        assert storage.replay() == 1
+        assert future.result(timeout=1) == 2
+        assert backend.find_row("", "bookings", "b1")[0] == 1
+        assert storage.journal.pending() == []
+
+    def test_recovered_append_already_applied_is_not_repeated(self, journal_path):
+        backend = MemoryBackend()
+        journal = WriteJournal(journal_path)
+        journal.record("append", "", "bookings", row=BOOKING)
+        journal.close()
+        # The crash hit after the row reached the backend but before the ack
+        backend.append_rows("", "bookings", [BOOKING])
+
+        storage = _storage(backend, WriteJournal(journal_path))
+        assert storage.replay() == 1
+        assert len(backend.query_sheet("", "bookings", id="b1")) == 1
+        assert storage.journal.pending() == []
+
+    def test_recovered_append_not_yet_applied_is_applied(self, journal_path):
+        backend = MemoryBackend()
+        journal = WriteJournal(journal_path)
+        journal.record("append", "", "bookings", row=BOOKING)
+        journal.close()
+
+        storage = _storage(backend, WriteJournal(journal_path))
+        storage.replay()
+        assert len(backend.query_sheet("", "bookings", id="b1")) == 1
+
+    def test_update_of_pending_append(self, journal_path):
+        backend = MemoryBackend()
+        storage = _storage(backend, WriteJournal(journal_path))
+        storage.append_row("", "bookings", BOOKING)
+        future = storage.update_fields("", "bookings", "b1", {"status": "confirmed"})
+        storage.replay()
+        assert future.result(timeout=1) == 1
+        assert backend.find_row("", "bookings", "b1")[1].get("status") == "confirmed"
+
+    def test_permanent_failure_is_dead_lettered_without_blocking(self, journal_path, monkeypatch):
+        backend = MemoryBackend()
+        storage = _storage(backend, WriteJournal(journal_path), max_attempts=2)
+        append_rows = backend.append_rows
+
+        def failing_append_rows(spreadsheet_id, sheet_name, rows):
+            if any(row[0] == "bad" for row in rows):
+                raise HttpError(_Resp(400), b"invalid row")
+            return append_rows(spreadsheet_id, sheet_name, rows)
+
+        monkeypatch.setattr(backend, "append_rows", failing_append_rows)
+        bad = storage.append_row("", "bookings", ["bad"] + BOOKING[1:])
+        good = storage.append_row("", "bookings", BOOKING)
+
+        with pytest.raises(HttpError):
+            storage.replay()
+        assert len(storage.journal.pending()) == 2
+        storage.replay()
+        assert storage.journal.pending() == []
+        assert good.result(timeout=1) == 2
+        with pytest.raises(HttpError):
+            bad.result(timeout=1)
+        assert storage.journal.dead_lettered == 1
+
+    def test_retryable_failure_keeps_entries_pending(self, journal_path, monkeypatch):
+        backend = MemoryBackend()
+        storage = _storage(backend, WriteJournal(journal_path), max_attempts=1)
+
+        def unavailable(*args, **kwargs):
+            raise HttpError(_Resp(503), b"unavailable")
+
+        monkeypatch.setattr(backend, "append_rows", unavailable)
+        storage.append_row("", "bookings", BOOKING)
+        for _ in range(3):
+            with pytest.raises(HttpError):
+                storage.replay()
+        assert len(storage.journal.pending()) == 1
+        assert storage.journal.dead_lettered == 0
+
+    def test_forbidden_is_dead_lettered(self, journal_path, monkeypatch):
+        backend = MemoryBackend()
+        storage = _storage(backend, WriteJournal(journal_path), max_attempts=1)
+
+        def forbidden(*args, **kwargs):
+            raise HttpError(_Resp(403), b"caller does not have permission")
+
+        monkeypatch.setattr(backend, "append_rows", forbidden)
+        future = storage.append_row("", "bookings", BOOKING)
+        assert storage.replay() == 0
+        assert storage.journal.pending() == []
+        with pytest.raises(HttpError):
+            future.result(timeout=1)
+
+    def test_unauthorized_write_gets_one_credentials_refresh(self, journal_path):
+        backend = RefreshingBackend(fixes_after=1)
+        storage = _storage(backend, WriteJournal(journal_path))
+        future = storage.append_row("", "bookings", BOOKING)
+        assert storage.replay() == 1
+        assert future.result(timeout=1) == 2
+        assert backend.refreshes == 1
+
+    def test_unauthorized_after_the_refresh_counts_as_permanent(self, journal_path):
+        backend = RefreshingBackend(fixes_after=99)
+        storage = _storage(backend, WriteJournal(journal_path), max_attempts=2)
+        future = storage.append_row("", "bookings", BOOKING)
+        with pytest.raises(HttpError):
+            storage.replay()
+        storage.replay()
+        assert backend.refreshes == 1
+        assert storage.journal.dead_lettered == 1
+        with pytest.raises(HttpError):
+            future.result(timeout=1)
+
+    def test_reads_leave_replay_to_the_worker(self, journal_path):
+        backend = MemoryBackend()
+        storage = _storage(backend, WriteJournal(journal_path))
+        storage._wake.clear()
+        storage.append_row("", "bookings", BOOKING)
+        storage._wake.clear()
+        assert storage.read_sheet("", "bookings") == []
+        assert storage._wake.is_set()
+        assert len(storage.journal.pending()) == 1
+
+    def test_row_number_writes_replay_first(self, journal_path):
+        backend = MemoryBackend()
+        storage = _storage(backend, WriteJournal(journal_path))
+        storage.append_row("", "bookings", BOOKING)
+        storage.update_row("", "bookings", 1, [None] * 6 + ["confirmed"])
+        assert storage.journal.pending() == []
+        assert backend.find_row("", "bookings", "b1")[1].get("status") == "confirmed"
+
+    def test_background_worker_replays(self, journal_path):
+        backend = MemoryBackend()
+        storage = JournaledStorage(backend, WriteJournal(journal_path), replay_interval=0.01)
+        try:
+            assert storage.append_row("", "bookings", BOOKING).result(timeout=5) == 2
+        finally:
+            storage.close()
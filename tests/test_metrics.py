@@ -0,0 +1,88 @@
+"""Tests for per-call Google API instrumentation"""
+import threading
+
+import pytest
+from googleapiclient.errors import HttpError
+
+import src.db.metrics as metrics
+from src.db.metrics import ApiCall, CallStats, MetricsRegistry, bind_caller, call_site, current_site, tracked
+from src.db.rate_limit import execute_with_retry
+from tests.test_rate_limit import FakeRequest, _http_error
+
+
+class MeasuredRequest:
+    """Looks like an HttpRequest: a methodId, a body and a postproc hook"""
+    methodId = "sheets.spreadsheets.values.get"
+    body = '{"x": 1}'
+
+    def __init__(self, content=b"0123456789"):
+        self.content = content
+        self.postproc = lambda resp, content: {"values": []}
+
+    def execute(self):
+        return self.postproc({}, self.content)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "_registry", registry)
+    return registry
+
+
+@pytest.mark.unit
+class TestCallStats:
+    def test_histogram_and_percentiles(self):
+        stats = CallStats()
+        for seconds in (0.005, 0.005, 0.04, 0.3, 20):
+            stats.add(seconds, retries=0, bytes_sent=0, bytes_received=0, error=False)
+        data = stats.to_dict()
+        assert data["histogram_ms"]["10"] == 2 and data["histogram_ms"]["inf"] == 1
+        assert data["p50_ms"] == 50
+        assert data["p95_ms"] is None  # in the open bucket
+        assert data["max_ms"] == 20000.0
+
+
+@pytest.mark.unit
+class TestApiCall:
+    def test_call_is_recorded_with_its_site_and_bytes(self, registry):
+        request = MeasuredRequest()
+        with call_site("handlers.book"):
+            call = ApiCall("sheets", request, tab="bookings")
+            request.execute()
+            call.finish()
+        (row,) = registry.snapshot()
+        assert (row["api"], row["method"], row["tab"], row["site"]) == (
+            "sheets", "sheets.spreadsheets.values.get", "bookings", "handlers.book")
+        assert (row["calls"], row["bytes_sent"], row["bytes_received"]) == (1, 8, 10)
+
+    def test_retries_and_errors_are_counted(self, registry):
+        execute_with_retry(FakeRequest(_http_error(429), result=1), tab="clients", base_delay=0.001)
+        with pytest.raises(HttpError):
+            execute_with_retry(FakeRequest(_http_error(400)), tab="clients")
+        totals = registry.by("tab")["clients"]
+        assert (totals["calls"], totals["retries"], totals["errors"]) == (2, 1, 1)
+
+    def test_tracked_labels_calls(self):
+        @tracked("admin.dashboard")
+        def site():
+            return current_site()
+        assert site() == "admin.dashboard"
+
+    def test_worker_thread_inherits_the_callers_site(self):
+        with call_site("handlers.book"):
+            bound = bind_caller(current_site)
+        seen = []
+        worker = threading.Thread(target=lambda: seen.append(bound()))
+        worker.start()
+        worker.join()
+        assert seen == ["handlers.book"]
+
+    def test_report_lists_the_hottest_sites(self, registry):
+        registry.record("sheets", "values.get", "bookings", "handlers.book", 0.2)
+        registry.record("calendar", "events.insert", "cal", "jobs.create", 0.05, retries=2)
+        report = registry.report()
+        assert "Google API calls: 2" in report
+        assert report.index("handlers.book") < report.index("jobs.create")
+        registry.reset()
+        assert registry.snapshot() == []
@@ -0,0 +1,50 @@
+"""Tests for paging through large tabs in row windows"""
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.sheet_cache import SheetCache
+from src.db.sheets_client import iter_range_pages
+from tests.fakes import FakeSheets, sheets_client
+
+
+def _booking(booking_id):
+    return [booking_id, "c1", "m1", "2030-01-07", "10:00", "11:00", "pending", "", ""]
+
+
+def _ids(pages):
+    return [[row.get("id") for row in page] for page in pages]
+
+
+@pytest.fixture
+def fake():
+    return FakeSheets({"bookings": [SHEET_HEADERS["bookings"]] + [_booking(f"b{i}") for i in range(5)]})
+
+
+@pytest.mark.unit
+class TestIterRangePages:
+    def test_pages_of_chunk_size(self, fake):
+        client = sheets_client(fake)
+        pages = list(iter_range_pages(client.read_range, "sid", "bookings", chunk_size=2))
+        assert _ids(pages) == [["b0", "b1"], ["b2", "b3"], ["b4"]]
+        assert fake.calls == ["bookings!A1:ZZ3", "bookings!A4:ZZ5", "bookings!A6:ZZ7", "bookings!A8:ZZ9"]
+
+    def test_blank_rows_do_not_end_paging(self, fake):
+        rows = fake.tabs["bookings"]
+        rows[2:4] = [[], []]  # b1 and b2 cleared: the first window comes back short
+        pages = list(iter_range_pages(sheets_client(fake).read_range, "sid", "bookings", chunk_size=3))
+        assert [r.get("id") for page in pages for r in page if r.get("id")] == ["b0", "b3", "b4"]
+
+    def test_empty_tab(self):
+        fake = FakeSheets({"bookings": []})
+        assert list(iter_range_pages(sheets_client(fake).read_range, "sid", "bookings")) == []
+
+    def test_cached_tab_is_paged_from_memory(self, fake, cache_clock):
+        client = sheets_client(fake, SheetCache(default_ttl=30))
+        client.read_sheet("sid", "bookings")
+        assert _ids(client.iter_sheet_pages("sid", "bookings", 3)) == [["b0", "b1", "b2"], ["b3", "b4"]]
+        assert fake.calls == ["bookings"]
+
+    def test_stopping_early_stops_fetching(self, fake):
+        client = sheets_client(fake)
+        assert next(r for r in client.iter_sheet("sid", "bookings", 2) if r.get("id") == "b1").get("id") == "b1"
+        assert fake.calls == ["bookings!A1:ZZ3"]
@@ -0,0 +1,100 @@
+"""Tests for the token bucket and retry/backoff around Google API requests"""
+import time
+import types
+
+import pytest
+from googleapiclient.errors import HttpError
+
+import src.db.rate_limit as rate_limit
+from src.db.rate_limit import TokenBucket, execute_with_retry
+
+
+class _Resp(dict):
+    def __init__(self, status, **headers):
+        super().__init__(headers)
+        self.status = status
+        self.reason = "error"
+
+
+class FakeRequest:
+    """execute() raises the queued errors in turn, then returns result"""
+
+    def __init__(self, *errors, result=None):
+        self.errors = list(errors)
+        self.result = result
+        self.executed = 0
+
+    def execute(self):
+        self.executed += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def _http_error(status, **headers):
+    return HttpError(_Resp(status, **headers), b"{}")
+
+
+@pytest.mark.unit
+class TestTokenBucket:
+    def test_burst_then_timeout(self):
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        assert bucket.acquire() and bucket.acquire()
+        assert not bucket.acquire(timeout=0.01)
+        assert bucket.acquired == 2
+
+    def test_waits_for_a_refill(self):
+        bucket = TokenBucket(rate=50.0, capacity=1)
+        bucket.acquire()
+        started = time.monotonic()
+        assert bucket.acquire()
+        assert time.monotonic() - started >= 0.015
+        assert bucket.waits == 1
+
+
+@pytest.mark.unit
+class TestExecuteWithRetry:
+    def test_throttled_request_is_retried(self, quota_limiters):
+        request = FakeRequest(_http_error(429), _http_error(429), result={"ok": True})
+        assert execute_with_retry(request, base_delay=0.001) == {"ok": True}
+        assert request.executed == 3
+        stats = quota_limiters["sheets"].stats()
+        assert (stats["throttled_429"], stats["retries"], stats["failures"]) == (2, 2, 0)
+
+    def test_retry_after_header_sets_the_delay(self, monkeypatch):
+        slept = []
+        monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(sleep=slept.append, monotonic=time.monotonic))
+        request = FakeRequest(_http_error(429, **{"retry-after": "7"}), result=1)
+        assert execute_with_retry(request) == 1
+        assert slept == [7.0]
+
+    def test_non_idempotent_request_is_not_retried_on_5xx(self, quota_limiters):
+        request = FakeRequest(_http_error(503), result=1)
+        with pytest.raises(HttpError):
+            execute_with_retry(request, idempotent=False, base_delay=0.001)
+        assert request.executed == 1
+        assert quota_limiters["sheets"].stats()["failures"] == 1
+
+    def test_idempotent_request_is_retried_on_5xx(self):
+        request = FakeRequest(_http_error(503), ConnectionError(), result=1)
+        assert execute_with_retry(request, base_delay=0.001) == 1
+        assert request.executed == 3
+
+    def test_client_errors_fail_at_once(self):
+        request = FakeRequest(_http_error(400), result=1)
+        with pytest.raises(HttpError):
+            execute_with_retry(request, base_delay=0.001)
+        assert request.executed == 1
+
+    def test_gives_up_after_max_retries(self, quota_limiters):
+        request = FakeRequest(*[_http_error(429)] * 3, result=1)
+        with pytest.raises(HttpError):
+            execute_with_retry(request, max_retries=2, base_delay=0.001)
+        assert request.executed == 3
+        stats = quota_limiters["sheets"].stats()
+        assert (stats["retries"], stats["failures"]) == (2, 1)
+
+    def test_calendar_calls_use_their_own_limiter(self, quota_limiters):
+        execute_with_retry(FakeRequest(result=1), api="calendar")
+        assert quota_limiters["calendar"].stats()["requests"] == 1
+        assert quota_limiters["sheets"].stats()["requests"] == 0
@@ -0,0 +1,33 @@
+"""Tests for multi-tab reads: one batchGet for every tab the cache does not hold"""
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.sheet_cache import SheetCache
+from tests.fakes import FakeSheets, sheets_client
+
+
+@pytest.fixture
+def fake():
+    return FakeSheets({
+        "clients": [SHEET_HEADERS["clients"], ["c1", "100", "Ann", "", "", "", ""]],
+        "masters": [SHEET_HEADERS["masters"], ["m1", "Bob", "", "", "yes"]],
+        "bookings": [SHEET_HEADERS["bookings"]],
+    })
+
+
+@pytest.mark.unit
+class TestReadSheets:
+    def test_tabs_are_read_in_one_request(self, fake, cache_clock):
+        client = sheets_client(fake, SheetCache(default_ttl=30))
+        tabs = client.read_sheets("sid", ["clients", "masters", "bookings"])
+        assert fake.batches == [["clients", "masters", "bookings"]]
+        assert tabs["clients"][0].get("name") == "Ann"
+        assert tabs["masters"][0].get("id") == "m1"
+        assert tabs["bookings"] == []
+
+    def test_cached_tabs_are_not_fetched_again(self, fake, cache_clock):
+        client = sheets_client(fake, SheetCache(default_ttl=30))
+        client.read_sheet("sid", "clients")
+        tabs = client.read_sheets("sid", ["clients", "masters"])
+        assert fake.calls == ["clients", "masters"]
+        assert [r.get("id") for r in tabs["clients"]] == ["c1"]
@@ -0,0 +1,54 @@
+"""Tests for typed sheet records and header-driven decoding"""
+import json
+
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.records import Booking, Master, RowDecoder, decode_values, row_values, to_jsonable
+
+
+@pytest.mark.unit
+class TestRecords:
+    def test_record_reads_like_a_dict(self):
+        master = Master("m1", "Bob", "", "", "Yes")
+        assert master["name"] == master.get("name") == master.name == "Bob"
+        assert master.get("created_at") == ""  # short rows are padded
+        assert master.get("missing", "-") == "-"
+        assert "id" in master and "missing" not in master
+        assert dict(master) == dict(zip(SHEET_HEADERS["masters"], ["m1", "Bob", "", "", "Yes", ""]))
+        assert master.is_active
+        with pytest.raises(KeyError):
+            master["missing"]
+
+    def test_records_have_no_instance_dict(self):
+        assert not hasattr(Booking("b1"), "__dict__")
+
+    def test_json_dump(self):
+        assert json.loads(json.dumps([Master("m1", "Bob")], default=to_jsonable))[0]["name"] == "Bob"
+
+
+@pytest.mark.unit
+class TestRowDecoder:
+    def test_reordered_and_extra_columns(self):
+        header = ["name", "id", "rating", "active"]
+        master = RowDecoder("masters", header).decode(["Bob", "m1", "5"])
+        assert (master.id, master.name, master.active) == ("m1", "Bob", "")
+        assert master["rating"] == "5"
+        assert list(master)[-1] == "rating"
+
+    def test_archive_tabs_decode_like_their_hot_tab(self):
+        header = SHEET_HEADERS["bookings"]
+        rows = decode_values("bookings_archive_2024", [header, ["b1", "c1"]])
+        assert isinstance(rows[0], Booking) and rows[0].client_id == "c1"
+
+    def test_unknown_tab_decodes_to_dicts(self):
+        assert decode_values("settings", [["key", "value"], ["lang"]]) == [{"key": "lang", "value": ""}]
+        assert decode_values("settings", []) == []
+
+    def test_row_values_leaves_unknown_columns_untouched(self):
+        header = SHEET_HEADERS["bookings"]
+        row = {"id": "b1", "status": "pending"}
+        values = row_values(header, row, {"status": "cancelled"})
+        assert values[header.index("status")] == "cancelled"
+        assert values[header.index("id")] == "b1"
+        assert values[header.index("date")] is None
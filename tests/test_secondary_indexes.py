@@ -0,0 +1,57 @@
+"""Tests for index-backed queries and counts on cached tabs"""
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.repositories.bookings_repo import BookingsRepo
+from src.db.repositories.clients_repo import ClientsRepo
+from src.db.sheet_cache import SheetCache
+from tests.fakes import FakeSheets, sheets_client
+
+
+def _booking(booking_id, client_id, date="2030-01-07", status="pending"):
+    return [booking_id, client_id, "m1", date, "10:00", "11:00", status, "", ""]
+
+
+@pytest.fixture
+def fake():
+    return FakeSheets({
+        "bookings": [SHEET_HEADERS["bookings"],
+                     _booking("b1", "c1"), _booking("b2", "c2"), _booking("b3", "c1", date="2030-01-08")],
+        "clients": [SHEET_HEADERS["clients"],
+                    ["c1", "100", "Ann", "+972501234567", "", "", ""], ["c2", "200", "Ben", "", "", "", ""]],
+    })
+
+
+@pytest.fixture
+def client(fake, cache_clock):
+    return sheets_client(fake, SheetCache(default_ttl=30))
+
+
+@pytest.mark.unit
+class TestSecondaryIndexes:
+    def test_queries_after_one_download(self, client, fake):
+        bookings = BookingsRepo(client, "sid")
+        assert [b.get("id") for b in bookings.list_by_client("c1")] == ["b1", "b3"]
+        assert [b.get("id") for b in bookings.list_by_date("2030-01-07")] == ["b1", "b2"]
+        assert bookings.list_by_client("nobody") == []
+        assert fake.calls == ["bookings"]
+
+    def test_column_without_a_prebuilt_index(self, client, fake):
+        bookings = BookingsRepo(client, "sid")
+        assert [b.get("id") for b in bookings.list_by_status("pending")] == ["b1", "b2", "b3"]
+        client.update_fields("sid", "bookings", "b2", {"status": "confirmed"})
+        assert [b.get("id") for b in bookings.list_by_status("pending")] == ["b1", "b3"]
+        assert [b.get("id") for b in bookings.list_by_status("confirmed")] == ["b2"]
+        assert fake.calls == ["bookings"]
+
+    def test_client_lookups(self, client):
+        clients = ClientsRepo(client, "sid")
+        assert clients.find_by_telegram_id(200).get("id") == "c2"
+        assert clients.find_by_telegram_id(300) is None
+
+    def test_count_reads_the_snapshot(self, client, fake):
+        bookings = BookingsRepo(client, "sid")
+        assert bookings.count_bookings() == 3
+        client.append_row("sid", "bookings", _booking("b4", "c2"))
+        assert bookings.count_bookings() == 4
+        assert fake.calls == ["bookings"]
@@ -0,0 +1,171 @@
+"""Tests for the read-through tab cache: TTLs, write invalidation and generations"""
+import itertools
+import sys
+import threading
+
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.sheet_cache import SheetCache, TabSnapshot
+from tests.fakes import FakeSheets, sheets_client
+
+HEADER = SHEET_HEADERS["bookings"]
+
+
+def _booking(booking_id, status="pending"):
+    return [booking_id, "c1", "m1", "2030-01-07", "10:00", "11:00", status, "", ""]
+
+
+def _snapshot(*ids):
+    return TabSnapshot.from_values("bookings", [HEADER] + [_booking(i) for i in ids])
+
+
+@pytest.fixture
+def cache(cache_clock):
+    return SheetCache(default_ttl=30, ttls={}, full_refresh_interval=300)
+
+
+@pytest.mark.unit
+class TestSheetCache:
+    def test_entry_expires_after_its_ttl(self, cache, cache_clock):
+        generation = cache.generation("sid", "bookings")
+        cache.store("sid", "bookings", _snapshot("b1"), generation, downloaded=2, full=True)
+        assert [r.get("id") for r in cache.get("sid", "bookings")] == ["b1"]
+        cache_clock[0] += 31
+        assert cache.get("sid", "bookings") is None
+        assert cache.current("sid", "bookings") is None
+
+    def test_per_tab_ttl(self, cache_clock):
+        cache = SheetCache(default_ttl=30, ttls={"masters": 300})
+        assert cache.ttl_for("masters") == 300
+        assert cache.ttl_for("bookings!A:C") == 30
+
+    def test_load_started_before_a_write_is_not_stored(self, cache):
+        generation = cache.generation("sid", "bookings")
+        cache.invalidate("sid", "bookings")  # a write lands while the read is in flight
+        cache.store("sid", "bookings", _snapshot("b1"), generation, downloaded=2, full=True)
+        assert cache.get("sid", "bookings") is None
+        generation = cache.generation("sid", "bookings")
+        cache.store("sid", "bookings", _snapshot("b1"), generation, downloaded=2, full=True)
+        assert cache.get("sid", "bookings") is not None
+
+    def test_invalidating_the_spreadsheet_drops_every_tab(self, cache):
+        for tab in ("bookings", "clients"):
+            cache.store("sid", tab, TabSnapshot.from_values(tab, [SHEET_HEADERS[tab]]),
+                        cache.generation("sid", tab), downloaded=1, full=True)
+        cache.invalidate("sid")
+        assert cache.get("sid", "bookings") is None and cache.get("sid", "clients") is None
+        assert cache.stats()["cached_tabs"] == 0
+
+    def test_lazy_indexes_on_a_shared_snapshot(self, cache):
+        snap = _snapshot(*(f"b{i}" for i in range(50)))
+        combos = [c for n in (1, 2, 3) for c in itertools.combinations(HEADER, n)]
+        errors = []
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+        def look_up():
+            try:
+                for columns in combos:
+                    snap.lookup({c: "" for c in columns})
+            except Exception as e:  # surfaced below
+                errors.append(e)
+
+        def derive():
+            try:
+                for i in range(len(combos)):
+                    snap.appended([_booking(f"x{i}")])
+                    snap.patched({1: _booking("b0", status="confirmed")})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=look_up), threading.Thread(target=derive)]
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert errors == []
+
+
+@pytest.mark.unit
+class TestSnapshotIndexes:
+    def test_append_extends_the_shared_index(self):
+        snap = _snapshot("b1", "b2")
+        child = snap.appended([_booking("b3")])
+        assert child.indexes[("id",)] is snap.indexes[("id",)]
+        assert child.lookup({"id": "b3"}) == [2]
+        assert child.lookup({"client_id": "c1"}) == [0, 1, 2]
+        # The parent does not see rows appended after it
+        assert snap.lookup({"id": "b3"}) == []
+        assert snap.lookup({"client_id": "c1"}) == [0, 1]
+
+    def test_appending_to_an_older_snapshot_forks_its_index(self):
+        snap = _snapshot("b1")
+        first = snap.appended([_booking("b2")])
+        second = snap.appended([_booking("x2")])
+        assert (first.lookup({"id": "b2"}), first.lookup({"id": "x2"})) == ([1], [])
+        assert (second.lookup({"id": "x2"}), second.lookup({"id": "b2"})) == ([1], [])
+        assert first.lookup({"client_id": "c1"}) == second.lookup({"client_id": "c1"}) == [0, 1]
+
+    def test_patch_moves_only_the_changed_keys(self):
+        snap = _snapshot("b1", "b2", "b3")
+        patched = snap.patched({2: _booking("b2", status="confirmed")})
+        assert patched.lookup({"status": "confirmed"}) == [1]
+        assert patched.lookup({"status": "pending"}) == [0, 2]
+        assert snap.lookup({"status": "pending"}) == [0, 1, 2]
+        # Both sides of the patch can still grow without seeing each other's rows
+        grown = patched.appended([_booking("b4")])
+        forked = snap.appended([_booking("x4", status="confirmed")])
+        assert grown.lookup({"status": "pending"}) == [0, 2, 3]
+        assert forked.lookup({"status": "confirmed"}) == [3]
+        assert snap.lookup({"id": "b4"}) == patched.lookup({"id": "x4"}) == []
+
+    def test_lookup_returns_a_copy(self):
+        snap = _snapshot("b1")
+        snap.lookup({"id": "b1"}).append(99)
+        assert snap.lookup({"id": "b1"}) == [0]
+
+
+@pytest.mark.unit
+class TestReadThrough:
+    @pytest.fixture
+    def fake(self):
+        return FakeSheets({"bookings": [HEADER, _booking("b1"), _booking("b2")]})
+
+    @pytest.fixture
+    def client(self, fake, cache):
+        return sheets_client(fake, cache)
+
+    def test_second_read_is_served_from_the_cache(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        client.read_sheet("sid", "bookings")
+        assert fake.calls == ["bookings"]
+
+    def test_expired_tab_is_reread(self, client, fake, cache_clock):
+        client.read_sheet("sid", "bookings")
+        fake.tabs["bookings"].append(_booking("b3"))
+        cache_clock[0] += 31
+        assert [r.get("id") for r in client.read_sheet("sid", "bookings")] == ["b1", "b2", "b3"]
+
+    def test_own_update_is_visible_without_a_download(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        client.update_row("sid", "bookings", 2, _booking("b2", status="confirmed"))
+        rows = client.read_sheet("sid", "bookings")
+        assert rows[1].get("status") == "confirmed"
+        assert fake.calls == ["bookings"]
+
+    def test_own_append_is_visible_without_a_download(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        client.append_row("sid", "bookings", _booking("b3"))
+        assert [r.get("id") for r in client.read_sheet("sid", "bookings")] == ["b1", "b2", "b3"]
+        assert client.query_sheet("sid", "bookings", id="b3")[0].get("id") == "b3"
+        assert fake.calls == ["bookings"]
+
+    def test_delete_forces_a_full_download(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        client.delete_rows("sid", "bookings", [1])
+        assert [r.get("id") for r in client.read_sheet("sid", "bookings")] == ["b2"]
+        assert fake.calls == ["bookings", "bookings"]
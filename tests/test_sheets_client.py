@@ -0,0 +1,69 @@
+"""Tests for SheetsClient row lookups against its cache"""
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.sheet_cache import SheetCache
+from tests.fakes import FakeSheets, sheets_client
+
+
+def _booking(booking_id, status="pending"):
+    return [booking_id, "c1", "m1", "2030-01-07", "10:00", "11:00", status, "", ""]
+
+
+@pytest.fixture
+def fake():
+    return FakeSheets({"bookings": [SHEET_HEADERS["bookings"]] + [_booking(f"b{i}") for i in range(1, 8)]})
+
+
+@pytest.fixture
+def client(fake, cache_clock):
+    return sheets_client(fake, SheetCache(default_ttl=30, full_refresh_interval=300))
+
+
+@pytest.mark.unit
+class TestFindRow:
+    def test_known_key_costs_no_call(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        calls = len(fake.calls)
+        row_index, row = client.find_row("sid", "bookings", "b3")
+        assert (row_index, row.get("id")) == (3, "b3")
+        assert len(fake.calls) == calls
+
+    def test_fresh_entry_past_the_full_refresh_interval(self, client, fake, cache_clock):
+        client.read_sheet("sid", "bookings")
+        cache_clock[0] = 1290
+        client.read_sheet("sid", "bookings")  # expired: a tail probe keeps the entry fresh
+        cache_clock[0] = 1305  # entry still fresh, snapshot too old to probe from
+        calls = len(fake.calls)
+        found = client.find_row("sid", "bookings", "b2")
+        assert found is not None and found[0] == 2
+        assert len(fake.calls) == calls
+
+    def test_row_appended_elsewhere_is_found_after_a_full_read(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        fake.tabs["bookings"].append(_booking("b8"))
+        calls = len(fake.calls)
+        assert client.find_row("sid", "bookings", "b8")[0] == 8
+        assert fake.calls[calls:] == ["bookings"]
+
+    def test_unknown_key_downloads_the_tab_once(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        calls = len(fake.calls)
+        assert client.find_row("sid", "bookings", "missing") is None
+        assert len(fake.calls) == calls + 1
+
+    def test_expired_tab_is_probed_before_the_full_read(self, client, fake, cache_clock):
+        client.read_sheet("sid", "bookings")
+        fake.tabs["bookings"].append(_booking("b8"))
+        cache_clock[0] = 1031
+        assert client.find_row("sid", "bookings", "b8")[0] == 8
+        # The tail probe picks up the appended row; no full download needed
+        assert len(fake.calls) == 2 and fake.calls[-1].startswith("bookings!A")
+
+    def test_own_appends_are_located_without_a_read(self, client, fake):
+        client.read_sheet("sid", "bookings")
+        for i in range(8, 11):
+            client.append_row("sid", "bookings", _booking(f"b{i}"))
+        calls = len(fake.calls)
+        assert client.find_row("sid", "bookings", "b10")[0] == 10
+        assert len(fake.calls) == calls
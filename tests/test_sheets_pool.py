@@ -0,0 +1,75 @@
+"""Tests for SheetsClientPool checkout, growth and failure handling"""
+import queue
+import types
+
+import pytest
+
+import src.db.sheets_pool as sheets_pool
+from src.db.sheets_pool import SheetsClientPool
+
+
+class FakeClient:
+    """Stands in for SheetsClient: no credentials file, no discovery"""
+    created = 0
+    fail_next = 0
+
+    def __init__(self, creds_path="credentials.json", token_path="token.json", creds=None, cache=None):
+        if FakeClient.fail_next:
+            FakeClient.fail_next -= 1
+            raise OSError("discovery document unavailable")
+        FakeClient.created += 1
+        self.creds_path, self.token_path, self.cache = creds_path, token_path, cache
+        self.creds = creds or types.SimpleNamespace(refresh_token=None, valid=True, expiry=None)
+        self.rows = []
+
+    def append_rows(self, spreadsheet_id, sheet_name, rows):
+        self.rows.extend(rows)
+        return {"updates": {"updatedRange": f"{sheet_name}!A2:ZZ{len(rows) + 1}"}}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeClient.created, FakeClient.fail_next = 0, 0
+    monkeypatch.setattr(sheets_pool, "SheetsClient", FakeClient)
+    monkeypatch.setattr(sheets_pool, "preload_discovery_documents", lambda: None)
+    pool = SheetsClientPool(size=2, refresh_interval=3600, write_behind=False)
+    yield pool
+    pool.close()
+
+
+@pytest.mark.unit
+class TestSheetsClientPool:
+    def test_idle_client_is_reused(self, pool):
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+        assert first is second
+        assert pool.stats()["created"] == 1
+
+    def test_grows_to_size_then_waits(self, pool):
+        with pool.acquire() as a, pool.acquire() as b:
+            assert a is not b
+            with pytest.raises(queue.Empty):
+                with pool.acquire(timeout=0.05):
+                    pass
+        stats = pool.stats()
+        assert (stats["created"], stats["idle"], stats["waited"]) == (2, 2, 1)
+
+    def test_failed_construction_releases_the_slot(self, pool):
+        FakeClient.fail_next = 1
+        with pool.acquire():
+            with pytest.raises(OSError):
+                with pool.acquire():
+                    pass
+            assert pool.stats()["created"] == 1
+            # The slot is free again: the pool still grows to size
+            with pool.acquire() as grown:
+                assert isinstance(grown, FakeClient)
+        assert pool.stats()["created"] == 2
+
+    def test_data_calls_borrow_a_client(self, pool):
+        pool.append_rows("sid", "bookings", [["b1"]])
+        with pool.acquire() as client:
+            assert client.rows == [["b1"]]
+        assert pool.stats()["in_use"] == 0
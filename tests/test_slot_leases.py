@@ -0,0 +1,69 @@
+"""Tests for slot holds: overlap, ownership and expiry"""
+import types
+
+import pytest
+
+import src.services.slot_leases as slot_leases
+from src.services.slot_leases import SlotLeaseManager
+
+DATE = "2030-01-07"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drives the leases' monotonic clock: clock[0] = seconds"""
+    now = [1000.0]
+    monkeypatch.setattr(slot_leases, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def leases(clock):
+    return SlotLeaseManager(ttl=300)
+
+
+@pytest.mark.unit
+class TestSlotLeaseManager:
+    def test_overlapping_hold_of_another_owner_is_refused(self, leases):
+        assert leases.hold("m1", DATE, "10:00", owner=1, slot_end="12:00")
+        assert not leases.hold("m1", DATE, "11:00", owner=2, slot_end="13:00")
+        assert leases.hold("m1", DATE, "12:00", owner=2, slot_end="13:00")
+        assert leases.hold("m2", DATE, "10:00", owner=2, slot_end="12:00")
+        assert leases.held_by_other("m1", DATE, "11:30", owner=2, slot_end="12:30")
+        assert not leases.held_by_other("m1", DATE, "11:30", owner=1, slot_end="11:45")
+
+    def test_same_owner_may_overlap_and_extend(self, leases, clock):
+        assert leases.hold("m1", DATE, "10:00", owner=1, slot_end="12:00")
+        assert leases.hold("m1", DATE, "11:00", owner=1, slot_end="13:00")
+        clock[0] += 200
+        assert leases.hold("m1", DATE, "10:00", owner=1, slot_end="12:00")  # extended to 1500
+        clock[0] += 200
+        assert leases.held_by_other("m1", DATE, "10:00", owner=2, slot_end="11:00")
+
+    def test_hold_expires_after_its_ttl(self, leases, clock):
+        assert leases.hold("m1", DATE, "10:00", owner=1, slot_end="11:00")
+        clock[0] += 299
+        assert not leases.hold("m1", DATE, "10:00", owner=2, slot_end="11:00")
+        clock[0] += 1
+        assert leases.hold("m1", DATE, "10:00", owner=2, slot_end="11:00")
+        assert leases.stats()["held"] == 1
+
+    def test_custom_ttl(self, leases, clock):
+        leases.hold("m1", DATE, "10:00", owner=1, ttl=5)
+        clock[0] += 5
+        assert not leases.held_by_other("m1", DATE, "10:00", owner=2)
+
+    def test_release_only_by_its_owner(self, leases):
+        leases.hold("m1", DATE, "10:00", owner=1, slot_end="11:00")
+        assert not leases.release("m1", DATE, "10:00", owner=2)
+        assert leases.release("m1", DATE, "10:00", owner=1)
+        assert not leases.release("m1", DATE, "10:00")
+        assert leases.stats()["held"] == 0
+
+    def test_release_owner_frees_every_hold(self, leases):
+        leases.hold("m1", DATE, "10:00", owner=1, slot_end="11:00")
+        leases.hold("m2", "2030-01-08", "12:00", owner=1, slot_end="13:00")
+        leases.hold("m1", DATE, "15:00", owner=2, slot_end="16:00")
+        assert leases.release_owner(1) == 2
+        assert leases.hold("m1", DATE, "10:00", owner=3, slot_end="11:00")
+        assert leases.held_by_other("m1", DATE, "15:00", owner=3)
@@ -0,0 +1,88 @@
+"""Tests for the SQLite read replica: full and incremental pulls, write-through"""
+import pytest
+
+from src.config.constants import SHEET_HEADERS
+from src.db.sqlite_replica import SheetsReplica
+from tests.fakes import FakeSheets, sheets_client
+
+
+def _booking(booking_id, status="pending"):
+    return [booking_id, "c1", "m1", "2030-01-07", "10:00", "11:00", status, "", ""]
+
+
+@pytest.fixture
+def fake():
+    tabs = {name: [header] for name, header in SHEET_HEADERS.items()}
+    tabs["bookings"] += [_booking("b1"), _booking("b2")]
+    tabs["clients"].append(["c1", "100", "Ann", "", "", "", ""])
+    return FakeSheets(tabs)
+
+
+@pytest.fixture
+def replica(fake):
+    replica = SheetsReplica(sheets_client(fake), "sid", path=":memory:", full_refresh_every=10)
+    yield replica
+    replica.close()
+
+
+@pytest.mark.unit
+class TestSheetsReplica:
+    def test_first_pull_mirrors_every_tab(self, replica, fake):
+        replica.pull()
+        assert [r.get("id") for r in replica.rows("bookings")] == ["b1", "b2"]
+        assert replica.query("clients", telegram_id=100)[0].get("name") == "Ann"
+        assert replica.is_ready("calendar")
+
+    def test_append_only_tabs_pull_just_the_tail(self, replica, fake):
+        replica.pull()
+        fake.tabs["bookings"].append(_booking("b3"))
+        fake.calls.clear()
+        replica.pull()
+        assert "bookings!A4:ZZ" in fake.calls
+        assert "clients" in fake.calls  # small tabs are re-read whole
+        assert [r.get("id") for r in replica.rows("bookings")] == ["b1", "b2", "b3"]
+
+    def test_periodic_full_pull_sees_edits(self, replica, fake):
+        replica.pull()
+        fake.tabs["bookings"][1] = _booking("b1", status="confirmed")
+        replica.pull()
+        assert replica.query("bookings", id="b1")[0].get("status") == "pending"
+        replica.pull(full=True)
+        assert replica.query("bookings", id="b1")[0].get("status") == "confirmed"
+
+    def test_writes_are_mirrored_before_the_next_pull(self, replica):
+        replica.pull()
+        assert replica.apply_append("bookings", _booking("b3")) == 4
+        replica.apply_update("bookings", 1, _booking("b1", status="confirmed"))
+        row_index, row = replica.locate("bookings", "b1")
+        assert (row_index, row["status"]) == (1, "confirmed")
+        assert replica.count("bookings") == 3
+
+    def test_relocated_append_rewinds_the_tail(self, replica, fake):
+        replica.pull()
+        guessed = replica.apply_append("bookings", _booking("b4"))
+        # Someone else's row landed first; ours went one row further down
+        fake.tabs["bookings"] += [_booking("b3"), _booking("b4")]
+        replica.relocate("bookings", guessed, guessed + 1)
+        replica.pull()
+        assert [r.get("id") for r in replica.rows("bookings")] == ["b1", "b2", "b3", "b4"]
+
+    def test_unknown_column_is_rejected(self, replica):
+        replica.pull()
+        with pytest.raises(KeyError):
+            replica.query("bookings", colour="red")
+
+
+@pytest.mark.unit
+def test_replica_file_gains_columns_added_since_it_was_created(fake, tmp_path, monkeypatch):
+    path = str(tmp_path / "replica.sqlite3")
+    monkeypatch.setitem(SHEET_HEADERS, "bookings", [c for c in SHEET_HEADERS["bookings"] if c != "notes"])
+    SheetsReplica(sheets_client(fake), "sid", path=path).close()
+    monkeypatch.undo()
+
+    fake.tabs["bookings"][0] = list(SHEET_HEADERS["bookings"])
+    fake.tabs["bookings"].append(_booking("b3") + ["small rose"])
+    replica = SheetsReplica(sheets_client(fake), "sid", path=path)
+    replica.pull()
+    assert replica.query("bookings", id="b3")[0].get("notes") == "small rose"
+    replica.close()
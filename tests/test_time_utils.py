@@ -0,0 +1,19 @@
+"""Tests for the date/time helpers"""
+from datetime import datetime
+
+import pytest
+
+from src.utils.time_utils import to_datetime
+
+
+@pytest.mark.unit
+class TestToDatetime:
+    def test_localizes_to_the_timezone(self):
+        dt = to_datetime("2030-01-07", "10:30", "Asia/Jerusalem")
+        assert dt.replace(tzinfo=None) == datetime(2030, 1, 7, 10, 30)
+        assert dt.utcoffset().total_seconds() == 2 * 3600
+
+    def test_24_00_is_midnight_at_the_end_of_the_day(self):
+        dt = to_datetime("2030-12-31", "24:00")
+        assert dt.replace(tzinfo=None) == datetime(2031, 1, 1)
+        assert dt.isoformat() == "2031-01-01T00:00:00+02:00"
@@ -0,0 +1,94 @@
+"""Tests for the write-behind queue: coalescing, flush triggers and failures"""
+import pytest
+
+from src.db.write_queue import WriteBehindQueue, first_row_number
+
+
+class RecordingSink:
+    """Records the batched calls the queue makes; fail=True makes them raise"""
+
+    def __init__(self, next_row=2):
+        self.appends = []
+        self.updates = []
+        self.next_row = next_row
+        self.fail = False
+
+    def append_rows(self, spreadsheet_id, sheet_name, rows):
+        if self.fail:
+            raise OSError("sheets unavailable")
+        self.appends.append((sheet_name, rows))
+        first, self.next_row = self.next_row, self.next_row + len(rows)
+        return {"updates": {"updatedRange": f"{sheet_name}!A{first}:I{self.next_row - 1}"}}
+
+    def batch_update_rows(self, spreadsheet_id, sheet_name, updates):
+        if self.fail:
+            raise OSError("sheets unavailable")
+        self.updates.append((sheet_name, dict(updates)))
+
+
+@pytest.fixture
+def sink():
+    return RecordingSink()
+
+
+@pytest.fixture
+def queue(sink):
+    # A long interval keeps the worker out of the way: tests flush explicitly
+    queue = WriteBehindQueue(sink, max_batch=3, flush_interval=60)
+    yield queue
+    queue.close()
+
+
+@pytest.mark.unit
+class TestWriteBehindQueue:
+    def test_first_row_number(self):
+        assert first_row_number({"updates": {"updatedRange": "bookings!A12:I13"}}) == 12
+        assert first_row_number({}) is None
+
+    def test_appends_go_out_as_one_request(self, queue, sink):
+        first = queue.append("sid", "bookings", ["b1"])
+        second = queue.append("sid", "bookings", ["b2"])
+        assert queue.has_pending("sid", "bookings")
+        queue.flush("sid", "bookings")
+        assert sink.appends == [("bookings", [["b1"], ["b2"]])]
+        assert (first.result(), second.result()) == (2, 3)
+        assert not queue.has_pending("sid")
+
+    def test_updates_to_one_row_coalesce(self, queue, sink):
+        first = queue.update("sid", "bookings", 5, ["b1", "pending"])
+        second = queue.update("sid", "bookings", 5, ["b1", "confirmed"])
+        queue.update("sid", "bookings", 7, ["b2", "pending"])
+        queue.flush()
+        assert sink.updates == [("bookings", {5: ["b1", "confirmed"], 7: ["b2", "pending"]})]
+        assert first.result() == second.result() == 5
+        assert queue.stats()["requests"] == 1
+
+    def test_full_batch_is_flushed_by_the_worker(self, queue, sink):
+        futures = [queue.append("sid", "bookings", [f"b{i}"]) for i in range(3)]
+        assert [f.result(timeout=5) for f in futures] == [2, 3, 4]
+        assert len(sink.appends) == 1
+
+    def test_flush_narrows_to_one_tab(self, queue, sink):
+        queue.append("sid", "bookings", ["b1"])
+        queue.append("sid", "clients", ["c1"])
+        queue.flush("sid", "clients!A:G")
+        assert sink.appends == [("clients", [["c1"]])]
+        assert queue.has_pending("sid", "bookings")
+
+    def test_failed_flush_fails_its_futures(self, queue, sink):
+        sink.fail = True
+        append = queue.append("sid", "bookings", ["b1"])
+        update = queue.update("sid", "bookings", 3, ["b2"])
+        queue.flush()
+        with pytest.raises(OSError):
+            append.result()
+        with pytest.raises(OSError):
+            update.result()
+        assert queue.stats()["failures"] == 2
+
+    def test_close_flushes_and_rejects_new_writes(self, queue, sink):
+        future = queue.append("sid", "bookings", ["b1"])
+        queue.close()
+        assert future.result() == 2
+        with pytest.raises(RuntimeError):
+            queue.append("sid", "bookings", ["b2"])